@@ -0,0 +1,209 @@
+# audio.py
+import math
+import os
+import time
+import pygame
+
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+VOICES = 16             # mixer channels; past this many sounds the least important is cut
+MERGE_WINDOW = 0.025    # seconds: triggers of one clip this close together play as one, louder
+MERGE_GAIN = 0.35       # volume added per merged trigger (a voice is capped at 1.0)
+BASE_VOLUME = 0.6       # a lone trigger, leaving headroom for merges
+NULL_CLIP_LENGTH = 1.0  # seconds a NullBackend voice stays busy
+
+
+def asset(name):
+    """Path of a sound file shipped in sounds/, wherever the app was started from."""
+    return os.path.join(SOUND_DIR, name)
+
+
+def pan(x, width):
+    """Equal-power (left, right) gains for a source at x on a screen width pixels wide."""
+    p = min(1.0, max(0.0, x / float(width))) if width else 0.5
+    return math.cos(p * math.pi / 2), math.sin(p * math.pi / 2)
+
+
+# -----------------------------
+#  BACK ENDS
+# -----------------------------
+class MixerBackend:
+    """pygame.mixer: clips decoded to Sounds, one Channel per voice. Playback runs on SDL's audio thread."""
+
+    def __init__(self, voices):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(max(voices, pygame.mixer.get_num_channels()))
+        pygame.mixer.set_reserved(voices)   # Sound.play() elsewhere can't take our channels
+        self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+
+    def load(self, path):
+        return pygame.mixer.Sound(path)
+
+    def play(self, voice, clip, left, right):
+        channel = self.channels[voice]
+        channel.play(clip)
+        channel.set_volume(left, right)
+
+    def set_volume(self, voice, left, right):
+        self.channels[voice].set_volume(left, right)
+
+    def busy(self, voice):
+        return self.channels[voice].get_busy()
+
+    def stop(self, voice):
+        self.channels[voice].stop()
+
+    def close(self):
+        pygame.mixer.set_reserved(0)
+
+
+class NullBackend:
+    """Plays nothing, but keeps voices busy for clip_length seconds so pooling behaves the same.
+
+    Used headless, in benchmarks and when no audio device can be opened.
+    played lists every (voice, clip, left, right) started, for inspection.
+    """
+
+    def __init__(self, voices, clip_length=NULL_CLIP_LENGTH, clock=time.perf_counter):
+        self.clip_length = clip_length
+        self.clock = clock
+        self.ends = [0.0] * voices
+        self.played = []
+
+    def load(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return os.path.basename(path)
+
+    def play(self, voice, clip, left, right):
+        self.ends[voice] = self.clock() + self.clip_length
+        self.played.append((voice, clip, left, right))
+
+    def set_volume(self, voice, left, right):
+        pass
+
+    def busy(self, voice):
+        return self.clock() < self.ends[voice]
+
+    def stop(self, voice):
+        self.ends[voice] = 0.0
+
+    def close(self):
+        pass
+
+
+# -----------------------------
+#  VOICE POOL
+# -----------------------------
+class Audio:
+    """Named clips played through a bounded pool of voices.
+
+    Clips are decoded once, on first load(), and cached by name. play()
+    takes a free voice or, when all are busy, steals the one with the
+    lowest priority (the oldest among equals) as long as it is not more
+    important than the new sound; otherwise the new sound is skipped.
+    Triggers of the same clip within MERGE_WINDOW play on one voice, a
+    little louder and panned to their average position, so forty bursts
+    in one step are one big bang rather than forty voices fighting.
+    """
+
+    def __init__(self, backend=None, voices=VOICES, width=800, clock=time.perf_counter):
+        if backend is None:
+            try:
+                backend = MixerBackend(voices)
+            except pygame.error as exc:     # no audio device: stay silent rather than fail
+                print(f"Audio disabled: {exc}")
+                backend = NullBackend(voices, clock=clock)
+        self.backend = backend
+        self.width = width      # screen width that x positions are panned across
+        self.clock = clock
+        self.clips = {}
+        self.priority = [0] * voices
+        self.started = [0.0] * voices
+        self.playing = [None] * voices  # clip name each voice was last started with
+        self.recent = {}        # clip name -> [time, voice, triggers, sum of x] of its last voice
+        self.stolen = 0
+        self.merged = 0
+        self.skipped = 0
+
+    def load(self, name, filename=None):
+        """Decode sounds/<filename> (default "<name>.mp3") once and cache it as name."""
+        if name not in self.clips:
+            self.clips[name] = self.backend.load(asset(filename or name + ".mp3"))
+        return self.clips[name]
+
+    def play(self, name, x=None, priority=0):
+        """Start clip name panned to screen position x (centre when None). Returns the voice or None."""
+        now = self.clock()
+        x = self.width / 2.0 if x is None else x
+        recent = self.recent.get(name)
+        # the voice may since have been stolen for another clip: only merge into it while it plays this one
+        if (recent and now - recent[0] <= MERGE_WINDOW and self.playing[recent[1]] == name
+                and self.backend.busy(recent[1])):
+            recent[2] += 1
+            recent[3] += x
+            self.priority[recent[1]] = max(self.priority[recent[1]], priority)
+            self.backend.set_volume(recent[1], *self._gains(recent[3] / recent[2], recent[2]))
+            self.merged += 1
+            return recent[1]
+
+        voice = self._voice(priority)
+        if voice is None:
+            self.skipped += 1
+            return None
+        self.priority[voice] = priority
+        self.started[voice] = now
+        self.playing[voice] = name
+        self.backend.play(voice, self.load(name), *self._gains(x, 1))
+        self.recent[name] = [now, voice, 1, x]
+        return voice
+
+    def _gains(self, x, triggers):
+        volume = min(1.0, BASE_VOLUME + MERGE_GAIN * (triggers - 1))
+        left, right = pan(x, self.width)
+        return left * volume, right * volume
+
+    def _voice(self, priority):
+        backend = self.backend
+        victim = None
+        for voice in range(len(self.priority)):
+            if not backend.busy(voice):
+                return voice
+            if victim is None or (self.priority[voice], self.started[voice]) < (self.priority[victim], self.started[victim]):
+                victim = voice
+        if self.priority[victim] > priority:
+            return None
+        backend.stop(victim)
+        self.stolen += 1
+        return victim
+
+    def stats(self):
+        busy = sum(self.backend.busy(voice) for voice in range(len(self.priority)))
+        return {"voices": busy, "stolen": self.stolen, "merged": self.merged}
+
+    def close(self):
+        for voice in range(len(self.priority)):
+            self.backend.stop(voice)
+        self.backend.close()
+        self.clips.clear()
+
+
+# -----------------------------
+#  SHARED INSTANCE
+# -----------------------------
+_shared = None
+
+def get(width=800):
+    """The app-wide Audio, created on first use. width is the screen width to pan across."""
+    global _shared
+    if _shared is None:
+        _shared = Audio()
+    _shared.width = width
+    return _shared
+
+def release():
+    """Stop and free the app-wide Audio, e.g. when the app quits."""
+    global _shared
+    if _shared is not None:
+        _shared.close()
+        _shared = None
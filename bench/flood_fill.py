@@ -0,0 +1,126 @@
+# bench/flood_fill.py
+"""Bucket fill time on a blank canvas and on a fragmented one.
+
+The fragmented canvas is the drawing board's canvas with NOISE of its
+pixels blacked out and the rest jittered by a few levels, filled with a
+tolerance that spans the jitter: the region is one huge, ragged
+component of some hundred thousand runs, the case a per-run Python loop
+spends over a second on. Small canvases, noisy ones and one with a
+shape whose inside and outside are filled in turn, are first checked
+against a plain pixel-by-pixel flood fill, 4- and 8-connected. The run
+fails (exit status 1) when the best blank fill takes longer than
+BLANK_LIMIT, a frame, or the best fragmented fill longer than LIMIT.
+
+Run from the repository root:  python -m bench.flood_fill [repeats] [limit_ms]
+"""
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+from interactive_drawing import WIDTH, HEIGHT, flood_fill
+
+NOISE = 0.3             # share of black pixels on the fragmented canvas
+JITTER = 6              # grey levels the other pixels vary by
+TOLERANCE = 8           # fill tolerance: covers the jitter, not the black
+LIMIT = 0.2             # seconds the fragmented fill may take
+BLANK_LIMIT = 0.016     # seconds a blank canvas fill may take: under a frame
+FILL = (200, 30, 30)
+
+
+def noisy_canvas(size, noise, rng):
+    surf = pygame.Surface(size)
+    w, h = size
+    shade = 255 - rng.integers(0, JITTER, (w, h, 1))
+    shade[rng.random((w, h)) < noise] = 0
+    pygame.surfarray.blit_array(surf, np.repeat(shade, 3, axis=2))
+    return surf
+
+
+def reference_fill(surf, pos, color, tolerance, connectivity):
+    """Pixel-at-a-time flood fill, for checking small canvases."""
+    w, h = surf.get_size()
+    seed = surf.get_at(pos)[:3]
+    steps = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if connectivity == 8:
+        steps += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    inside = lambda p: all(abs(a - b) <= tolerance for a, b in zip(surf.get_at(p)[:3], seed))
+    seen, queue = {pos}, deque([pos])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in steps:
+            p = (x + dx, y + dy)
+            if 0 <= p[0] < w and 0 <= p[1] < h and p not in seen and inside(p):
+                seen.add(p)
+                queue.append(p)
+    for p in seen:
+        surf.set_at(p, color)
+
+
+def shape_canvas(size):
+    """A blank canvas with a black ring: its inside is one run per row, its outside is not."""
+    surf = pygame.Surface(size)
+    surf.fill((255, 255, 255))
+    pygame.draw.circle(surf, (0, 0, 0), (size[0] // 2, size[1] // 2), min(size) // 3, 2)
+    return surf
+
+
+def seed_point(surf):
+    x, y = surf.get_width() // 2, surf.get_height() // 2
+    while surf.get_at((x, y))[:3] == (0, 0, 0):
+        x += 1
+    return x, y
+
+
+def best_time(canvas, connectivity, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        surf = canvas.copy()
+        pos = seed_point(surf)
+        start = time.perf_counter()
+        flood_fill(surf, pos, FILL, TOLERANCE, connectivity)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repeats = int(argv[0]) if argv else 5
+    limit = float(argv[1]) / 1000 if len(argv) > 1 else LIMIT
+    pygame.init()
+    rng = np.random.default_rng(0)
+
+    cases = [(f"{noise:.0%} noise", noisy_canvas((120, 80), noise, rng), None) for noise in (0.0, NOISE, 0.45)]
+    cases += [("inside a ring", shape_canvas((120, 80)), None), ("outside a ring", shape_canvas((120, 80)), (2, 2))]
+    for name, canvas, pos in cases:
+        for connectivity in (4, 8):
+            pos = pos or seed_point(canvas)
+            fast, slow = canvas.copy(), canvas.copy()
+            flood_fill(fast, pos, FILL, TOLERANCE, connectivity)
+            reference_fill(slow, pos, FILL, TOLERANCE, connectivity)
+            if pygame.image.tobytes(fast, "RGB") != pygame.image.tobytes(slow, "RGB"):
+                print(f"wrong fill: {name}, {connectivity}-connected", file=sys.stderr)
+                sys.exit(1)
+
+    size = (WIDTH, HEIGHT - 60)
+    worst = {"blank": 0.0, "fragmented": 0.0}
+    for name, canvas in (("blank", noisy_canvas(size, 0.0, rng)), ("fragmented", noisy_canvas(size, NOISE, rng))):
+        for connectivity in (4, 8):
+            seconds = best_time(canvas, connectivity, repeats)
+            print(f"{name:<11} {connectivity}-connected  {seconds * 1000:8.2f} ms")
+            worst[name] = max(worst[name], seconds)
+    pygame.quit()
+    failed = False
+    for name, allowed in (("blank", BLANK_LIMIT), ("fragmented", limit)):
+        if worst[name] > allowed:
+            print(f"{name} fill took {worst[name] * 1000:.1f} ms, over the {allowed * 1000:.0f} ms limit",
+                  file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
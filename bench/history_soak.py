@@ -0,0 +1,100 @@
+# bench/history_soak.py
+"""Soak test for the drawing board's tile history.
+
+Replays a long scripted session (strokes, shapes, fills, clears, undo and
+redo) against TileHistory and fails if its stored bytes or the Python heap
+ever exceed a fixed ceiling. The default 20,000 edits is several hours of
+heavy drawing.
+
+Run from the repository root:  python -m bench.history_soak [edits]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from history import TileHistory
+from interactive_drawing import WIDTH, HEIGHT, flood_fill
+
+BUDGET = 8 * 1024 * 1024
+HEAP_SLACK = 8 * 1024 * 1024    # shadow copy, deque/list overhead, numpy temporaries
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 255, 255), (0, 0, 0)]
+
+
+def edit(canvas, history, rng):
+    """One user action, marked and committed the way run_drawing does it."""
+    w, h = canvas.get_size()
+    kind = rng.random()
+    color = rng.choice(COLORS)
+    if kind < 0.55:
+        x, y = rng.randrange(w), rng.randrange(h)
+        for _ in range(rng.randint(10, 60)):
+            x = min(w - 1, max(0, x + rng.randint(-12, 12)))
+            y = min(h - 1, max(0, y + rng.randint(-12, 12)))
+            history.mark(pygame.draw.circle(canvas, color, (x, y), rng.randint(2, 20)))
+    elif kind < 0.75:
+        a = (rng.randrange(w), rng.randrange(h))
+        b = (rng.randrange(w), rng.randrange(h))
+        history.mark(pygame.draw.line(canvas, color, a, b, rng.randint(1, 12)))
+    elif kind < 0.9:
+        rect = pygame.Rect(rng.randrange(w), rng.randrange(h), rng.randint(5, 400), rng.randint(5, 300))
+        history.mark(pygame.draw.rect(canvas, color, rect, rng.choice((0, 3))))
+    elif kind < 0.98:
+        area = flood_fill(canvas, (rng.randrange(w), rng.randrange(h)), color, rng.choice((0, 16)))
+        if area:
+            history.mark(area)
+    else:
+        canvas.fill((0, 0, 0))
+        history.mark()
+    history.commit()
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    edits = int(argv[0]) if argv else 20_000
+    rng = random.Random(7)
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    canvas = pygame.Surface((WIDTH, HEIGHT - 60))
+    canvas.fill((0, 0, 0))
+
+    tracemalloc.start()
+    history = TileHistory(canvas, budget=BUDGET)
+    baseline = tracemalloc.get_traced_memory()[0]
+    ceiling = BUDGET + HEAP_SLACK
+    peak_store = peak_heap = 0
+    undo_time = undos = 0
+    start = time.perf_counter()
+    for i in range(edits):
+        edit(canvas, history, rng)
+        if rng.random() < 0.15:
+            t = time.perf_counter()
+            for _ in range(rng.randint(1, 5)):
+                history.undo()
+            undo_time += time.perf_counter() - t
+            undos += 1
+            if rng.random() < 0.5:
+                history.redo()
+        peak_store = max(peak_store, history.bytes_used)
+        if i % 500 == 0:
+            peak_heap = max(peak_heap, tracemalloc.get_traced_memory()[0] - baseline)
+            assert history.bytes_used <= BUDGET, f"history holds {history.bytes_used} bytes at edit {i}"
+            assert peak_heap <= ceiling, f"heap grew by {peak_heap} bytes at edit {i}"
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"edits: {edits}  steps kept: {len(history.undo_steps)}  ({elapsed:.1f}s)")
+    print(f"history bytes peak: {peak_store / 2**20:.2f} MiB (budget {BUDGET / 2**20:.0f} MiB)")
+    print(f"heap growth peak:   {peak_heap / 2**20:.2f} MiB (ceiling {ceiling / 2**20:.0f} MiB)")
+    if undos:
+        print(f"mean undo burst:    {undo_time / undos * 1000:.2f} ms")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
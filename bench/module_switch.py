@@ -0,0 +1,160 @@
+# bench/module_switch.py
+"""Cost of switching between the shader modules and the menu.
+
+Each switch is what picking a module from the menu does: the real
+scenes are driven through SceneManager.activate(), so every switch runs
+the menu's and the module's exit() and enter(), then draws one frame of
+the module through SceneManager.frame() and goes back to the menu. The
+switch and the frame are timed apart, since on a software rasteriser the
+frame alone can take longer than the whole switch.
+
+Every GL object is counted: the context is wrapped as it is created so
+that each buffer, texture, renderbuffer, framebuffer, program, vertex
+array and query the app makes (palette LUTs, overlays, deep zoom
+references included) is tracked until it is released. Objects the
+RenderContext caches for the whole run are counted apart, as they are
+made lazily (a canvas once the adaptive view first drops its scale).
+Fails (exit status 1) if a switch after the first round takes over 50 ms
+on average, if more scene objects are alive at the end than after the
+first round, if the context holds more than an 8-bit and a float canvas
+per window size, if any but the context's queries are still alive once
+the app has quit and released the shared context, or on a GL error.
+
+Run from the repository root:  python -m bench.module_switch [switches]
+"""
+import collections
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import moderngl
+import pygame
+
+import offscreen
+import render_context
+from main import MenuScene, SceneManager
+
+MODULES = ("kaleidoscope", "fractal", "mandala_art")
+LIMIT_MS = 50.0
+DT = 1.0 / 60
+
+# Context methods that create a GL object; the others (simple_framebuffer, ...) go through these
+CREATORS = ("buffer", "texture", "texture_array", "texture3d", "texture_cube", "depth_texture",
+            "depth_texture_cube", "renderbuffer", "depth_renderbuffer", "framebuffer", "program",
+            "_vertex_array", "sampler", "query", "compute_shader")
+
+
+def track(ctx, made):
+    """Record every object ctx creates from now on in made."""
+    for name in CREATORS:
+        create = getattr(ctx, name)
+
+        def tracked(*args, _create=create, **kwargs):
+            obj = _create(*args, **kwargs)
+            made.append(obj)
+            return obj
+        setattr(ctx, name, tracked)
+    return ctx
+
+
+def cached(gpu):
+    """ids of the objects the RenderContext keeps for the whole run (programs, targets, canvases)."""
+    objects = [gpu.vbo, gpu.timer]
+    for prog, vao in gpu.programs.values():
+        objects += [prog, vao]
+    for fbo, _, _ in gpu.targets.values():
+        objects += [fbo, fbo.depth_attachment] + list(fbo.color_attachments)
+    for texture, fbo in gpu.canvases.values():
+        objects += [texture, fbo]
+    return {id(obj) for obj in objects}
+
+
+def alive(made, skip=()):
+    """Count of unreleased GL objects per type, leaving out the ids in skip."""
+    counts = collections.Counter(type(obj).__name__ for obj in made
+                                 if id(obj) not in skip and not isinstance(obj.mglo, moderngl.InvalidObject))
+    return dict(sorted(counts.items()))
+
+
+def step(manager):
+    """One frame of the active scene; the posted event keeps frame() from waiting for input."""
+    pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+    manager.frame(DT)
+
+
+def visit(manager, menu, name):
+    """Menu -> module -> menu. Returns (switch seconds, module frame seconds)."""
+    start = time.perf_counter()
+    manager.activate(manager.scene(name))
+    ready = time.perf_counter()
+    step(manager)
+    pygame.display.flip()
+    drawn = time.perf_counter()
+    manager.activate(menu)
+    back = time.perf_counter()
+    step(manager)
+    return back - drawn + ready - start, drawn - ready
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    switches = int(argv[0]) if argv else 300
+
+    made = []
+    create_context = offscreen.create_context
+    offscreen.create_context = lambda *args, **kwargs: track(create_context(*args, **kwargs), made)
+
+    manager = SceneManager()
+    menu = MenuScene(manager)
+    manager.activate(menu)
+    step(manager)
+    first = [sum(visit(manager, menu, name)) for name in MODULES]      # init() compiles the shaders
+    gpu = render_context.get()
+    counts = alive(made, cached(gpu))
+
+    times, frames = [], []
+    for i in range(switches):
+        switch, frame = visit(manager, menu, MODULES[i % len(MODULES)])
+        times.append(switch)
+        frames.append(frame)
+    error = gpu.ctx.error
+    final = alive(made, cached(gpu))
+    cache = {"programs": len(gpu.programs), "targets": len(gpu.targets), "canvases": len(gpu.canvases)}
+
+    manager.quit()          # releases every scene, then the app releases the shared context
+    render_context.release()
+    left = {kind: n for kind, n in alive(made).items() if kind != "Query"}    # queries go with the context
+    offscreen.create_context = create_context
+    pygame.quit()
+
+    times.sort()
+    mean = sum(times) / len(times) * 1000
+    print(f"first launch (compiles): {sum(first) / len(first) * 1000:.1f} ms per module")
+    print(f"switch: mean {mean:.2f} ms  p95 {times[int(len(times) * 0.95)] * 1000:.2f} ms  over {switches}")
+    print(f"first frame after a switch: mean {sum(frames) / len(frames) * 1000:.1f} ms")
+    print(f"scene GL objects after first round: {counts}")
+    print(f"scene GL objects after {switches} switches: {final}  (error: {error})")
+    print(f"RenderContext caches: {cache}")
+    print(f"GL objects never released: {left}")
+
+    failures = []
+    if final != counts:
+        failures.append("GL objects leaked across switches")
+    if cache["canvases"] > 2 * cache["targets"]:
+        failures.append("more canvases than an 8-bit and a float one per window size")
+    if left:
+        failures.append(f"GL objects outlived the app: {left}")
+    if error != "GL_NO_ERROR":
+        failures.append(f"GL error: {error}")
+    if mean > LIMIT_MS:
+        failures.append(f"mean switch {mean:.1f} ms exceeds {LIMIT_MS} ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
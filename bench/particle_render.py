@@ -0,0 +1,87 @@
+# bench/particle_render.py
+"""Frame time of the fireworks particle renderers at 1k, 10k and 50k sparks.
+
+Fails (exit status 1) when the renderer the fireworks scene picks on
+this machine (see particle_renderer.pick_renderer) takes too long to draw
+50k sparks: one 60 fps frame, LIMIT_MS, on a hardware GL context. With
+software GL (llvmpipe) or none the NumPy splat is picked, and no renderer
+here gets 50k sparks near 16.6 ms: the splat takes about 220 ms on one
+llvmpipe core, so SOFTWARE_LIMIT_MS only catches it getting slower.
+
+Run from the repository root:  python -m bench.particle_render [renderer ...]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from fireworks import WIDTH, HEIGHT
+from particles import ParticlePool
+from particle_renderer import RENDERERS, pick_renderer
+
+COUNTS = (1_000, 10_000, 50_000)
+FRAMES = 30
+LIMIT_MS = 16.6             # hardware GL, "points"
+SOFTWARE_LIMIT_MS = 250.0   # software GL or none, "additive"
+
+
+def make_pool(count, seed=1234):
+    """Bursts spread over the sky and aged to a mix of fresh and fading sparks."""
+    pool = ParticlePool(capacity=count, seed=seed)
+    rng = pool.rng
+    bursts = max(1, count // 150)
+    for i in range(bursts):
+        n = min(150, count - pool.count)
+        x = rng.uniform(100, WIDTH - 100)
+        y = rng.uniform(120, HEIGHT - 250)
+        pool.emit(x, y, (255, 120, 50), 1.4, n)
+        pool.age[pool.count - n:pool.count] = rng.uniform(0, 400)
+    for _ in range(10):
+        pool.update()
+    return pool
+
+
+def time_renderer(name, pool, screen, frames=FRAMES):
+    renderer = RENDERERS[name]()
+    renderer.draw(screen, pool)  # warm caches / stencils
+    start = time.perf_counter()
+    for _ in range(frames):
+        screen.fill((5, 5, 25))
+        renderer.draw(screen, pool)
+    elapsed = (time.perf_counter() - start) / frames * 1000.0
+    if hasattr(renderer, "release"):
+        renderer.release()
+    return elapsed
+
+
+def main(argv=None):
+    names = (argv or sys.argv[1:]) or list(RENDERERS)
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    picked = pick_renderer()
+    if picked not in names:
+        names.append(picked)
+    print(f"{'particles':>10} " + " ".join(f"{n + ' ms':>12}" for n in names))
+    for count in COUNTS:
+        pool = make_pool(count)
+        row = []
+        for name in names:
+            frames = 3 if name == "surface" and count > 10_000 else FRAMES
+            row.append(time_renderer(name, pool, screen, frames))
+        print(f"{pool.count:>10} " + " ".join(f"{ms:>12.2f}" for ms in row))
+    worst = row[names.index(picked)]
+    if "render_context" in sys.modules:
+        sys.modules["render_context"].release()
+    pygame.quit()
+    limit = LIMIT_MS if picked == "points" else SOFTWARE_LIMIT_MS
+    if worst > limit:
+        print(f"{picked} (picked for this machine) takes {worst:.1f} ms for {COUNTS[-1]} sparks, "
+              f"over the {limit} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
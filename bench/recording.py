@@ -0,0 +1,89 @@
+# bench/recording.py
+"""Main-loop cost of recording a frame, and what short recordings leave behind.
+
+Times Recorder.capture() of a window-sized surface on the caller's thread
+(the encoder runs on the worker) and fails (exit status 1) when a capture
+costs more than LIMIT_MS. Also fails unless an animated PNG with no frames
+raises and leaves no file (a PNG needs at least one image), a recording
+stopped before any frame leaves nothing either, and a one-frame recording
+loads back as the frame it captured.
+
+Run from the repository root:  python -m bench.recording [frames]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from png_writer import APNGWriter
+from recorder import Recorder
+
+SIZE = (1280, 720)
+LIMIT_MS = 4.0
+
+
+def check_short_recordings(folder):
+    """Problems with empty and one-frame animated PNGs, as messages."""
+    problems = []
+    path = os.path.join(folder, "empty-writer.png")
+    try:
+        APNGWriter(path, *SIZE).close()
+        problems.append("APNGWriter.close() with no frames did not raise")
+    except ValueError:
+        pass
+    if os.path.exists(path):
+        problems.append(f"APNGWriter with no frames left {path}")
+
+    path = os.path.join(folder, "empty.png")
+    Recorder(path, SIZE).close()
+    if os.path.exists(path):
+        problems.append(f"a recording with no frames left {path}")
+
+    path = os.path.join(folder, "one.png")
+    frame = pygame.Surface(SIZE)
+    frame.fill((40, 90, 200))
+    pygame.draw.circle(frame, (250, 200, 20), (400, 300), 120)
+    with Recorder(path, SIZE, block=True) as recorder:
+        recorder.capture(frame)
+    loaded = pygame.image.load(path)
+    if pygame.image.tobytes(loaded, "RGB") != pygame.image.tobytes(frame, "RGB"):
+        problems.append("a one-frame recording does not load back as its frame")
+    return problems
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    frames = int(argv[0]) if argv else 120
+    pygame.init()
+    screen = pygame.display.set_mode(SIZE)
+    with tempfile.TemporaryDirectory() as folder:
+        problems = check_short_recordings(folder)
+
+        recorder = Recorder(os.path.join(folder, "live.png"), SIZE)
+        worst = total = 0.0
+        for i in range(frames):
+            screen.fill((i % 256, 40, 80))
+            start = time.perf_counter()
+            recorder.capture(screen)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            worst, total = max(worst, elapsed), total + elapsed
+            time.sleep(1 / 60)
+        recorder.close()
+    pygame.quit()
+
+    print(f"capture {SIZE[0]}x{SIZE[1]}: mean {total / frames:.2f} ms, worst {worst:.2f} ms, "
+          f"{recorder.frames} queued, {recorder.dropped} dropped")
+    if total / frames > LIMIT_MS:
+        problems.append(f"capture takes {total / frames:.2f} ms on the main loop, over {LIMIT_MS} ms")
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench/spatial_hash.py
+"""Cost of one crackle neighbour query per spark, from 1k to 100k sparks.
+
+Sparks are scattered at a fixed density (about what a busy show leaves
+on screen), indexed in a SpatialHash and queried for every pair closer
+than CRACKLE_RADIUS, as forces.Forces does each step. Small sets are
+checked against the all-pairs answer; the cost per spark must stay
+flat as the count grows, i.e. the query is O(n), not O(n^2). It is
+compared from 10k sparks up: at 1k the fixed cost of the NumPy calls
+dominates.
+
+Run from the repository root:  python -m bench.spatial_hash [repeats]
+"""
+import sys
+import time
+import numpy as np
+
+from forces import CRACKLE_RADIUS
+from spatial_hash import SpatialHash
+
+DENSITY = 0.02          # sparks per square pixel
+COUNTS = (1000, 10000, 30000, 100000)
+MAX_GROWTH = 1.3        # allowed rise in cost per spark from 10k to the largest set
+
+
+def scatter(n, rng):
+    side = np.sqrt(n / DENSITY)
+    return rng.uniform(0, side, (n, 2)).astype(np.float32)
+
+
+def brute_force(pos, radius):
+    d = pos[:, None] - pos[None]
+    i, j = np.nonzero(np.triu(np.einsum("ijk,ijk->ij", d, d) < radius * radius, 1))
+    return sorted(zip(i.tolist(), j.tolist()))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repeats = int(argv[0]) if argv else 10
+    rng = np.random.default_rng(0)
+
+    for n in (2, 50, 2000):
+        pos = scatter(n, rng)
+        i, j = SpatialHash(CRACKLE_RADIUS).build(pos).pairs(CRACKLE_RADIUS)
+        found = sorted((min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist()))
+        assert found == brute_force(pos, CRACKLE_RADIUS), f"wrong pairs for {n} sparks"
+
+    per_spark = []
+    for n in COUNTS:
+        pos = scatter(n, rng)
+        grid = SpatialHash(CRACKLE_RADIUS)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            i, _ = grid.build(pos).pairs(CRACKLE_RADIUS)
+            best = min(best, time.perf_counter() - start)
+        per_spark.append(best / n)
+        print(f"{n:>7} sparks  {best * 1000:8.2f} ms  {best / n * 1e9:6.0f} ns/spark  {len(i):>7} pairs")
+    growth = per_spark[-1] / per_spark[1]
+    assert growth < MAX_GROWTH, f"cost per spark grew {growth:.2f}x from {COUNTS[1]} to {COUNTS[-1]} sparks"
+
+
+if __name__ == "__main__":
+    main()
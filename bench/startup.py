@@ -0,0 +1,99 @@
+# bench/startup.py
+"""Time from a cold interpreter to the first menu frame, and where it goes.
+
+Each run starts a fresh `python -X importtime` child that imports main,
+builds the SceneManager and MenuScene and draws one menu frame, exactly
+as `python main.py` does before the first input arrives. The first run
+uses an empty cache directory, so it includes the one-time system font
+lookup; the later runs reuse the font cache, as every start after the
+first does. Import times are reported per module imported directly by
+main. Fails if the menu pulled in moderngl or a scene module before its
+first frame.
+
+Run from the repository root:  python -m bench.startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import main
+imported = time.perf_counter()
+manager = main.SceneManager()
+menu = main.MenuScene(manager)
+manager.activate(menu)
+loaded = sorted(m for m in ("moderngl", "render_context", "fireworks", "fractal", "kaleidoscope",
+                            "mandala_art", "interactive_drawing") if m in sys.modules)
+manager.frame(0.0)
+drawn = time.perf_counter()
+print(json.dumps({"import": imported - start, "setup": drawn - imported, "total": drawn - start,
+                  "loaded": loaded}))
+"""
+
+
+def parse_importtime(stderr, parent="main"):
+    """{module: cumulative seconds} for the modules parent imports directly."""
+    children, found = [], {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue                            # header line
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 1:
+            children.append((name, int(cumulative) / 1e6))
+        elif depth == 0:
+            if name == parent:
+                found = dict(children)
+            children = []
+    return found
+
+
+def run_once(cache_dir):
+    env = dict(os.environ, XDG_CACHE_HOME=cache_dir, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], env=env,
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall"] = wall
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    runs = int(argv[0]) if argv else 5
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = [run_once(cache_dir) for _ in range(runs)]
+    cold, warm = results[0], results[1:] or results
+
+    def mean(key):
+        return sum(r[key] for r in warm) / len(warm) * 1000
+
+    print(f"cold font cache: first menu frame after {cold['total'] * 1000:.0f} ms "
+          f"(setup {cold['setup'] * 1000:.0f} ms)")
+    print(f"warm font cache: first menu frame after {mean('total'):.0f} ms "
+          f"(imports {mean('import'):.0f} ms, setup + first frame {mean('setup'):.0f} ms), "
+          f"process wall {mean('wall'):.0f} ms, over {len(warm)} runs")
+    print("imports made by main (cumulative, warm runs):")
+    names = {name for r in warm for name in r["imports"]}
+    rows = sorted(((sum(r["imports"].get(n, 0) for r in warm) / len(warm), n) for n in names), reverse=True)
+    for seconds, name in rows:
+        print(f"  {name:<24} {seconds * 1000:7.1f} ms")
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    print(f"GL / scene modules loaded before the first frame: {loaded or 'none'}")
+    assert not loaded, f"menu imported {loaded} before its first frame"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# bench/suite.py
+"""Deterministic benchmark of all five visuals, compared against a stored baseline.
+
+Each workload drives a real Scene the way the main loop does, but with no
+window: the SDL dummy video driver for pygame, and the standalone (EGL /
+llvmpipe when there is no GPU) context from offscreen.create_context()
+for the shader scenes. `random` and the particle pool are seeded, every
+update uses the same DT, and the input is scripted, so two runs do the
+same work and draw the same pixels.
+
+  fireworks      BURSTS simultaneous bursts, then FIREWORK_FRAMES frames of update + render
+  drawing-stroke long brush strokes, one per op, fed as motion events
+  drawing-fill   bucket fills alternating colours at fixed points
+  mandala        every mode x FOLDS, a few frames each
+  fractal        ZOOM_STEPS x8 zoom steps into Seahorse Valley (perturbation path, scale ~1e-7)
+  kaleidoscope   KALEIDOSCOPE_FRAMES frames
+
+Each workload runs --repeat times and reports its op count, best
+throughput (ops per second) and best p50/p95/p99 latency per op, plus a
+checksum of the last frame: repeats must match it exactly, and a
+different checksum from the baseline means the workload (or GL driver)
+changed. Results are printed as JSON. With a
+baseline, any workload whose p50 or p95 is more than --tolerance slower
+fails the run; --save writes the current results as the new baseline.
+Baselines are per machine, so none is kept in the repo.
+
+Run from the repository root:  python -m bench.suite [--only NAME ...] [--baseline PATH] [--save PATH] [--out PATH]
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from profiler import percentile
+
+SEED = 1234
+DT = 1.0 / 60.0
+TOLERANCE = 0.25
+REPEATS = 3
+
+BURSTS = 40
+FIREWORK_FRAMES = 240
+STROKES = 20
+STROKE_POINTS = 400
+FILLS = 30
+MODES = (1, 2, 3, 4)
+FOLDS = (6, 12, 24, 48)
+MANDALA_FRAMES = 3
+ZOOM_CENTER = ("-0.743643887037158704752191506114774", "0.131825904205311970493132056385139")
+ZOOM_FACTOR = 8.0
+ZOOM_STEPS = 8          # deeper steps raise the iteration budget; seconds each on llvmpipe
+KALEIDOSCOPE_FRAMES = 60
+
+WORKLOADS = {}
+
+
+def workload(name):
+    def register(fn):
+        WORKLOADS[name] = fn
+        return fn
+    return register
+
+
+def checksum(surface):
+    return hashlib.sha1(pygame.image.tobytes(surface, "RGB")).hexdigest()[:16]
+
+
+def timed(op):
+    start = time.perf_counter()
+    op()
+    return time.perf_counter() - start
+
+
+def post(scene, kind, **attrs):
+    scene.handle_event(pygame.event.Event(kind, **attrs))
+
+
+def start(scene):
+    """init() and enter() a scene the way SceneManager.activate() does. Returns its screen."""
+    random.seed(SEED)
+    scene.init()
+    scene.ready = True
+    scene.enter()
+    return pygame.Surface(scene.size)
+
+
+# -----------------------------
+#  WORKLOADS
+# -----------------------------
+@workload("fireworks")
+def bench_fireworks():
+    from fireworks import FireworksScene, Firework, COLORS, WIDTH, HEIGHT
+    scene = FireworksScene(sound=False, seed=SEED, trails=True)     # the heavier path, as baselined
+    screen = start(scene)
+    for _ in range(BURSTS):
+        Firework(random.uniform(100, WIDTH - 100), random.uniform(120, HEIGHT - 250),
+                 random.choice(COLORS), random.uniform(1.3, 1.6)).explode(scene.pool)
+
+    def frame():
+        scene.update(DT)
+        scene.render(screen)
+    times = [timed(frame) for _ in range(FIREWORK_FRAMES)]
+    scene.exit()
+    scene.release()
+    return times, checksum(screen)
+
+
+def drawing_scene():
+    from interactive_drawing import DrawingScene
+    scene = DrawingScene()
+    screen = start(scene)
+    scene.render(screen)
+    return scene, screen
+
+
+@workload("drawing-stroke")
+def bench_drawing_stroke():
+    scene, screen = drawing_scene()
+    rng = random.Random(SEED)
+    w, h = screen.get_size()
+
+    def stroke():
+        x, y = rng.randrange(w), rng.randrange(80, h)
+        post(scene, pygame.MOUSEBUTTONDOWN, pos=(x, y), button=1)
+        for _ in range(STROKE_POINTS):
+            x = min(w - 1, max(0, x + rng.randint(-15, 15)))
+            y = min(h - 1, max(61, y + rng.randint(-15, 15)))
+            post(scene, pygame.MOUSEMOTION, pos=(x, y), rel=(0, 0), buttons=(1, 0, 0))
+        post(scene, pygame.MOUSEBUTTONUP, pos=(x, y), button=1)
+        scene.update(DT)
+        scene.render(screen)
+    times = [timed(stroke) for _ in range(STROKES)]
+    scene.exit()
+    return times, checksum(scene.canvas)
+
+
+@workload("drawing-fill")
+def bench_drawing_fill():
+    from interactive_drawing import COLORS
+    scene, screen = drawing_scene()
+    rng = random.Random(SEED)
+    w, h = screen.get_size()
+    # a maze of circles and lines so the fills have edges to follow
+    for _ in range(60):
+        post(scene, pygame.MOUSEBUTTONDOWN, pos=(rng.randrange(w), rng.randrange(80, h)), button=1)
+        post(scene, pygame.MOUSEMOTION, pos=(rng.randrange(w), rng.randrange(80, h)), rel=(0, 0), buttons=(1, 0, 0))
+        post(scene, pygame.MOUSEBUTTONUP, pos=(rng.randrange(w), rng.randrange(80, h)), button=1)
+    post(scene, pygame.KEYDOWN, key=pygame.K_b, mod=0, unicode="b", scancode=0)
+    points = [(rng.randrange(w), rng.randrange(80, h)) for _ in range(8)]
+
+    def fill(point, color):
+        scene.current_color = color
+        post(scene, pygame.MOUSEBUTTONDOWN, pos=point, button=1)
+        post(scene, pygame.MOUSEBUTTONUP, pos=point, button=1)
+        scene.update(DT)
+        scene.render(screen)
+    times = [timed(lambda i=i: fill(points[i % len(points)], COLORS[i % len(COLORS)])) for i in range(FILLS)]
+    scene.exit()
+    return times, checksum(scene.canvas)
+
+
+@workload("mandala")
+def bench_mandala():
+    from mandala_art import MandalaScene
+    scene = MandalaScene(quality=1.0)   # full resolution every frame, so checksums repeat
+    screen = start(scene)
+    times = []
+    for mode in MODES:
+        for folds in FOLDS:
+            scene.mode, scene.folds = mode, folds
+
+            def frame():
+                scene.update(DT)
+                scene.render(screen)
+            times += [timed(frame) for _ in range(MANDALA_FRAMES)]
+    scene.exit()
+    return times, checksum(screen)
+
+
+@workload("fractal")
+def bench_fractal():
+    from fractal import FractalScene, DeepZoom, WIDTH, HEIGHT
+    scene = FractalScene(quality=1.0)
+    screen = start(scene)
+    scene.zoom.release()
+    scene.zoom = DeepZoom((WIDTH, HEIGHT), center=ZOOM_CENTER, scale=1.5)
+
+    def step():
+        scene.zoom.zoom_at(WIDTH / 2, HEIGHT / 2, ZOOM_FACTOR)
+        scene.update(DT)
+        scene.render(screen)
+    times = [timed(step) for _ in range(ZOOM_STEPS)]
+    scene.exit()
+    return times, checksum(screen)
+
+
+@workload("kaleidoscope")
+def bench_kaleidoscope():
+    from kaleidoscope import KaleidoscopeScene
+    scene = KaleidoscopeScene()
+    screen = start(scene)
+
+    def frame():
+        scene.update(DT)
+        scene.render(screen)
+    times = [timed(frame) for _ in range(KALEIDOSCOPE_FRAMES)]
+    scene.exit()
+    return times, checksum(screen)
+
+
+# -----------------------------
+#  REPORT
+# -----------------------------
+def summarize(times, digest):
+    total = sum(times)
+    return {"ops": len(times), "seconds": round(total, 4),
+            "throughput": round(len(times) / total, 2) if total else 0.0,
+            "p50_ms": round(percentile(times, 50) * 1000, 3),
+            "p95_ms": round(percentile(times, 95) * 1000, 3),
+            "p99_ms": round(percentile(times, 99) * 1000, 3),
+            "checksum": digest}
+
+
+def best(runs):
+    """Best of each statistic over repeated runs, as timeit does; the rest is noise."""
+    digests = {run["checksum"] for run in runs}
+    if len(digests) != 1:
+        print(f"repeats drew different pixels: {sorted(digests)}", file=sys.stderr)
+        sys.exit(1)
+    result = dict(runs[0], repeats=len(runs))
+    for key in ("seconds", "p50_ms", "p95_ms", "p99_ms"):
+        result[key] = min(run[key] for run in runs)
+    result["throughput"] = max(run["throughput"] for run in runs)
+    return result
+
+
+def environment():
+    env = {"python": platform.python_version(), "pygame": pygame.version.ver, "machine": platform.machine()}
+    if "render_context" in sys.modules:
+        info = sys.modules["render_context"].get().ctx.info
+        env["gl_renderer"] = info.get("GL_RENDERER")
+    return env
+
+
+def compare(results, baseline, tolerance):
+    """Human-readable regressions against baseline (empty when there are none)."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base:
+            continue
+        if base.get("checksum") != result["checksum"]:
+            print(f"note: {name} drew different pixels than the baseline; the workload or driver changed")
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] > base[key] * (1.0 + tolerance):
+                regressions.append(f"{name} {key} {result[key]:.2f} vs baseline {base[key]:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(WORKLOADS), help="run just these workloads")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save", metavar="PATH", help="write these results as a baseline")
+    parser.add_argument("--out", help="also write the JSON results here")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a workload counts as a regression (default 0.25)")
+    parser.add_argument("--repeat", type=int, default=REPEATS, help="runs per workload, best kept (default 3)")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    pygame.display.set_mode((950, 600))     # the drawing board shows and hides the mouse
+    results = {}
+    for name in args.only or WORKLOADS:
+        results[name] = best([summarize(*WORKLOADS[name]()) for _ in range(args.repeat)])
+        print(f"{name:<15} {results[name]['throughput']:9.1f} ops/s  p50 {results[name]['p50_ms']:8.2f} ms  "
+              f"p95 {results[name]['p95_ms']:8.2f} ms", file=sys.stderr)
+    report = {"environment": environment(), "seed": SEED, "dt": DT, "workloads": results}
+    if "render_context" in sys.modules:
+        sys.modules["render_context"].release()
+    pygame.quit()
+
+    text = json.dumps(report, indent=1)
+    print(text)
+    for path in filter(None, (args.out, args.save)):
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("regression:", line, file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} workload(s) slower than the baseline", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
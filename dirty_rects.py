@@ -0,0 +1,99 @@
+# dirty_rects.py
+import numpy as np
+import pygame
+
+MAX_RECTS = 48          # past this many regions one full-screen update is cheaper
+FULL_FRACTION = 0.6     # ... and likewise once they cover this much of the screen
+CELL = 64               # grid used to turn point clouds into a few rects
+
+
+def merge_rects(rects):
+    """Union overlapping rects until none of the results overlap."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+class DirtyRects:
+    """Screen regions that changed since the last present().
+
+    Loops add the rects they drew into (or need erased), repaint just
+    regions(), and present() pushes those to the display with
+    pygame.display.update(rects) instead of flipping the whole window.
+    An empty tracker means nothing on screen changed, which lets a loop
+    block on events instead of spinning.
+    """
+
+    def __init__(self, size, full=True):
+        self.bounds = pygame.Rect((0, 0), size)
+        self.rects = []
+        self.everything = full      # by default the first frame draws the whole screen
+
+    def __bool__(self):
+        return self.everything or bool(self.rects)
+
+    def resize(self, size):
+        self.bounds = pygame.Rect((0, 0), size)
+        self.full()
+
+    def full(self):
+        """Redraw the whole screen next frame (resize, returning from a module...)."""
+        self.everything = True
+
+    def add(self, rect, offset=(0, 0)):
+        """Mark rect dirty, optionally shifted by offset (e.g. canvas to screen)."""
+        if not rect:
+            return
+        rect = pygame.Rect(rect).move(offset).clip(self.bounds)
+        if rect.width > 0 and rect.height > 0:
+            self.rects.append(rect)
+
+    def add_points(self, xs, ys, margin, cell=CELL):
+        """Mark the grid cells holding any of the points, grown by margin pixels."""
+        w, h = self.bounds.size
+        keep = (xs > -margin) & (xs < w + margin) & (ys > -margin) & (ys < h + margin)
+        if not keep.any():
+            return
+        cols, rows = -(-w // cell), -(-h // cell)
+        cx = np.clip(xs[keep], 0, w - 1).astype(np.int32) // cell
+        cy = np.clip(ys[keep], 0, h - 1).astype(np.int32) // cell
+        occupied = np.bincount(cy * cols + cx, minlength=cols * rows)
+        for index in np.flatnonzero(occupied).tolist():
+            y, x = divmod(index, cols)
+            self.add(pygame.Rect(x * cell - margin, y * cell - margin, cell + 2 * margin, cell + 2 * margin))
+
+    def regions(self):
+        """The rects to repaint this frame, merged, or the whole screen."""
+        if self.everything:
+            return [self.bounds.copy()]
+        merged = merge_rects(self.rects)
+        area = sum(r.width * r.height for r in merged)
+        if len(merged) > MAX_RECTS or area > FULL_FRACTION * self.bounds.width * self.bounds.height:
+            return [self.bounds.copy()]
+        return merged
+
+    def take(self):
+        """regions(), then start a new frame. For callers that present the rects themselves."""
+        regions = self.regions()
+        self.rects = []
+        self.everything = False
+        return regions
+
+    def present(self, regions=None):
+        """Push the dirty regions to the display and start a new frame."""
+        if regions is None:
+            regions = self.regions()
+        if regions:
+            pygame.display.update(regions)
+        self.rects = []
+        self.everything = False
+        return regions
@@ -1,206 +1,394 @@
 # fireworks.py
 import pygame
 import random
-import math
+import numpy as np
+import audio
+from particles import ParticlePool, STEP, TRAIL
+from forces import Forces
+from particle_renderer import RENDERERS, AdditiveRenderer, pick_renderer
+from trails import TrailBuffer
+from dirty_rects import DirtyRects, merge_rects
+from scene import Scene, run_standalone
 
 WIDTH, HEIGHT = 900, 600
-
-# -----------------------------
-#  PARTICLE CLASS
-# -----------------------------
-class Particle:
-    def __init__(self, x, y, color, power):
-        self.x = x
-        self.y = y
-        self.base_color = color
-        self.color = color
-        self.radius = random.randint(2, 4)
-        self.life = 480  # ~5 seconds at 60fps
-        self.age = 0
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(2.5, 6) * power
-        self.vx = math.cos(angle) * speed
-        self.vy = math.sin(angle) * speed
-        self.gravity = 0.07
-
-    def update(self):
-        # physics
-        self.vx *= 0.99
-        self.vy *= 0.99
-        self.vy += self.gravity
-        self.x += self.vx
-        self.y += self.vy
-        self.age += 1
-
-        # nonlinear fade curve
-        fade_factor = 1 - (self.age / 480) ** 2.2
-        self.life = max(0, 480 * fade_factor)
-
-        # shrink radius for realism
-        self.radius = max(1, self.radius - 0.01)
-
-        # color shift toward white as it burns out
-        r, g, b = self.base_color
-        t = min(1.0, self.age / 480)
-        self.color = (
-            int(r + (255 - r) * t * 0.6),
-            int(g + (255 - g) * t * 0.6),
-            int(b + (255 - b) * t * 0.6),
-        )
-
-    def draw(self, screen):
-        if self.life > 0:
-            alpha = int(max(0, min(255, self.life)))
-            surface = pygame.Surface((self.radius * 4, self.radius * 4), pygame.SRCALPHA)
-            pygame.draw.circle(
-                surface,
-                (*self.color, alpha),
-                (self.radius * 2, self.radius * 2),
-                int(self.radius),
-            )
-            screen.blit(surface, (self.x - self.radius * 2, self.y - self.radius * 2))
-
+BACKGROUND = (5, 5, 25)
+GLOW = (20, 20, 40, 40)
+SPARK_MARGIN = 6        # covers the largest spark radius around its centre
+MAX_FRAME_TIME = 0.25   # longer frames (a stall, a dragged window) are not caught up
+LAUNCH_INTERVAL = 0.5   # seconds between rockets in render_frames() when no schedule is given
+TRAIL_ALPHA = 0.5       # opacity of a spark's motion trail right behind it, fading to 0
+LAUNCH_PRIORITY = 0     # voice stealing: a burst may cut a launch, never the reverse
+EXPLODE_PRIORITY = 1
+TRAIL_DOTS = 2          # dots per step of trail, so fast sparks leave lines rather than dotted ones
+WHITE = np.array([255, 255, 255], dtype=np.uint8)
 
 # -----------------------------
 #  ROCKET CLASS
 # -----------------------------
 class Rocket:
-    def __init__(self, x, color, launch_sound=None):
+    def __init__(self, x, color, sounds=None, y=HEIGHT, trails=None):
         self.x = x
-        self.y = HEIGHT
+        self.y = self.prev_y = y
         self.vy = random.uniform(-8, -10)  # slower launch
         self.color = color
         self.exploded = False
-        self.trail = []
+        self.trails = trails if trails is not None else TrailBuffer(1)
+        self.slot = self.trails.acquire()   # the last TRAIL_LENGTH positions, drawn as dots
         self.height_to_explode = random.randint(180, 280)
-        if launch_sound:
-            launch_sound.play()
+        if sounds:
+            sounds.play("launch", x, LAUNCH_PRIORITY)
 
     def update(self):
+        """Advance one STEP. Returns True once the rocket has burst."""
         if not self.exploded:
-            self.trail.append((self.x, self.y))
-            if len(self.trail) > 15:
-                self.trail.pop(0)
+            self.prev_y = self.y
+            self.trails.push(self.slot, (self.x, self.y))
             self.y += self.vy
             self.vy += 0.08
             if self.vy >= 0 or self.y < self.height_to_explode:
                 self.exploded = True
         return self.exploded
 
-    def draw(self, screen):
-        for tx, ty in self.trail:
-            pygame.draw.circle(screen, (255, 255, 255), (int(tx), int(ty)), 2)
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 4)
+    def release(self):
+        self.trails.release(self.slot)
+
+    def bounds(self):
+        """Screen rect covering the trail and the rocket head."""
+        left, top, right, bottom = self.trails.bounds(self.slot) or (self.x, self.y, self.x, self.y)
+        left, top = int(min(left, self.x)) - 5, int(min(top, self.y)) - 5
+        right, bottom = int(max(right, self.x)) + 6, int(max(bottom, self.y)) + 6
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def draw(self, screen, alpha=1.0):
+        """Draw the head alpha of the way from the previous step (always inside bounds()).
+
+        The trail is drawn for all rockets at once by draw_trails().
+        """
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        pygame.draw.circle(screen, self.color, (int(self.x), int(y)), 4)
+
+
+def draw_trails(screen, trails, rockets, splat):
+    """Every rocket's trail as white dots, in one batched splat."""
+    if not rockets:
+        return
+    slots = np.fromiter((r.slot for r in rockets), dtype=np.intp, count=len(rockets))
+    pts = trails.points[slots][np.arange(trails.length) < trails.filled[slots, None]]    # slots fill from 0
+    n = len(pts)
+    splat(screen, pts, np.full(n, 2.0, dtype=np.float32), np.broadcast_to(WHITE, (n, 3)),
+          np.full(n, 255, dtype=np.uint8))
 
 
 # -----------------------------
 #  FIREWORK CLASS
 # -----------------------------
 class Firework:
-    def __init__(self, x, y, color, power=1.4, explode_sound=None):
+    def __init__(self, x, y, color, power=1.4, sounds=None):
         self.x = x
         self.y = y
         self.color = color
-        self.particles = []
         self.exploded = False
         self.power = power
-        self.explode_sound = explode_sound
+        self.sounds = sounds    # an audio.Audio
 
-    def explode(self):
+    def explode(self, pool):
+        """Emit this burst's sparks into the shared particle pool."""
         if not self.exploded:
-            for _ in range(random.randint(130, 180)):
-                self.particles.append(Particle(self.x, self.y, self.color, self.power))
+            pool.emit(self.x, self.y, self.color, self.power, random.randint(130, 180))
             self.exploded = True
-            if self.explode_sound:
-                self.explode_sound.play()
-
-    def update(self):
-        if self.exploded:
-            for p in self.particles[:]:
-                p.update()
-                if p.life <= 0:
-                    self.particles.remove(p)
-
-    def draw(self, screen):
-        if self.exploded:
-            for p in self.particles:
-                p.draw(screen)
+            if self.sounds:
+                self.sounds.play("explode", self.x, EXPLODE_PRIORITY)
 
 
 # -----------------------------
-#  MAIN FUNCTION
+#  SCENE
 # -----------------------------
-def run_fireworks():
-    pygame.init()
-    pygame.mixer.init()
-
-    # ✅ Save current display (main menu)
-    old_screen = pygame.display.get_surface()
-    old_size = old_screen.get_size() if old_screen else (900, 600)
-
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Fireworks")
-    clock = pygame.time.Clock()
-
-    # Sounds
-    launch_sound = pygame.mixer.Sound("launch.mp3")
-    explode_sound = pygame.mixer.Sound("explode.mp3")
-
-    fireworks = []
-    rockets = []
-    colors = [
-        (255, 120, 50),
-        (255, 255, 120),
-        (100, 255, 255),
-        (255, 80, 200),
-        (120, 200, 255),
-        (255, 50, 100),
-        (200, 255, 100),
-    ]
-
-    running = True
-    while running:
-        screen.fill((5, 5, 25))
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or (
-                event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
-            ):
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                x, _ = pygame.mouse.get_pos()
-                rockets.append(Rocket(x, random.choice(colors), launch_sound))
-
-        for r in rockets[:]:
+COLORS = [
+    (255, 120, 50),
+    (255, 255, 120),
+    (100, 255, 255),
+    (255, 80, 200),
+    (120, 200, 255),
+    (255, 50, 100),
+    (200, 255, 100),
+]
+
+class FireworksScene(Scene):
+    """Rockets and sparks simulated at a fixed rate, whatever the frame rate.
+
+    update(dt) turns real time into show time (scaled by speed) and runs
+    the simulation in whole STEPs of it; the step count is derived from the
+    total show time, so rounding never accumulates into drift over a long
+    show. render() interpolates between the last two steps by the leftover
+    fraction. A slow frame therefore drops frames, not simulated time, and
+    a show stays in sync with its music at 30, 60 or 144 fps.
+
+    forces (a forces.Forces) adds wind, ground bounce and crackle, toggled
+    with W, B and C; holding the right mouse button pulls sparks toward
+    the pointer. trails draws each spark's last TRAIL positions behind it,
+    fading out (T); it is off unless asked for, as the dots cost about
+    twice what the sparks themselves do.
+    """
+    title = "Fireworks"
+    caption = "Fireworks"
+    size = (WIDTH, HEIGHT)
+
+    def __init__(self, renderer="auto", speed=1.0, sound=True, seed=None, forces=None, trails=False):
+        super().__init__()
+        self.renderer = renderer
+        self.speed = speed      # show seconds per real second
+        self.sound = sound
+        self.seed = seed
+        self.forces = forces or Forces()
+        self.trails = trails
+
+    def init(self):
+        # Sounds: decoded once, played through a pool of panned voices (silent without sound)
+        if self.sound:
+            self.audio = audio.get(self.size[0])
+        else:
+            self.audio = audio.Audio(audio.NullBackend(audio.VOICES), width=self.size[0])
+        self.audio.load("launch")
+        self.audio.load("explode")
+        self.pool = ParticlePool(seed=self.seed)
+        # "auto": GL points on a hardware GPU, the NumPy splat otherwise (pixel-identical)
+        self.particle_renderer = RENDERERS[pick_renderer() if self.renderer == "auto" else self.renderer]()
+        self.splatter = AdditiveRenderer()      # trails, whichever renderer draws the sparks
+        # dot k of a trail sits (k + 1) / TRAIL_DOTS steps behind the spark and fades with that age
+        age = np.arange(1, TRAIL * TRAIL_DOTS + 1, dtype=np.float32) / TRAIL_DOTS
+        self.trail_fade = TRAIL_ALPHA * (1.0 - age / (TRAIL + 1))
+        self.trail_step = np.arange(1, TRAIL_DOTS + 1, dtype=np.float32)[:, None] / TRAIL_DOTS
+        self.trail_back = np.arange(1, TRAIL + 1)                   # steps back of each trail point
+        self.trail_order = np.repeat(np.arange(TRAIL), TRAIL_DOTS)  # trail point each dot leads to
+        self.trail_scratch = None
+        self.glow = pygame.Surface(self.size, pygame.SRCALPHA)   # built once, blitted per region
+        self.glow.fill(GLOW)
+
+    def release(self):
+        release = getattr(self.particle_renderer, "release", None)     # GL renderers hold GL objects
+        if release:
+            release()
+
+    def enter(self):
+        self.pool.clear()
+        self.rockets = []
+        self.rocket_trails = TrailBuffer()
+        self.show_time = 0.0    # seconds simulated so far
+        self.steps = 0
+        self.alpha = 1.0        # how far the display is between the last two steps
+        self.dirty = DirtyRects(self.size)
+        self.drawn = []      # regions holding sprites last frame, erased this frame
+
+    def idle(self):
+        # nothing on screen is moving and nothing is waiting to be drawn
+        return not self.dirty and not self.rockets and self.pool.count == 0 and not self.drawn
+
+    def invalidate(self):
+        self.dirty.full()
+
+    def stats(self):
+        stats = {"particles": self.pool.count, "rockets": len(self.rockets), "crackles": self.forces.crackles}
+        stats.update(self.audio.stats())
+        return stats
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        forces = self.forces
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            x, _ = pygame.mouse.get_pos()
+            self.launch(x)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            forces.attractor = event.pos
+        elif event.type == pygame.MOUSEMOTION and forces.attractor is not None:
+            forces.attractor = event.pos
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+            forces.attractor = None
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_w:
+            forces.wind = not forces.wind
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_b:
+            forces.bounce = not forces.bounce
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+            forces.crackle = not forces.crackle
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+            self.trails = not self.trails
+
+    def launch(self, x):
+        self.rockets.append(Rocket(x, random.choice(COLORS), self.audio, self.size[1], self.rocket_trails))
+
+    def update(self, dt):
+        self.advance(min(dt, MAX_FRAME_TIME) * self.speed)
+
+    def advance(self, seconds):
+        """Run the show forward by seconds, in whole STEPs; the remainder is interpolated."""
+        self.show_time += seconds
+        due = int(self.show_time / STEP + 1e-6)
+        while self.steps < due:
+            self.step()
+        self.alpha = min(1.0, max(0.0, self.show_time / STEP - self.steps))
+
+    def step(self):
+        for r in self.rockets[:]:
             if r.update():
-                rockets.remove(r)
-                fw = Firework(r.x, r.y, r.color, random.uniform(1.3, 1.6), explode_sound)
-                fw.explode()
-                fireworks.append(fw)
-            else:
-                r.draw(screen)
+                self.rockets.remove(r)
+                r.release()
+                fw = Firework(r.x, r.y, r.color, random.uniform(1.3, 1.6), self.audio)
+                fw.explode(self.pool)
+        self.forces.accelerate(self.pool, self.steps * STEP)
+        self.pool.update()
+        self.forces.collide(self.pool, self.size[1] - 1)
+        self.steps += 1
+
+    def render(self, screen):
+        pool, dirty = self.pool, self.dirty
+        # repaint where sprites were last frame and where they are now
+        sprites = DirtyRects(self.size, full=False)
+        for r in self.rockets:
+            sprites.add(r.bounds())
+        pos = pool.positions(self.alpha)
+        sprites.add_points(pos[:, 0], pos[:, 1], SPARK_MARGIN)
+        trail = self.spark_trails() if self.trails else None
+        if trail is not None:
+            sprites.add_points(trail[0][:, 0], trail[0][:, 1], 1)
+        for rect in self.drawn:
+            dirty.add(rect)
+        self.drawn = merge_rects(sprites.rects)
+        for rect in self.drawn:
+            dirty.add(rect)
+        regions = dirty.take()
+
+        for rect in regions:
+            screen.fill(BACKGROUND, rect)
+        draw_trails(screen, self.rocket_trails, self.rockets, self.splatter.splat)
+        for r in self.rockets:
+            r.draw(screen, self.alpha)
+        if trail is not None:
+            self.splatter.dots(screen, *trail)
+        self.particle_renderer.draw(screen, pool, pos)
+        for rect in regions:
+            screen.blit(self.glow, rect, rect)
+        return regions
 
-        for fw in fireworks[:]:
-            fw.update()
-            fw.draw(screen)
-            if fw.exploded and len(fw.particles) == 0:
-                fireworks.remove(fw)
+    def spark_trails(self):
+        """(pos, colours, alpha) of the dots tracing every spark's recent path, fading with age.
 
-        # glow overlay
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        pygame.draw.rect(overlay, (20, 20, 40, 40), (0, 0, WIDTH, HEIGHT))
-        screen.blit(overlay, (0, 0))
+        The path runs from the spark's last step back through its TRAIL
+        recorded positions, with TRAIL_DOTS dots spaced along each step.
+        The rings are read in place and every intermediate goes into
+        scratch arrays kept from frame to frame; only the visible dots
+        are gathered out, by index.
+        """
+        pool = self.pool
+        n = pool.count
+        trail = pool.trail
+        if self.trail_scratch is None or len(self.trail_scratch[0]) < n:
+            cap = pool.capacity
+            self.trail_scratch = (np.empty((cap, TRAIL), dtype=np.intp),
+                                  np.empty((cap, TRAIL + 1, 2), dtype=np.float32),
+                                  np.empty((cap, TRAIL, TRAIL_DOTS, 2), dtype=np.float32),
+                                  np.empty((cap, TRAIL * TRAIL_DOTS), dtype=np.float32),
+                                  np.empty((cap, TRAIL * TRAIL_DOTS), dtype=bool),
+                                  np.empty((cap, TRAIL * TRAIL_DOTS), dtype=bool))
+        index, path, dots, alpha, valid, lit = (a[:n] for a in self.trail_scratch)
 
-        pygame.display.flip()
-        clock.tick(60)
+        # flat index of the point k + 1 steps back: (head - 1 - k) % TRAIL within the spark's ring
+        np.subtract(trail.head[:n, None], self.trail_back, out=index)
+        np.mod(index, TRAIL, out=index)
+        index += trail.rows[:n, None] * TRAIL
+        path[:, 0] = pool.pos[:n]
+        np.take(trail.points.reshape(-1, 2), index, axis=0, out=path[:, 1:], mode="clip")
+        ahead = path[:, :-1, None]      # newer end of each step
+        np.subtract(path[:, 1:, None], ahead, out=dots)
+        dots *= self.trail_step
+        dots += ahead
 
-    # ✅ Restore previous (menu) display
-    pygame.display.set_mode(old_size, pygame.RESIZABLE)
-    pygame.display.set_caption("Visual Patterns Simulation")
-    return
+        np.less(self.trail_order, trail.filled[:n, None], out=valid)
+        np.multiply(pool.alpha()[:, None], self.trail_fade, out=alpha)
+        np.greater_equal(alpha, 1.0, out=lit)       # burnt-out sparks leave nothing visible
+        valid &= lit
+        shown = np.flatnonzero(valid)   # one index gather per output beats three boolean masks
+        spark = shown // (TRAIL * TRAIL_DOTS)
+        return dots.reshape(-1, 2).take(shown, axis=0), pool.colors().take(spark, axis=0), alpha.ravel().take(shown)
+
+
+def run_fireworks(renderer="auto", speed=1.0, forces=None, trails=False):
+    run_standalone(FireworksScene(renderer, speed, forces=forces, trails=trails))
+
+
+# -----------------------------
+#  HEADLESS RENDERING
+# -----------------------------
+def render_frames(frames=1, size=(WIDTH, HEIGHT), dt=1.0 / 60.0, start_time=0.0, launches=None,
+                  renderer="additive", out=None, forces=None):
+    """Render a show headlessly into numpy arrays, PNG files when out is a pattern,
+    or one video / animated PNG file otherwise (see recorder.Recorder).
+
+    Frame i shows the show at start_time + i*dt, exactly as the live scene
+    would, but with no clock: it runs as fast as the CPU allows, faster
+    than real time for most sizes. launches is a list of (show seconds, x)
+    rockets; by default one leaves every LAUNCH_INTERVAL seconds at a
+    random x, so seed `random` for a repeatable show. forces is an
+    optional forces.Forces.
+    """
+    import offscreen
+    if launches is None:
+        count = int((start_time + frames * dt) / LAUNCH_INTERVAL) + 1
+        launches = [(i * LAUNCH_INTERVAL, random.uniform(100, size[0] - 100)) for i in range(count)]
+    launches = sorted(launches, reverse=True)
+    scene = FireworksScene(renderer, sound=False, seed=random.getrandbits(32), forces=forces)
+    scene.size = size
+    scene.init()
+    scene.enter()
+    screen = pygame.Surface(size)
+
+    def advance_to(t):
+        # step to each launch on its exact step, then on to t
+        while launches and launches[-1][0] <= t:
+            at, x = launches.pop()
+            scene.advance(max(0.0, at - scene.show_time))
+            scene.launch(x)
+        scene.advance(t - scene.show_time)
+
+    advance_to(start_time)
+    if out and "{" not in out:
+        from recorder import Recorder
+        with Recorder(out, size, fps=round(1.0 / dt, 3), block=True) as recorder:
+            for i in range(frames):
+                advance_to(start_time + i * dt)
+                scene.render(screen)
+                recorder.capture(screen)
+        scene.release()
+        return [recorder.path]
+    results = []
+    for i in range(frames):
+        advance_to(start_time + i * dt)
+        scene.render(screen)
+        image = np.ascontiguousarray(pygame.surfarray.array3d(screen).swapaxes(0, 1))
+        if out:
+            path = out.format(i)
+            offscreen.save_png(path, image)
+            results.append(path)
+        else:
+            results.append(image)
+    scene.release()
+    return results
 
 
 # -----------------------------
 #  RUN DIRECTLY
 # -----------------------------
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Fireworks simulation")
+    parser.add_argument("--speed", type=float, default=1.0, help="show seconds per real second")
+    parser.add_argument("--renderer", choices=sorted(RENDERERS) + ["auto"], default="auto",
+                        help="auto: GL points on a hardware GPU, else the NumPy additive splat")
+    parser.add_argument("--wind", action="store_true", help="start with the wind on (W)")
+    parser.add_argument("--bounce", action="store_true", help="start with sparks bouncing off the ground (B)")
+    parser.add_argument("--crackle", action="store_true", help="start with crackling sparks (C)")
+    parser.add_argument("--trails", action="store_true", help="start with the spark trails on (T)")
+    args = parser.parse_args(argv)
+    run_fireworks(args.renderer, args.speed, Forces(args.wind, args.bounce, args.crackle), args.trails)
+
+
 if __name__ == "__main__":
-    run_fireworks()
+    main()
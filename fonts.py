@@ -0,0 +1,92 @@
+# fonts.py
+import json
+import os
+from collections import OrderedDict
+import pygame
+
+# pygame.font.SysFont() builds the system font table on first use, which on
+# Linux means running fc-list over every installed font. The menu only ever
+# asks for one family, so the file that family resolves to is remembered
+# between runs and later starts open it directly.
+CACHE_FILE = "fonts.json"
+TEXT_CACHE_SIZE = 256   # rendered strings kept; past this the least recently used is dropped
+
+_paths = None       # "name|bold" -> [font file or None, fake bold]
+_fonts = {}         # (name, size, bold) -> pygame.font.Font
+_text = OrderedDict()   # (text, font, colour, antialias) -> rendered Surface, oldest use first
+
+
+def cache_path():
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "visual_patterns", CACHE_FILE)
+
+
+def _load():
+    global _paths
+    if _paths is None:
+        try:
+            with open(cache_path()) as f:
+                _paths = json.load(f)
+        except (OSError, ValueError):
+            _paths = {}
+    return _paths
+
+
+def _save():
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(_paths, f, indent=1)
+    except OSError:  # read-only home: resolve again next run
+        pass
+
+
+def resolve(name, bold=False):
+    """(font file, fake bold) for a system font family.
+
+    The file is None when the family is not installed; pygame then uses
+    its bundled default font, as SysFont does. Delete the cache file to
+    pick up newly installed fonts.
+    """
+    paths = _load()
+    key = f"{name}|{int(bold)}"
+    cached = paths.get(key)
+    if cached and (cached[0] is None or os.path.exists(cached[0])):
+        return tuple(cached)
+    path = pygame.font.match_font(name, bold=bold)      # the slow system scan
+    fake_bold = bold and (path is None or path == pygame.font.match_font(name))
+    paths[key] = [path, fake_bold]
+    _save()
+    return path, fake_bold
+
+
+def get(name, size, bold=False):
+    """A Font like pygame.font.SysFont(name, size, bold), shared between callers."""
+    key = (name, size, bold)
+    if key not in _fonts:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        path, fake_bold = resolve(name, bold)
+        font = pygame.font.Font(path, size)
+        font.set_bold(fake_bold)
+        _fonts[key] = font
+    return _fonts[key]
+
+
+def render(font, text, color, antialias=True):
+    """font.render(text, antialias, color), remembered for the next identical request.
+
+    Labels that are drawn every frame but rarely change (overlays, menu
+    headings) then cost one dictionary lookup. The surface is shared
+    between callers: blit it, never draw on it.
+    """
+    key = (text, font, tuple(pygame.Color(color)), antialias)
+    surf = _text.get(key)
+    if surf is None:
+        surf = _text[key] = font.render(text, antialias, color)
+        if len(_text) > TEXT_CACHE_SIZE:
+            _text.popitem(last=False)
+    else:
+        _text.move_to_end(key)
+    return surf
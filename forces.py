@@ -0,0 +1,95 @@
+# forces.py
+import numpy as np
+from particles import LIFE
+from spatial_hash import SpatialHash
+
+# -----------------------------
+#  FORCE CONSTANTS (per STEP, like particles.py)
+# -----------------------------
+WIND = 0.05             # peak sideways push of a gust
+GUST_SCALE = 1.0 / 120  # gust bands per pixel of height
+GUST_SPEED = 0.7        # how fast the bands drift (radians per second)
+ATTRACT = 0.35          # pull toward the mouse at point blank ...
+ATTRACT_RADIUS = 260    # ... fading to nothing at this distance
+RESTITUTION = 0.45      # vertical speed kept by a bounce
+FRICTION = 0.85         # horizontal speed kept by a bounce
+CRACKLE_RADIUS = 5      # sparks this close may set each other off
+CRACKLE_AGE = 60        # steps before a spark is hot enough to crackle
+CRACKLE_CHANCE = 0.05   # per close spark, per step
+CRACKLE_SPARKS = 6      # sparks in each secondary burst
+CRACKLE_POWER = 0.35
+
+
+# -----------------------------
+#  INTERACTIONS
+# -----------------------------
+class Forces:
+    """Optional interactions for a ParticlePool, applied once per fixed STEP.
+
+    accelerate() runs before pool.update() and adds the wind field and the
+    mouse attractor to the sparks' velocities; collide() runs after it and
+    bounces sparks off the ground and sets off crackles. Crackle is the only
+    spark-to-spark interaction: the sparks are indexed in a SpatialHash
+    every step and close pairs found in vectorised batches, so the cost
+    stays O(n) rather than testing all pairs. Random choices use the pool's
+    generator, so a seeded show stays repeatable.
+    """
+
+    def __init__(self, wind=False, bounce=False, crackle=False):
+        self.wind = wind
+        self.bounce = bounce
+        self.crackle = crackle
+        self.attractor = None   # (x, y) while the mouse holds it
+        self.grid = SpatialHash(CRACKLE_RADIUS)
+        self.crackles = 0       # secondary bursts so far
+
+    def accelerate(self, pool, time):
+        n = pool.count
+        if n == 0:
+            return
+        pos, vel = pool.pos[:n], pool.vel[:n]
+        if self.wind:
+            # horizontal bands of gusts drifting upward, plus a little lift between them
+            phase = pos[:, 1] * GUST_SCALE + time * GUST_SPEED
+            vel[:, 0] += WIND * (0.6 + 0.4 * np.sin(phase))
+            vel[:, 1] -= WIND * 0.3 * np.cos(phase)
+        if self.attractor is not None:
+            d = np.asarray(self.attractor, dtype=np.float32) - pos
+            dist = np.sqrt(np.einsum("ij,ij->i", d, d)) + 1.0
+            pull = ATTRACT * np.clip(1.0 - dist / ATTRACT_RADIUS, 0.0, 1.0) / dist
+            vel += d * pull[:, None]
+
+    def collide(self, pool, ground):
+        n = pool.count
+        if n == 0:
+            return
+        if self.bounce:
+            pos, vel = pool.pos[:n], pool.vel[:n]
+            below = pos[:, 1] > ground
+            if below.any():
+                pos[below, 1] = 2 * ground - pos[below, 1]
+                vel[below, 1] *= -RESTITUTION
+                vel[below, 0] *= FRICTION
+        if self.crackle:
+            self._crackle(pool)
+
+    def _crackle(self, pool):
+        n = pool.count
+        hot = np.flatnonzero(pool.crackle[:n] & (pool.age[:n] >= CRACKLE_AGE))
+        if len(hot) < 2:
+            return
+        i, j = self.grid.build(pool.pos[hot]).pairs(CRACKLE_RADIUS)
+        if len(i) == 0:
+            return
+        near = np.zeros(len(hot), dtype=bool)
+        near[i] = near[j] = True
+        close = np.flatnonzero(near)
+        burst = hot[close[pool.rng.random(len(close)) < CRACKLE_CHANCE]]
+        if len(burst) == 0:
+            return
+        points, colors = pool.pos[burst].copy(), pool.base_color[burst].copy()
+        pool.age[burst] = LIFE          # the parent is used up; update() drops it
+        pool.crackle[burst] = False
+        pool.emit_many(points, colors, CRACKLE_POWER, CRACKLE_SPARKS, crackle=False, radius=(1, 3))
+        self.crackles += len(burst)
+
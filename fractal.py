@@ -3,87 +3,334 @@ import pygame
 import moderngl
 import numpy as np
 import random
-from pygame.locals import DOUBLEBUF, OPENGL
+import math
+import decimal
+import offscreen
+import render_context
+from progressive import ProgressiveView
+from scene import Scene, run_standalone
+from fractal_cpu import BASE_ITER, max_iterations, reference_orbit
 
 WIDTH, HEIGHT = 800, 600
+TIME_RATE = 1.2     # shader time per second (0.02 per frame at 60 fps)
+
+VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+void main() { gl_Position = vec4(in_vert, 0.0, 1.0); }
+"""
+
+# Perturbation-theory Mandelbrot: a reference orbit Z_n computed on the CPU
+# in high precision is read from a texture, and each pixel iterates only its
+# small offset delta_n from it: delta' = 2*Z*delta + delta^2 + dc.
+FRAGMENT_SHADER = """
+#version 330
+uniform float time;
+uniform vec2 iResolution;
+uniform vec2 pixelOffset;     // sub-pixel jitter for supersampling (0 for a plain frame)
+uniform vec3 colors[5];
+uniform sampler2D refOrbit;   // Z_0 = 0, Z_1 = C, Z_2, ... packed row-major
+uniform int refLen;
+uniform int maxIter;
+uniform float colorPeriod;
+uniform float scale;          // half the view height in the complex plane
+uniform vec2 refOffset;       // view centre minus reference point
+uniform int saSkip;           // iterations skipped by series approximation
+uniform float saRadius;
+uniform vec2 saA;
+uniform vec2 saB;
+uniform vec2 saC;
+out vec4 fragColor;
+
+vec2 cmul(vec2 a, vec2 b) { return vec2(a.x*b.x - a.y*b.y, a.x*b.y + a.y*b.x); }
+
+vec2 refAt(int n) {
+    int w = textureSize(refOrbit, 0).x;
+    return texelFetch(refOrbit, ivec2(n % w, n / w), 0).rg;
+}
+
+void main() {
+    vec2 uv = (gl_FragCoord.xy + pixelOffset) / iResolution;
+    uv = uv * 2.0 - 1.0;
+    uv.x *= iResolution.x / iResolution.y;
+    vec2 dc = uv * scale + refOffset;
+
+    // series approximation: jump straight to iteration saSkip
+    vec2 u = dc / saRadius;
+    vec2 u2 = cmul(u, u);
+    vec2 delta = cmul(saA, u) + cmul(saB, u2) + cmul(saC, cmul(u2, u));
+    int n = saSkip;
+    int iterations = saSkip - 1;
+
+    for(int i=iterations;i<maxIter;i++){
+        delta = cmul(2.0 * refAt(n) + delta, delta) + dc;
+        n++;
+        vec2 z = refAt(n) + delta;
+        if(dot(z, z) > 16.0) break;
+        iterations++;
+        // rebase onto the start of the orbit when the reference runs out or
+        // the pixel passes closer to zero than the reference (glitch avoidance)
+        if(dot(z, z) < dot(delta, delta) || n >= refLen - 1){
+            delta = z;
+            n = 0;
+        }
+    }
+    float t = iterations >= maxIter ? 1.0 : mod(float(iterations), colorPeriod) / colorPeriod;
+    vec3 color = mix(colors[0], colors[1], t);
+    color = mix(color, colors[2], t*0.5);
+    color += sin(time + t*10.0)*0.1;
+    fragColor = vec4(clamp(color,0.0,1.0),1.0);
+}
+"""
 
 def generate_palette():
     """Generate a random color palette."""
     return [[random.random(), random.random(), random.random()] for _ in range(5)]
 
-def run():
-    # Save current menu surface
-    old_screen = pygame.display.get_surface()
-    
-    # Create a new window for fractal
-    pygame.display.set_mode((WIDTH, HEIGHT), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Fractal Generator")
-    clock = pygame.time.Clock()
-    
-    ctx = moderngl.create_context()
-    
-    vertex_shader = """
-    #version 330
-    in vec2 in_vert;
-    void main() { gl_Position = vec4(in_vert, 0.0, 1.0); }
+# ---------------- deep zoom ----------------
+MIN_SCALE = 1e-34       # float32 pixel deltas underflow below this
+MAX_SCALE = 2.0
+REF_TEXTURE_WIDTH = 1024
+
+def series_approximation(orbit, radius, max_skip, tolerance=1e-3):
+    """Cubic series delta_n ~ A*dc + B*dc^2 + C*dc^3 around the reference orbit.
+
+    Advances the coefficients while the cubic term stays negligible for every
+    |dc| <= radius and returns (skip, A*r, B*r^2, C*r^3): the coefficients are
+    pre-scaled by powers of the radius so they stay in float32 range.
     """
-    
-    fragment_shader = """
-    #version 330
-    uniform float time;
-    uniform vec3 colors[5];
-    out vec4 fragColor;
-    void main() {
-        vec2 uv = gl_FragCoord.xy / vec2(800,600);
-        uv = uv * 2.0 - 1.0;
-        uv.x *= 1.33;
-        vec2 z = uv;
-        int iterations = 0;
-        const int maxIter = 50;
-        for(int i=0;i<maxIter;i++){
-            z = vec2(z.x*z.x - z.y*z.y, 2.0*z.x*z.y) + uv;
-            if(length(z) > 4.0) break;
-            iterations++;
-        }
-        float t = float(iterations)/float(maxIter);
-        vec3 color = mix(colors[0], colors[1], t);
-        color = mix(color, colors[2], t*0.5);
-        color += sin(time + t*10.0)*0.1;
-        fragColor = vec4(clamp(color,0.0,1.0),1.0);
-    }
+    a, b, c = 1 + 0j, 0j, 0j
+    r = radius
+    n = 1
+    limit = min(max_skip, len(orbit) - 2)
+    while n < limit:
+        z2 = 2.0 * orbit[n]
+        na = z2 * a + 1.0
+        nb = z2 * b + a * a
+        nc = z2 * c + 2.0 * a * b
+        if abs(nc) * r ** 3 > tolerance * abs(nb) * r * r or abs(nb) * r * r > tolerance * abs(na) * r:
+            break
+        a, b, c = na, nb, nc
+        n += 1
+    return n, a * r, b * r * r, c * r ** 3
+
+class DeepZoom:
+    """View state plus the reference orbit that feeds the perturbation shader.
+
+    The centre is kept as Decimals so it survives zooms far past float64.
+    The reference point only moves when the view drifts too far from it or
+    the iteration budget changes; small pans just update refOffset.
+    """
+
+    HOME = (decimal.Decimal(0), decimal.Decimal(0))
+
+    def __init__(self, size=(WIDTH, HEIGHT), center=None, scale=1.0):
+        self.size = size
+        self.center = tuple(decimal.Decimal(v) for v in (center or self.HOME))
+        self.scale = scale
+        self.ref = None          # (cx, cy, max_iter) of the uploaded orbit
+        self.texture = None
+        self.ref_len = 0
+        self.series = (1, 0j, 0j, 0j)
+
+    def reset(self):
+        self.center = self.HOME
+        self.scale = 1.0
+
+    def pixel_to_plane(self, px, py):
+        """Complex-plane offset of a window pixel from the view centre (floats)."""
+        w, h = self.size
+        ux = ((px / w) * 2.0 - 1.0) * (w / h)
+        uy = 1.0 - (py / h) * 2.0
+        return ux * self.scale, uy * self.scale
+
+    def pan(self, dx, dy):
+        """Move the view by a mouse drag of (dx, dy) pixels."""
+        h = self.size[1]
+        self.center = (self.center[0] - decimal.Decimal(dx * 2.0 / h * self.scale),
+                       self.center[1] + decimal.Decimal(dy * 2.0 / h * self.scale))
+
+    def zoom_at(self, px, py, factor):
+        """Zoom by factor (> 1 zooms in) keeping the point under (px, py) fixed."""
+        new_scale = min(MAX_SCALE, max(MIN_SCALE, self.scale / factor))
+        ox, oy = self.pixel_to_plane(px, py)
+        keep = 1.0 - new_scale / self.scale
+        self.center = (self.center[0] + decimal.Decimal(ox * keep),
+                       self.center[1] + decimal.Decimal(oy * keep))
+        self.scale = new_scale
+
+    def view_radius(self):
+        w, h = self.size
+        return self.scale * math.hypot(w / h, 1.0)
+
+    def _needs_reference(self, max_iter):
+        if self.ref is None or self.ref[2] != max_iter:
+            return True
+        off = math.hypot(float(self.center[0] - self.ref[0]), float(self.center[1] - self.ref[1]))
+        return off > 0.5 * self.scale
+
+    def upload(self, ctx, prog):
+        """Refresh the reference orbit if needed and set the zoom uniforms."""
+        max_iter = max_iterations(self.scale)
+        if self._needs_reference(max_iter):
+            cx, cy = self.center
+            orbit = reference_orbit(cx, cy, max_iter, self.scale)
+            self.ref = (cx, cy, max_iter)
+            self.ref_len = len(orbit)
+            rows = -(-len(orbit) // REF_TEXTURE_WIDTH)
+            data = np.zeros((rows * REF_TEXTURE_WIDTH, 2), dtype='f4')
+            data[:len(orbit), 0] = orbit.real
+            data[:len(orbit), 1] = orbit.imag
+            if self.texture is not None:
+                self.texture.release()
+            self.texture = ctx.texture((REF_TEXTURE_WIDTH, rows), 2, data.tobytes(), dtype='f4')
+            self.texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+            self.orbit = orbit
+            self.series = None
+
+        off_x = float(self.center[0] - self.ref[0])
+        off_y = float(self.center[1] - self.ref[1])
+        radius = self.view_radius() + math.hypot(off_x, off_y)
+        if self.series is None or self.series_radius != radius:
+            self.series = series_approximation(self.orbit, radius, max_iter)
+            self.series_radius = radius
+        skip, a, b, c = self.series
+
+        self.texture.use(0)
+        prog['refOrbit'].value = 0
+        prog['refLen'].value = self.ref_len
+        prog['maxIter'].value = max_iter
+        prog['colorPeriod'].value = float(BASE_ITER)
+        prog['scale'].value = self.scale
+        prog['refOffset'].value = (off_x, off_y)
+        prog['saSkip'].value = skip
+        prog['saRadius'].value = radius
+        prog['saA'].value = (a.real, a.imag)
+        prog['saB'].value = (b.real, b.imag)
+        prog['saC'].value = (c.real, c.imag)
+
+    def release(self):
+        if self.texture is not None:
+            self.texture.release()
+            self.texture = None
+        self.ref = None
+
+def render_frames(frames=1, size=(WIDTH, HEIGHT), dt=0.02, palette=None, center=None, scale=1.0,
+                  start_time=0.0, out=None, ctx=None):
+    """Render frames headlessly into numpy arrays, or PNG files when out is a pattern.
+
+    center is a pair of numbers or decimal strings, scale the half-height of
+    the view (1.0 is the home view, 1e-30 a deep zoom).
     """
-    
-    prog = ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
-    vbo = ctx.buffer(np.array([-1,-1,1,-1,-1,1,1,1], dtype='f4'))
-    vao = ctx.simple_vertex_array(prog, vbo, 'in_vert')
-    
-    palette = generate_palette()
-    flat_colors = [v for c in palette for v in c]
-    prog['colors'].write(np.array(flat_colors, dtype='f4').tobytes())
-    
-    time_val = 0.0
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+    palette = palette or generate_palette()
+    with offscreen.Offscreen(VERTEX_SHADER, FRAGMENT_SHADER, size, ctx) as view:
+        view.prog['iResolution'].value = (float(size[0]), float(size[1]))
+        offscreen.write_palette(view.prog, 'colors', palette)
+        zoom = DeepZoom(size, center, scale)
+        try:
+            zoom.upload(view.ctx, view.prog)
+            return view.render_sequence(frames, 'time', start_time, dt, out)
+        finally:
+            zoom.release()
+
+# -----------------------------
+#  SCENE
+# -----------------------------
+class FractalScene(Scene):
+    title = "Fractal Generator"
+    caption = "Fractal Generator"
+    size = (WIDTH, HEIGHT)
+
+    def __init__(self, quality=None):
+        super().__init__()
+        self.quality = quality  # fixed render scale; None adapts to the frame time
+
+    def init(self):
+        self.gpu = render_context.get()
+        self.prog = self.gpu.program(VERTEX_SHADER, FRAGMENT_SHADER)
+        # drawn coarse while panning / zooming, refined with supersampling once still
+        self.view = ProgressiveView(self.gpu, (WIDTH, HEIGHT), quality=self.quality)
+        self.zoom = None
+        self.palette_version = 0
+
+    def enter(self):
+        self.prog['iResolution'].value = (float(WIDTH), float(HEIGHT))
+        self.new_palette()
+        self.zoom = DeepZoom((WIDTH, HEIGHT))
+        self.dragging = False
+        self.drag_moved = False
+        self.last_mouse = (0, 0)
+        self.time_val = 0.0
+        self.animate = True     # colour cycling; paused, a still view refines and then idles
+        self.still = None       # finished frame, shown again while nothing changes
+        self.stale = False      # the window was drawn over since it was shown
+
+    def new_palette(self):
+        offscreen.write_palette(self.prog, 'colors', generate_palette())
+        self.palette_version += 1   # part of the view state: a new palette restarts refinement
+
+    def exit(self):
+        self.zoom.release()
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+            self.zoom.reset()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            self.animate = not self.animate
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.dragging = True
+            self.drag_moved = False
+            self.last_mouse = event.pos
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            dx, dy = event.pos[0] - self.last_mouse[0], event.pos[1] - self.last_mouse[1]
+            if dx or dy:
+                self.zoom.pan(dx, dy)
+                self.drag_moved = True
+                self.view.interact()
+            self.last_mouse = event.pos
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.dragging = False
+            if not self.drag_moved:
                 # Regenerate palette on click
-                palette = generate_palette()
-                flat_colors = [v for c in palette for v in c]
-                prog['colors'].write(np.array(flat_colors, dtype='f4').tobytes())
-        
-        ctx.clear()
-        time_val += 0.02
-        prog['time'].value = time_val
-        vao.render(moderngl.TRIANGLE_STRIP)
-        
-        pygame.display.flip()
-        clock.tick(60)
-    
-    # Restore main menu surface
-    pygame.display.set_mode(old_screen.get_size(), pygame.RESIZABLE)
-    pygame.display.set_caption("✨ Visual Patterns Studio ✨")
-    return
+                self.new_palette()
+        elif event.type == pygame.MOUSEWHEEL:
+            mx, my = pygame.mouse.get_pos()
+            self.zoom.zoom_at(mx, my, 1.25 ** event.y)
+            self.view.interact()
+
+    def update(self, dt):
+        if self.animate:
+            self.time_val += dt * TIME_RATE
+
+    def idle(self):
+        return not self.animate and self.view.refined()
+
+    def invalidate(self):
+        self.stale = True
+
+    def render(self, screen):
+        state = (self.time_val, self.zoom.center, self.zoom.scale, self.palette_version)
+        if self.still is not None and self.view.unchanged(state):
+            if not self.stale:
+                return []
+            self.stale = False
+            screen.blit(self.still, (0, 0))
+            return None
+        self.prog['time'].value = self.time_val
+        self.zoom.upload(self.gpu.ctx, self.prog)
+        self.view.render(self.prog, state=state)
+        frame = self.view.present(screen)
+        self.stale = False
+        self.still = frame if self.view.refined() else None
+        return None
+
+    def stats(self):
+        stats = {"gpu": self.gpu.gpu_time()}
+        stats.update(self.view.stats())
+        stats["cached"] = int(self.still is not None)
+        return stats
+
+
+def run():
+    run_standalone(FractalScene())
@@ -0,0 +1,225 @@
+# fractal_cpu.py
+# GPU-free escape-time renderer producing the same image as the fractal
+# shader. Only NumPy is needed, so it runs on CPU-only render nodes and
+# doubles as a reference image for regression-testing the shader.
+import decimal
+import math
+import os
+from multiprocessing import Pool, shared_memory
+import numpy as np
+
+WIDTH, HEIGHT = 800, 600
+
+BASE_ITER = 50          # iterations at the home view (scale 1), also the colour period
+MAX_ITER = 1 << 16
+FLOAT64_SCALE = 1e-13   # deeper than this float64 runs out of digits for c: perturb a Decimal reference orbit
+
+def max_iterations(scale):
+    """Iteration budget that grows with zoom depth (50 at the home view)."""
+    depth = max(0.0, -math.log10(scale))
+    return min(MAX_ITER, int(BASE_ITER + 80 * depth ** 1.3))
+
+# ---------------- escape time ----------------
+def _pixel_axes(size, rows):
+    """View coordinates (-aspect..aspect, -1..1) of the pixel centres, columns and rows."""
+    w, h = size
+    start, stop = rows or (0, h)
+    gl_y = (h - 1 - np.arange(start, stop)) + 0.5          # GL counts rows from the bottom
+    ux = ((np.arange(w) + 0.5) / w * 2.0 - 1.0) * (w / h)
+    uy = gl_y / h * 2.0 - 1.0
+    return ux, uy
+
+def plane_coords(size, center, scale, rows=None):
+    """Complex c for each pixel centre, top row first, for rows (start, stop)."""
+    ux, uy = _pixel_axes(size, rows)
+    return (float(center[0]) + ux[None, :] * scale) + 1j * (float(center[1]) + uy[:, None] * scale)
+
+def plane_offsets(size, scale, rows=None):
+    """c - center for each pixel centre, as plane_coords but exact however deep the view."""
+    ux, uy = _pixel_axes(size, rows)
+    return ux[None, :] * scale + 1j * (uy[:, None] * scale)
+
+def escape_counts(c, max_iter):
+    """Iterations before |z| > 4 for z_1 = c, z' = z^2 + c (max_iter if it never escapes).
+
+    Pixels that escape are dropped from the working arrays, so every
+    iteration only touches the points that are still active.
+    """
+    counts = np.full(c.size, max_iter, dtype=np.int32)
+    index = np.arange(c.size)
+    cc = c.ravel().copy()
+    z = cc.copy()
+    for i in range(max_iter):
+        z *= z
+        z += cc
+        escaped = (z.real * z.real + z.imag * z.imag) > 16.0
+        if escaped.any():
+            counts[index[escaped]] = i
+            active = ~escaped
+            z, cc, index = z[active], cc[active], index[active]
+            if index.size == 0:
+                break
+    return counts.reshape(c.shape)
+
+def reference_orbit(cx, cy, max_iter, scale):
+    """Orbit Z_0 = 0, Z_1 = C, ... of the reference point C = cx + i*cy.
+
+    cx and cy are Decimals. Shallow views use plain float64 arithmetic;
+    deeper ones iterate in Decimal with enough digits for the zoom depth.
+    Stops after max_iter steps or once |Z| > 4. Returns a complex128 array.
+    """
+    orbit = np.zeros(max_iter + 2, dtype=np.complex128)
+    if scale > FLOAT64_SCALE:
+        c = complex(float(cx), float(cy))
+        z = 0j
+        for n in range(1, max_iter + 2):
+            z = z * z + c
+            orbit[n] = z
+            if z.real * z.real + z.imag * z.imag > 16.0:
+                return orbit[:n + 1]
+        return orbit
+
+    digits = int(-math.log10(scale)) + 20
+    with decimal.localcontext() as dctx:
+        dctx.prec = digits
+        x, y = +cx, +cy
+        cx, cy = x, y
+        four = decimal.Decimal(16)
+        for n in range(1, max_iter + 2):
+            orbit[n] = complex(float(x), float(y))
+            x2, y2 = x * x, y * y
+            if x2 + y2 > four:
+                return orbit[:n + 1]
+            y = 2 * x * y + cy
+            x = x2 - y2 + cx
+    return orbit
+
+def perturbed_counts(dc, orbit, max_iter):
+    """escape_counts() for c = C + dc, where orbit is reference_orbit() of C.
+
+    Only the difference delta_n = z_n - Z_n is iterated, which float64
+    holds to full precision at any depth. Once z_n is smaller than delta_n
+    (where the difference would lose its precision) or the reference orbit
+    ends, the pixel is rebased onto Z_0 = 0: delta_n = z_n, n = 0.
+    """
+    shape = dc.shape
+    counts = np.full(dc.size, max_iter, dtype=np.int32)
+    index = np.arange(dc.size)
+    dc = dc.ravel().copy()
+    delta = dc.copy()
+    n = np.ones(dc.size, dtype=np.int64)       # z = orbit[n] + delta, starting from z_1 = C + dc
+    last = len(orbit) - 1
+    for i in range(max_iter):
+        delta *= 2.0 * orbit[n] + delta         # 2 Z delta + delta^2
+        delta += dc
+        n += 1
+        z = orbit[n] + delta
+        size2 = z.real * z.real + z.imag * z.imag
+        escaped = size2 > 16.0
+        if escaped.any():
+            counts[index[escaped]] = i
+            active = ~escaped
+            z, size2, delta, dc, n, index = z[active], size2[active], delta[active], dc[active], n[active], index[active]
+            if index.size == 0:
+                break
+        rebase = (size2 < delta.real * delta.real + delta.imag * delta.imag) | (n == last)
+        if rebase.any():
+            delta[rebase] = z[rebase]
+            n[rebase] = 0
+    return counts.reshape(shape)
+
+def colorize(counts, max_iter, palette, time_value=0.0):
+    """Same palette mixing and sin(time + t*10) modulation as the shader."""
+    colors = np.asarray(palette, dtype=np.float64)
+    t = np.where(counts >= max_iter, 1.0, (counts % BASE_ITER) / float(BASE_ITER))[..., None]
+    color = colors[0] * (1.0 - t) + colors[1] * t
+    color = color * (1.0 - t * 0.5) + colors[2] * (t * 0.5)
+    color += np.sin(time_value + t * 10.0) * 0.1
+    return (np.clip(color, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+# ---------------- tiled multiprocessing ----------------
+_job = {}
+
+def _attach(name, shape, params):
+    _job['shm'] = shared_memory.SharedMemory(name=name)
+    _job['image'] = np.ndarray(shape, dtype=np.uint8, buffer=_job['shm'].buf)
+    _job['params'] = params
+
+def _render_rows(rows):
+    size, center, scale, max_iter, palette, time_value, orbit = _job['params']
+    if orbit is None:
+        counts = escape_counts(plane_coords(size, center, scale, rows), max_iter)
+    else:
+        counts = perturbed_counts(plane_offsets(size, scale, rows), orbit, max_iter)
+    _job['image'][rows[0]:rows[1]] = colorize(counts, max_iter, palette, time_value)
+    return rows
+
+def render(size=(WIDTH, HEIGHT), palette=None, center=(0.0, 0.0), scale=1.0, time_value=0.0,
+           max_iter=None, workers=None, tile_rows=32):
+    """Render an (H, W, 3) uint8 image, top row first, across a process pool.
+
+    Bands of tile_rows rows are handed to the workers, which write straight
+    into a shared-memory output buffer. workers=1 renders in-process.
+
+    center may be Decimals or strings: deeper than FLOAT64_SCALE, where
+    float64 can no longer tell neighbouring pixels apart, every pixel is
+    iterated relative to the orbit of the exact centre.
+    """
+    if palette is None:
+        import random
+        palette = [[random.random(), random.random(), random.random()] for _ in range(5)]
+    max_iter = max_iter or max_iterations(scale)
+    w, h = size
+    orbit = None
+    if scale <= FLOAT64_SCALE:
+        cx, cy = (decimal.Decimal(v) for v in center)
+        orbit = reference_orbit(cx, cy, max_iter, scale)
+    params = ((w, h), center, scale, max_iter, palette, time_value, orbit)
+    bands = [(y, min(h, y + tile_rows)) for y in range(0, h, tile_rows)]
+    workers = workers or os.cpu_count() or 1
+
+    shape = (h, w, 3)
+    shm = shared_memory.SharedMemory(create=True, size=h * w * 3)
+    try:
+        if workers == 1:
+            _attach(shm.name, shape, params)
+            for rows in bands:
+                _render_rows(rows)
+            _job['shm'].close()
+        else:
+            with Pool(workers, initializer=_attach, initargs=(shm.name, shape, params)) as pool:
+                for _ in pool.imap_unordered(_render_rows, bands):
+                    pass
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        _job.clear()
+        shm.close()
+        shm.unlink()
+
+
+def main(argv=None):
+    import argparse
+    import random
+    from png_writer import PNGWriter
+
+    parser = argparse.ArgumentParser(description="Render the fractal on the CPU.")
+    parser.add_argument("--size", default=f"{WIDTH}x{HEIGHT}", help="WIDTHxHEIGHT")
+    parser.add_argument("--center", nargs=2, default=("0", "0"), metavar=("RE", "IM"))
+    parser.add_argument("--scale", type=float, default=1.0, help="view half-height")
+    parser.add_argument("--time", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, help="seed for the random palette")
+    parser.add_argument("--out", default="fractal_cpu.png")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    image = render((w, h), center=args.center, scale=args.scale, time_value=args.time, workers=args.workers)
+    with PNGWriter(args.out, w, h) as png:
+        png.write_rows(image)
+    print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# history.py
+import zlib
+from collections import deque
+import numpy as np
+import pygame
+
+TILE = 64
+BUDGET = 32 * 1024 * 1024   # bytes of undo/redo data kept before the oldest steps are dropped
+ENTRY_OVERHEAD = 64         # rough per-tile bookkeeping cost counted against the budget
+
+
+class TileHistory:
+    """Undo/redo for a drawing surface that stores only the tiles an edit changed.
+
+    A shadow copy of the last committed canvas is kept. Drawing code marks
+    the rects it touched; commit() compares just those tiles against the
+    shadow and records the before/after pixels of the ones that really
+    changed, zlib-compressed. Undo and redo write those tiles back, so they
+    cost O(dirty tiles) rather than a full-canvas copy. When the stored
+    steps exceed the memory budget the oldest undo steps are dropped first.
+    """
+
+    def __init__(self, surface, tile=TILE, budget=BUDGET, compress=True):
+        self.surface = surface
+        self.tile = tile
+        self.budget = budget
+        self.compress = compress
+        w, h = surface.get_size()
+        self.cols = -(-w // tile)
+        self.rows = -(-h // tile)
+        self.shadow = pygame.surfarray.array3d(surface)
+        self.dirty = set()
+        self.undo_steps = deque()
+        self.redo_steps = []
+        self.bytes_used = 0
+
+    # ---------- bookkeeping ----------
+    def mark(self, rect=None):
+        """Note that rect (canvas coordinates) may have changed; None marks everything."""
+        t = self.tile
+        if rect is None:
+            x0, y0, x1, y1 = 0, 0, self.cols, self.rows
+        else:
+            rect = pygame.Rect(rect).clip(self.surface.get_rect())
+            if rect.width <= 0 or rect.height <= 0:
+                return
+            x0, y0 = rect.left // t, rect.top // t
+            x1, y1 = (rect.right - 1) // t + 1, (rect.bottom - 1) // t + 1
+        self.dirty.update((tx, ty) for tx in range(x0, x1) for ty in range(y0, y1))
+
+    def tile_rect(self, tx, ty):
+        w, h = self.surface.get_size()
+        x, y = tx * self.tile, ty * self.tile
+        return pygame.Rect(x, y, min(self.tile, w - x), min(self.tile, h - y))
+
+    def _pack(self, pixels):
+        data = np.ascontiguousarray(pixels).tobytes()
+        return zlib.compress(data, 1) if self.compress else data
+
+    def _unpack(self, data, rect):
+        if self.compress:
+            data = zlib.decompress(data)
+        return np.frombuffer(data, dtype=np.uint8).reshape(rect.width, rect.height, 3)
+
+    @staticmethod
+    def _size(step):
+        return sum(len(before) + len(after) + ENTRY_OVERHEAD for _, _, before, after in step)
+
+    # ---------- recording ----------
+    def commit(self):
+        """Record the marked tiles that changed as one undoable step."""
+        if not self.dirty:
+            return False
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        step = []
+        for tx, ty in sorted(self.dirty):
+            r = self.tile_rect(tx, ty)
+            now = pixels[r.left:r.right, r.top:r.bottom]
+            old = self.shadow[r.left:r.right, r.top:r.bottom]
+            if np.array_equal(now, old):
+                continue
+            step.append((tx, ty, self._pack(old), self._pack(now)))
+            old[...] = now
+        del pixels
+        self.dirty.clear()
+        if not step:
+            return False
+
+        for dropped in self.redo_steps:
+            self.bytes_used -= self._size(dropped)
+        self.redo_steps.clear()
+        self.undo_steps.append(step)
+        self.bytes_used += self._size(step)
+        self._evict()
+        return True
+
+    def _evict(self):
+        while self.bytes_used > self.budget and len(self.undo_steps) > 1:
+            self.bytes_used -= self._size(self.undo_steps.popleft())
+
+    # ---------- undo / redo ----------
+    def _apply(self, step, which):
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        area = None
+        for tx, ty, before, after in step:
+            r = self.tile_rect(tx, ty)
+            tile = self._unpack(before if which == 0 else after, r)
+            pixels[r.left:r.right, r.top:r.bottom] = tile
+            self.shadow[r.left:r.right, r.top:r.bottom] = tile
+            area = r if area is None else area.union(r)
+        del pixels
+        return area
+
+    def undo(self):
+        """Step back once. Returns the changed Rect, or None if there was nothing to undo."""
+        self.commit()
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return self._apply(step, 0)
+
+    def redo(self):
+        """Re-apply the last undone step. Returns the changed Rect, or None."""
+        if self.dirty:
+            self.commit()
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return self._apply(step, 1)
@@ -1,159 +1,365 @@
+import numpy as np
 import pygame
+import fonts
+from history import TileHistory
+from strokes import Stroke, PreviewLayer
+from dirty_rects import DirtyRects
+from scene import Scene, run_standalone
 
 WIDTH, HEIGHT = 1000, 600
 
-def run_drawing():
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Mini Paint")
-    clock = pygame.time.Clock()
-
-    # --- Colors and setup ---
-    WHITE = (255, 255, 255)
-    BLACK = (0, 0, 0)
-    COLORS = [
-        (255, 0, 0), (0, 255, 0), (0, 0, 255),
-        (255, 255, 0), (255, 105, 180), (0, 255, 255),
-        (255, 165, 0), (255, 255, 255), (128, 128, 128)
-    ]
-
-    current_color = WHITE
-    brush_size = 8
-    drawing = False
-    erasing = False
-    current_tool = "brush"
-    filled = False
-    start_pos = None
-    undo_stack, redo_stack = [], []
-
-    palette_rects = [(pygame.Rect(10 + i * 40, 10, 30, 30), c) for i, c in enumerate(COLORS)]
-    font = pygame.font.SysFont("Segoe UI", 18)
-    tip = font.render(
-        "Tools: D=Draw | E=Eraser | L=Line | R=Rect | O=Circle | B=Bucket | "
-        "F=Fill Toggle | LMB=Draw | RMB=Erase | +/-=Brush Size | C=Clear | "
-        "S=Save | ESC=Menu | Z=Undo | Y=Redo", True, (200, 200, 200)
-    )
-
-    canvas = pygame.Surface((WIDTH, HEIGHT - 60))
-    canvas.fill(BLACK)
-
-    def flood_fill(surf, pos, target_color, replacement_color):
-        if target_color == replacement_color:
-            return
-        stack = [pos]
-        while stack:
-            x, y = stack.pop()
-            if x < 0 or x >= surf.get_width() or y < 0 or y >= surf.get_height():
-                continue
-            if surf.get_at((x, y))[:3] != target_color:
-                continue
-            surf.set_at((x, y), replacement_color)
-            stack.extend([(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)])
-
-    running = True
-
-    while running:
-        screen.fill((40, 40, 40))
-        screen.blit(canvas, (0, 60))
-
-        # --- Draw color palette ---
-        for rect, color in palette_rects:
-            pygame.draw.rect(screen, color, rect)
-            if color == current_color:
-                pygame.draw.rect(screen, (255, 255, 255), rect, 3)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or (
-                event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
-            ):
-                running = False
-
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_c:
-                    undo_stack.append(canvas.copy())
-                    redo_stack.clear()
-                    canvas.fill(BLACK)
-                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS):
-                    brush_size = min(brush_size + 2, 50)
-                elif event.key == pygame.K_MINUS:
-                    brush_size = max(2, brush_size - 2)
-                elif event.key == pygame.K_s:
-                    pygame.image.save(canvas, "my_drawing.png")
-                    print("🖼️ Saved as my_drawing.png!")
-                elif event.key == pygame.K_d:
-                    current_tool = "brush"
-                elif event.key == pygame.K_e:
-                    current_tool = "eraser"
-                elif event.key == pygame.K_l:
-                    current_tool = "line"
-                elif event.key == pygame.K_r:
-                    current_tool = "rect"
-                elif event.key == pygame.K_o:
-                    current_tool = "circle"
-                elif event.key == pygame.K_f:
-                    filled = not filled
-                elif event.key == pygame.K_b:
-                    current_tool = "bucket"
-                elif event.key == pygame.K_z:
-                    if undo_stack:
-                        redo_stack.append(canvas.copy())
-                        canvas.blit(undo_stack.pop(), (0, 0))
-                elif event.key == pygame.K_y:
-                    if redo_stack:
-                        undo_stack.append(canvas.copy())
-                        canvas.blit(redo_stack.pop(), (0, 0))
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
+# -----------------------------
+#  BUCKET FILL
+# -----------------------------
+def _runs(mask):
+    """Label the horizontal runs of True in an (H, W) mask.
+
+    Returns an (H, W) array giving every True pixel the index of its run
+    (counted in row-major order) and the number of runs.
+    """
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    labels = np.cumsum(starts, axis=None, dtype=np.int32).reshape(mask.shape) - 1
+    return labels, int(labels[-1, -1]) + 1
+
+
+def _touching(mask, labels, connectivity):
+    """(a, b) run index pairs for runs in neighbouring rows that touch, one pair per overlap."""
+    pairs = [(mask[:-1] & mask[1:], labels[:-1], labels[1:])]
+    if connectivity == 8:
+        pairs.append((mask[:-1, :-1] & mask[1:, 1:], labels[:-1, :-1], labels[1:, 1:]))
+        pairs.append((mask[:-1, 1:] & mask[1:, :-1], labels[:-1, 1:], labels[1:, :-1]))
+    a, b = [], []
+    for both, upper, lower in pairs:
+        first = both.copy()     # only where an overlap begins: one edge per pair of runs
+        first[:, 1:] &= ~both[:, :-1]
+        a.append(upper[first])
+        b.append(lower[first])
+    return np.concatenate(a), np.concatenate(b)
+
+
+def _components(count, a, b):
+    """Connected components of a graph of count nodes and edges a-b, as a root per node.
+
+    Each round hooks every root onto the smallest root it has an edge to
+    and then flattens the trees by pointer jumping, so a region needs a
+    handful of whole-array rounds however winding it is.
+    """
+    parent = np.arange(count, dtype=np.int32)
+    while True:
+        a, b = parent[a], parent[b]
+        apart = a != b
+        if not apart.any():
+            return parent
+        a, b = a[apart], b[apart]       # edges inside a component are done with
+        np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+        moving = np.flatnonzero(parent != parent[parent])
+        while moving.size:
+            parent[moving] = parent[parent[moving]]
+            moving = moving[parent[moving] != parent[parent[moving]]]
+
+
+def _single_component(mask, connectivity):
+    """Rows (first, last) and per-row run ends when mask is one run per row over
+    consecutive rows, each touching the next: one component, found without
+    labelling (a blank canvas, a convex shape). None otherwise.
+    """
+    runs = np.count_nonzero(mask[:, 1:] & ~mask[:, :-1], axis=1) + mask[:, 0]
+    rows = np.flatnonzero(runs)
+    if runs.max() > 1 or rows[-1] - rows[0] + 1 != len(rows):
+        return None
+    band = mask[rows[0]:rows[-1] + 1]
+    first = band.argmax(axis=1)
+    last = band.shape[1] - 1 - band[:, ::-1].argmax(axis=1)
+    reach = 1 if connectivity == 8 else 0       # diagonal neighbours touch one column further
+    if not (np.maximum(first[:-1], first[1:]) <= np.minimum(last[:-1], last[1:]) + reach).all():
+        return None
+    return rows[0], rows[-1], first, last
+
+
+def flood_fill(surf, pos, replacement_color, tolerance=0, connectivity=4):
+    """Bucket fill of the region connected to pos.
+
+    Pixels join the region when every RGB channel is within tolerance of the
+    seed colour. The colour test is one NumPy pass over a surfarray view;
+    the mask is then cut into horizontal runs, runs touching across rows
+    (4- or 8-connected) are joined into components with whole-array
+    operations, and the seed's component is written back with a single
+    masked assignment. No Python loop runs per pixel or per run, so a
+    fragmented canvas costs about the same as a blank one. When the mask
+    is plainly a single component (one run per row, each touching the
+    next) the labelling is skipped and the mask is the region.
+    Returns the bounding Rect of the filled pixels, or None.
+    """
+    x, y = pos
+    w, h = surf.get_size()
+    if not (0 <= x < w and 0 <= y < h):
+        return None
+    if surf.get_bytesize() == 4:
+        # packed 32-bit pixels: compare whole words instead of strided channels
+        pixels = pygame.surfarray.pixels2d(surf).T       # (H, W) view
+        rgb_mask = np.uint32(sum(surf.get_masks()[:3]))
+        seed_pixel = pixels[y, x] & rgb_mask
+        fill_pixel = surf.map_rgb(replacement_color) & int(rgb_mask)
+        if tolerance <= 0:
+            if seed_pixel == fill_pixel:
+                return None
+            mask = (pixels & rgb_mask) == seed_pixel
+        else:
+            mask = np.ones((h, w), dtype=bool)
+            for shift in surf.get_shifts()[:3]:
+                channel = ((pixels >> shift) & 255).astype(np.int16)
+                mask &= np.abs(channel - ((int(seed_pixel) >> shift) & 255)) <= tolerance
+    else:
+        pixels = pygame.surfarray.pixels3d(surf).transpose(1, 0, 2)   # (H, W, 3) view
+        seed = pixels[y, x].astype(np.int16)
+        fill_pixel = replacement_color[:3]
+        if tolerance <= 0 and tuple(seed) == tuple(fill_pixel):
+            return None
+        mask = (np.abs(pixels.astype(np.int16) - seed) <= max(tolerance, 0)).all(axis=2)
+
+    single = _single_component(mask, connectivity)
+    if single is not None:
+        top, bottom, first, last = single
+        region = mask
+        left, right = int(first.min()), int(last.max())
+    else:
+        labels, count = _runs(mask)
+        roots = _components(count, *_touching(mask, labels, connectivity))
+        region = mask & (roots[labels] == roots[labels[y, x]])
+        rows, cols = np.flatnonzero(region.any(axis=1)), np.flatnonzero(region.any(axis=0))
+        top, bottom, left, right = int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
+    if surf.get_bytesize() == 4:
+        np.copyto(pixels, (pixels & ~rgb_mask) | np.uint32(fill_pixel), where=region)
+    else:
+        pixels[region] = fill_pixel
+    del pixels
+    return pygame.Rect(left, int(top), right - left + 1, int(bottom - top + 1))
+
+
+# -----------------------------
+#  SHAPES
+# -----------------------------
+def draw_shape(surf, tool, color, start_pos, end_pos, width, filled):
+    """Draw a line, rect or circle tool shape. Returns the dirty Rect."""
+    if tool == "line":
+        return pygame.draw.line(surf, color, start_pos, end_pos, width)
+    if tool == "rect":
+        rect = pygame.Rect(start_pos, (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1]))
+        rect.normalize()
+        return pygame.draw.rect(surf, color, rect, 0 if filled else width)
+    radius = int(((end_pos[0] - start_pos[0]) ** 2 + (end_pos[1] - start_pos[1]) ** 2) ** 0.5)
+    return pygame.draw.circle(surf, color, start_pos, radius, 0 if filled else width)
+
+
+# -----------------------------
+#  CURSOR
+# -----------------------------
+def cursor_rect(tool, pos, brush_size):
+    """Screen rect the tool cursor covers at pos, or None off the canvas."""
+    mx, my = pos
+    if my <= 60:
+        return None
+    if tool in ("brush", "eraser"):
+        return pygame.Rect(mx - brush_size - 1, my - brush_size - 1, 2 * brush_size + 3, 2 * brush_size + 3)
+    if tool in ("line", "rect", "circle"):
+        return pygame.Rect(mx - 7, my - 7, 15, 15)
+    return None
+
+
+def draw_cursor(screen, tool, pos, brush_size, color):
+    mx, my = pos
+    if tool in ("brush", "eraser"):
+        color = (255, 255, 255) if tool == "eraser" else color
+        pygame.draw.circle(screen, color, (mx, my), brush_size, 1)
+    elif tool in ("line", "rect", "circle"):
+        pygame.draw.line(screen, (255, 255, 255), (mx - 5, my), (mx + 5, my), 2)
+        pygame.draw.line(screen, (255, 255, 255), (mx, my - 5), (mx, my + 5), 2)
+
+
+# -----------------------------
+#  SCENE
+# -----------------------------
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+COLORS = [
+    (255, 0, 0), (0, 255, 0), (0, 0, 255),
+    (255, 255, 0), (255, 105, 180), (0, 255, 255),
+    (255, 165, 0), (255, 255, 255), (128, 128, 128)
+]
+CANVAS_OFFSET = (0, 60)     # the canvas sits below the palette bar
+
+
+class DrawingScene(Scene):
+    title = "Interactive Drawing"
+    caption = "Mini Paint"
+    size = (WIDTH, HEIGHT)
+
+    def init(self):
+        self.palette_rects = [(pygame.Rect(10 + i * 40, 10, 30, 30), c) for i, c in enumerate(COLORS)]
+        self.font = fonts.get("Segoe UI", 18)
+        self.tip = self.font.render(
+            "Tools: D=Draw | E=Eraser | L=Line | R=Rect | O=Circle | B=Bucket | "
+            "F=Fill Toggle | LMB=Draw | RMB=Erase | +/-=Brush Size | C=Clear | "
+            "M=Smoothing | S=Save | ESC=Menu | Z=Undo | Y=Redo", True, (200, 200, 200)
+        )
+        self.header = pygame.Surface((WIDTH, 60))
+
+    def enter(self):
+        self.current_color = WHITE
+        self.brush_size = 8
+        self.drawing = False
+        self.erasing = False
+        self.current_tool = "brush"
+        self.filled = False
+        self.start_pos = None
+        self.fill_tolerance = 0
+        self.fill_connectivity = 4
+        self.smooth_strokes = True
+        self.stroke = None
+
+        self.canvas = pygame.Surface((WIDTH, HEIGHT - 60))
+        self.canvas.fill(BLACK)
+        self.history = TileHistory(self.canvas)
+        self.preview = PreviewLayer(self.canvas.get_size())
+
+        # Only regions that changed are repainted and pushed to the display.
+        # The palette bar is a cached layer rebuilt when its state changes.
+        self.dirty = DirtyRects((WIDTH, HEIGHT))
+        self.header_state = None
+        self.shown_preview = None
+        self.shown_cursor = None
+
+    def exit(self):
+        pygame.mouse.set_visible(True)
+
+    def idle(self):
+        return not self.dirty
+
+    def invalidate(self):
+        self.dirty.full()
+
+    def stats(self):
+        return {"undo bytes": self.history.bytes_used, "undo steps": len(self.history.undo_steps)}
+
+    def mark(self, area):
+        """Record a canvas edit in the undo history and the screen's dirty regions."""
+        if area:
+            self.history.mark(area)
+            self.dirty.add(area, CANVAS_OFFSET)
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        canvas, history, dirty = self.canvas, self.history, self.dirty
+
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_c:
+                canvas.fill(BLACK)
+                history.mark()
+                history.commit()
+                dirty.add(canvas.get_rect(), CANVAS_OFFSET)
+            elif event.key in (pygame.K_PLUS, pygame.K_EQUALS):
+                self.brush_size = min(self.brush_size + 2, 50)
+            elif event.key == pygame.K_MINUS:
+                self.brush_size = max(2, self.brush_size - 2)
+            elif event.key == pygame.K_s:
+                pygame.image.save(canvas, "my_drawing.png")
+                print("🖼️ Saved as my_drawing.png!")
+            elif event.key == pygame.K_d:
+                self.current_tool = "brush"
+            elif event.key == pygame.K_e:
+                self.current_tool = "eraser"
+            elif event.key == pygame.K_l:
+                self.current_tool = "line"
+            elif event.key == pygame.K_r:
+                self.current_tool = "rect"
+            elif event.key == pygame.K_o:
+                self.current_tool = "circle"
+            elif event.key == pygame.K_f:
+                self.filled = not self.filled
+            elif event.key == pygame.K_b:
+                self.current_tool = "bucket"
+            elif event.key == pygame.K_LEFTBRACKET:
+                self.fill_tolerance = max(0, self.fill_tolerance - 8)
+            elif event.key == pygame.K_RIGHTBRACKET:
+                self.fill_tolerance = min(255, self.fill_tolerance + 8)
+            elif event.key == pygame.K_n:
+                self.fill_connectivity = 8 if self.fill_connectivity == 4 else 4
+            elif event.key == pygame.K_m:
+                self.smooth_strokes = not self.smooth_strokes
+            elif event.key == pygame.K_z:
+                dirty.add(history.undo(), CANVAS_OFFSET)
+            elif event.key == pygame.K_y:
+                dirty.add(history.redo(), CANVAS_OFFSET)
+
+        elif event.type == pygame.VIDEOEXPOSE:
+            self.invalidate()
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.pos[1] <= 60:
+                # header bar: pick a colour, never start a stroke or a history step
                 if event.button == 1:
-                    # Color selection
-                    for rect, color in palette_rects:
+                    for rect, color in self.palette_rects:
                         if rect.collidepoint(event.pos):
-                            current_color = color
+                            self.current_color = color
                             break
-                    else:
-                        if current_tool == "bucket":
-                            x, y = event.pos
-                            if y > 60:
-                                undo_stack.append(canvas.copy())
-                                redo_stack.clear()
-                                target_color = canvas.get_at((x, y - 60))[:3]
-                                flood_fill(canvas, (x, y - 60), target_color, current_color)
-                        else:
-                            drawing = True
-                            erasing = False
-                            start_pos = event.pos
-                            undo_stack.append(canvas.copy())
-                            redo_stack.clear()
-                elif event.button == 3:
-                    erasing = True
-                    drawing = False
-                    undo_stack.append(canvas.copy())
-                    redo_stack.clear()
-
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 1 and start_pos:
-                    end_pos = event.pos
-                    if current_tool == "line":
-                        pygame.draw.line(canvas, current_color, start_pos, end_pos, brush_size)
-                    elif current_tool == "rect":
-                        rect = pygame.Rect(start_pos, (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1]))
-                        rect.normalize()
-                        if filled:
-                            pygame.draw.rect(canvas, current_color, rect)
-                        else:
-                            pygame.draw.rect(canvas, current_color, rect, brush_size)
-                    elif current_tool == "circle":
-                        radius = int(((end_pos[0] - start_pos[0]) ** 2 + (end_pos[1] - start_pos[1]) ** 2) ** 0.5)
-                        if filled:
-                            pygame.draw.circle(canvas, current_color, start_pos, radius)
+                return
+            if self.drawing or self.erasing:
+                return      # one gesture at a time: the other button waits until this one is released
+            if event.button == 1:
+                if self.current_tool == "bucket":
+                    x, y = event.pos
+                    area = flood_fill(canvas, (x, y - 60), self.current_color,
+                                      self.fill_tolerance, self.fill_connectivity)
+                    if area:
+                        self.mark(area)
+                        history.commit()
+                else:
+                    self.drawing = True
+                    self.erasing = False
+                    self.start_pos = (event.pos[0], event.pos[1] - 60)
+                    if self.current_tool in ("brush", "eraser"):
+                        if self.current_tool == "brush":
+                            color, size = self.current_color, self.brush_size
                         else:
-                            pygame.draw.circle(canvas, current_color, start_pos, radius, brush_size)
-                    drawing = False
-                    erasing = False
-                    start_pos = None
-                elif event.button == 3:
-                    erasing = False
+                            color, size = BLACK, self.brush_size + 2
+                        self.stroke = Stroke(canvas, color, size, self.smooth_strokes)
+                        self.mark(self.stroke.begin(self.start_pos))
+            elif event.button == 3:
+                self.erasing = True
+                self.drawing = False
+                self.start_pos = None
+                self.preview.clear()
+                self.stroke = Stroke(canvas, BLACK, self.brush_size + 2, self.smooth_strokes)
+                self.mark(self.stroke.begin((event.pos[0], event.pos[1] - 60)))
+
+        elif event.type == pygame.MOUSEMOTION:
+            # every motion event, not one sample per frame, so fast strokes stay continuous
+            if self.stroke:
+                self.mark(self.stroke.add((event.pos[0], event.pos[1] - 60)))
+
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if not ((event.button == 1 and self.drawing) or (event.button == 3 and self.erasing)):
+                return      # not the button that started the gesture: a bucket click or a press ignored above
+            if self.stroke:
+                self.mark(self.stroke.end())
+                self.stroke = None
+            if event.button == 1 and self.start_pos:
+                end_pos = (event.pos[0], event.pos[1] - 60)
+                if self.current_tool in ("line", "rect", "circle"):
+                    self.preview.clear()
+                    self.mark(draw_shape(canvas, self.current_tool, self.current_color, self.start_pos, end_pos,
+                                         self.brush_size, self.filled))
+                history.commit()
+                self.drawing = False
+                self.erasing = False
+                self.start_pos = None
+            elif event.button == 3:
+                self.erasing = False
+                history.commit()
 
+    def render(self, screen):
+        dirty, preview = self.dirty, self.preview
         mx, my = pygame.mouse.get_pos()
 
         # --- Cursor visibility control ---
@@ -162,55 +368,58 @@ def run_drawing():
         else:        # On palette/UI
             pygame.mouse.set_visible(True)
 
-        # --- Drawing logic ---
-        if my > 60:
-            if drawing:
-                if current_tool == "brush":
-                    pygame.draw.circle(canvas, current_color, (mx, my - 60), brush_size)
-                elif current_tool == "eraser":
-                    pygame.draw.circle(canvas, BLACK, (mx, my - 60), brush_size + 2)
-            elif erasing:
-                pygame.draw.circle(canvas, BLACK, (mx, my - 60), brush_size + 2)
-
-        # --- Shape preview ---
-        if drawing and start_pos and current_tool in ("line", "rect", "circle"):
-            overlay = canvas.copy()
-            end_pos = pygame.mouse.get_pos()
-            if current_tool == "line":
-                pygame.draw.line(overlay, current_color, start_pos, end_pos, brush_size)
-            elif current_tool == "rect":
-                rect = pygame.Rect(start_pos, (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1]))
-                rect.normalize()
-                if filled:
-                    pygame.draw.rect(overlay, current_color, rect)
-                else:
-                    pygame.draw.rect(overlay, current_color, rect, brush_size)
-            elif current_tool == "circle":
-                radius = int(((end_pos[0] - start_pos[0]) ** 2 + (end_pos[1] - start_pos[1]) ** 2) ** 0.5)
-                if filled:
-                    pygame.draw.circle(overlay, current_color, start_pos, radius)
-                else:
-                    pygame.draw.circle(overlay, current_color, start_pos, radius, brush_size)
-            screen.blit(overlay, (0, 60))
-
-        # --- UI Info ---
-        screen.blit(tip, (10, HEIGHT - 30))
-        brush_label = font.render(
-            f"Brush Size: {brush_size} | Tool: {current_tool.capitalize()} | Filled: {filled}",
-            True, (230, 230, 230)
-        )
-        screen.blit(brush_label, (WIDTH - 350, 15))
+        # --- Shape preview (only the shape's rect is redrawn, never a canvas copy) ---
+        if self.drawing and self.start_pos and self.current_tool in ("line", "rect", "circle"):
+            preview.draw(draw_shape, self.current_tool, self.current_color, self.start_pos, (mx, my - 60),
+                         self.brush_size, self.filled)
+        if preview.area or self.shown_preview:
+            dirty.add(self.shown_preview, CANVAS_OFFSET)
+            dirty.add(preview.area, CANVAS_OFFSET)
+            self.shown_preview = preview.area and preview.area.copy()
+
+        # --- Palette bar and info label, re-rendered only when they change ---
+        state = (self.current_color, self.brush_size, self.current_tool, self.filled,
+                 self.fill_tolerance, self.fill_connectivity, self.smooth_strokes)
+        if state != self.header_state:
+            self.header_state = state
+            self.draw_header()
+            dirty.add(self.header.get_rect())
 
         # --- Custom cursor preview ---
-        if my > 60:
-            if current_tool in ("brush", "eraser"):
-                color = (255, 255, 255) if current_tool == "eraser" else current_color
-                pygame.draw.circle(screen, color, (mx, my), brush_size, 1)
-            elif current_tool in ("line", "rect", "circle"):
-                pygame.draw.line(screen, (255, 255, 255), (mx - 5, my), (mx + 5, my), 2)
-                pygame.draw.line(screen, (255, 255, 255), (mx, my - 5), (mx, my + 5), 2)
-
-        pygame.display.flip()
-        clock.tick(60)
-
-    return
+        cursor = cursor_rect(self.current_tool, (mx, my), self.brush_size)
+        if cursor != self.shown_cursor:
+            dirty.add(self.shown_cursor)
+            dirty.add(cursor)
+            self.shown_cursor = cursor
+
+        # --- Repaint the dirty regions only ---
+        regions = dirty.take()
+        for rect in regions:
+            screen.set_clip(rect)
+            screen.blit(self.header, (0, 0))
+            screen.blit(self.canvas, CANVAS_OFFSET)
+            preview.blit(screen, CANVAS_OFFSET)
+            screen.blit(self.tip, (10, HEIGHT - 30))
+            if cursor:
+                draw_cursor(screen, self.current_tool, (mx, my), self.brush_size, self.current_color)
+        screen.set_clip(None)
+        return regions
+
+    def draw_header(self):
+        header = self.header
+        header.fill((40, 40, 40))
+        for rect, color in self.palette_rects:
+            pygame.draw.rect(header, color, rect)
+            if color == self.current_color:
+                pygame.draw.rect(header, (255, 255, 255), rect, 3)
+        label = f"Brush Size: {self.brush_size} | Tool: {self.current_tool.capitalize()} | Filled: {self.filled}"
+        if self.current_tool in ("brush", "eraser"):
+            label += f" | Smooth: {self.smooth_strokes}"
+        if self.current_tool == "bucket":
+            label += f" | Tolerance: {self.fill_tolerance} ([/]) | {self.fill_connectivity}-way (N)"
+        brush_label = fonts.render(self.font, label, (230, 230, 230))
+        header.blit(brush_label, (min(WIDTH - 350, WIDTH - brush_label.get_width() - 10), 15))
+
+
+def run_drawing():
+    run_standalone(DrawingScene())
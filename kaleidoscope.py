@@ -1,117 +1,129 @@
 # kaleidoscope.py
 import pygame
-import moderngl
-import numpy as np
 import random
-from pygame.locals import DOUBLEBUF, OPENGL
+import offscreen
+import render_context
+from palette import PaletteLUT, FADE
+from scene import Scene, run_standalone
 
 WIDTH, HEIGHT = 800, 600
+TIME_RATE = 1.2     # shader time per second (0.02 per frame at 60 fps)
+
+VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+void main() {
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+# 🌈 Enhanced fragment shader with multi-layer motion, rotation, and vivid blending
+FRAGMENT_SHADER = """
+#version 330
+uniform float time;
+uniform vec2 iResolution;
+uniform sampler2D paletteLut;  // palette.PaletteLUT: five colours, linearly blended, one row per palette
+uniform vec2 paletteCoord;     // (half a texel, row blend)
+out vec4 fragColor;
+
+float noise(vec2 p) {
+    return fract(sin(dot(p, vec2(12.9898,78.233))) * 43758.5453);
+}
+
+vec3 palette(float t) {
+    return texture(paletteLut, vec2(t, 0.0) + paletteCoord).rgb;
+}
+
+void main() {
+    vec2 uv = gl_FragCoord.xy / iResolution;
+    uv = uv * 2.0 - 1.0;
+    uv.x *= iResolution.x / iResolution.y; // keep proportions
+
+    float r = length(uv);
+    float a = atan(uv.y, uv.x);
+
+    // 🌀 Add dynamic rotation and time warp
+    a += sin(time * 0.5) * 0.5;
+    r += 0.1 * sin(a * 6.0 + time * 0.8);
+
+    // 🌸 Multi-layer symmetry blending
+    float layers = 6.0;
+    float sym = abs(sin(a * layers + time * 0.3));
+    float pulse = sin(r * 15.0 - time * 1.2) * 0.5 + 0.5;
+
+    // ✨ Depth modulation
+    float depth = sin(r * 5.0 + sym * 3.0 + time * 0.5);
+
+    // 🌈 Rich color mixing with palette function
+    vec3 col = palette(pulse + depth * 0.3);
+    col = mix(col, palette(floor(sym * 5.0) / 5.0), 0.4 + 0.3 * sin(time * 0.5));   // colour i sits at i / 5
+
+    // 🪞 Mirror symmetry for kaleidoscope effect
+    uv.x = abs(uv.x);
+    uv.y = abs(uv.y);
+    col *= (0.6 + 0.4 * sin(r * 6.0 + time));
+
+    // 🌟 Add subtle glow
+    float glow = exp(-r * 2.5) * 0.8;
+    col += glow * vec3(0.8, 0.9, 1.0);
+
+    fragColor = vec4(clamp(col, 0.0, 1.0), 1.0);
+}
+"""
 
 def generate_palette():
     return [[random.random(), random.random(), random.random()] for _ in range(5)]
 
+def render_frames(frames=1, size=(WIDTH, HEIGHT), dt=0.02, palette=None, start_time=0.0, out=None, ctx=None):
+    """Render frames headlessly into numpy arrays, or PNG files when out is a pattern."""
+    palette = palette or generate_palette()
+    with offscreen.Offscreen(VERTEX_SHADER, FRAGMENT_SHADER, size, ctx) as view, \
+            PaletteLUT(view.ctx, "linear") as lut:
+        view.prog['iResolution'].value = (float(size[0]), float(size[1]))
+        lut.set(palette)
+        lut.use(view.prog)
+        return view.render_sequence(frames, 'time', start_time, dt, out)
+
+# -----------------------------
+#  SCENE
+# -----------------------------
+class KaleidoscopeScene(Scene):
+    title = "Kaleidoscope"
+    caption = "Kaleidoscope"
+    size = (WIDTH, HEIGHT)
+
+    def init(self):
+        self.gpu = render_context.get()
+        self.prog = self.gpu.program(VERTEX_SHADER, FRAGMENT_SHADER)
+        self.lut = PaletteLUT(self.gpu.ctx, "linear")
+
+    def release(self):
+        self.lut.release()
+
+    def enter(self):
+        self.prog['iResolution'].value = (float(WIDTH), float(HEIGHT))
+        self.lut.set(generate_palette())
+        self.time_val = 0.0
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.lut.set(generate_palette(), FADE)     # cross-faded on the GPU, no per-frame upload
+
+    def update(self, dt):
+        self.time_val += dt * TIME_RATE
+        self.lut.update(dt)
+
+    def render(self, screen):
+        self.prog['time'].value = self.time_val
+        self.lut.use(self.prog)
+        self.gpu.render(self.prog, (WIDTH, HEIGHT))
+        self.gpu.present(screen, (WIDTH, HEIGHT))
+        return None
+
+    def stats(self):
+        return {"gpu": self.gpu.gpu_time()}
+
+
 def run():
-    # Save current display surface
-    old_screen = pygame.display.get_surface()
-    
-    # Create new window for this module
-    pygame.display.set_mode((WIDTH, HEIGHT), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Kaleidoscope")
-    clock = pygame.time.Clock()
-    
-    ctx = moderngl.create_context()
-
-    vertex_shader = """
-    #version 330
-    in vec2 in_vert;
-    void main() {
-        gl_Position = vec4(in_vert, 0.0, 1.0);
-    }
-    """
-
-    # 🌈 Enhanced fragment shader with multi-layer motion, rotation, and vivid blending
-    fragment_shader = """
-    #version 330
-    uniform float time;
-    uniform vec3 colors[5];
-    out vec4 fragColor;
-
-    float noise(vec2 p) {
-        return fract(sin(dot(p, vec2(12.9898,78.233))) * 43758.5453);
-    }
-
-    vec3 palette(float t) {
-        return mix(colors[int(mod(t*5.0,5.0))], colors[int(mod(t*5.0+1.0,5.0))], fract(t*5.0));
-    }
-
-    void main() {
-        vec2 uv = gl_FragCoord.xy / vec2(800.0, 600.0);
-        uv = uv * 2.0 - 1.0;
-        uv.x *= 800.0/600.0; // keep proportions
-
-        float r = length(uv);
-        float a = atan(uv.y, uv.x);
-        
-        // 🌀 Add dynamic rotation and time warp
-        a += sin(time * 0.5) * 0.5;
-        r += 0.1 * sin(a * 6.0 + time * 0.8);
-
-        // 🌸 Multi-layer symmetry blending
-        float layers = 6.0;
-        float sym = abs(sin(a * layers + time * 0.3));
-        float pulse = sin(r * 15.0 - time * 1.2) * 0.5 + 0.5;
-
-        // ✨ Depth modulation
-        float depth = sin(r * 5.0 + sym * 3.0 + time * 0.5);
-
-        // 🌈 Rich color mixing with palette function
-        vec3 col = palette(pulse + depth * 0.3);
-        col = mix(col, colors[int(mod(sym * 5.0, 5.0))], 0.4 + 0.3 * sin(time * 0.5));
-        
-        // 🪞 Mirror symmetry for kaleidoscope effect
-        uv.x = abs(uv.x);
-        uv.y = abs(uv.y);
-        col *= (0.6 + 0.4 * sin(r * 6.0 + time));
-
-        // 🌟 Add subtle glow
-        float glow = exp(-r * 2.5) * 0.8;
-        col += glow * vec3(0.8, 0.9, 1.0);
-
-        fragColor = vec4(clamp(col, 0.0, 1.0), 1.0);
-    }
-    """
-
-    prog = ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
-    vbo = ctx.buffer(np.array([-1,-1, 1,-1, -1,1, 1,1], dtype='f4'))
-    vao = ctx.simple_vertex_array(prog, vbo, 'in_vert')
-
-    palette = generate_palette()
-    flat_colors = [v for c in palette for v in c]
-    prog['colors'].write(np.array(flat_colors, dtype='f4').tobytes())
-
-    time_val = 0.0
-    running = True
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                palette = generate_palette()
-                flat_colors = [v for c in palette for v in c]
-                prog['colors'].write(np.array(flat_colors, dtype='f4').tobytes())
-
-        ctx.clear()
-        time_val += 0.02
-        prog['time'].value = time_val
-        vao.render(moderngl.TRIANGLE_STRIP)
-        
-        pygame.display.flip()
-        clock.tick(60)
-
-    # Restore main menu window
-    pygame.display.set_mode(old_screen.get_size(), pygame.RESIZABLE)
-    pygame.display.set_caption("Visual Patterns Simulation")
-    return
+    run_standalone(KaleidoscopeScene())
@@ -1,24 +1,19 @@
 # main.py
-import pygame
+import argparse
+import importlib
+import math
 import sys
+import threading
 import time
-import math
-import kaleidoscope
-import fractal
-import mandala_art
-import fireworks
-import interactive_drawing
-
-pygame.init()
+import pygame
+import fonts
+from dirty_rects import DirtyRects
+from profiler import Profiler
+from scene import Scene
 
 # ---------- SETTINGS ----------
 WIDTH, HEIGHT = 950, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("Visual Patterns Simulation")
-
-font_large = pygame.font.SysFont("Segoe UI", 40, bold=True)
-font_small = pygame.font.SysFont("Segoe UI", 22)
-clock = pygame.time.Clock()
+IDLE_FPS = 20       # only the title pulse animates once everything has settled
 
 # ---------- COLORS ----------
 BG_COLOR = (20, 20, 20)
@@ -29,10 +24,297 @@ TEXT_COLOR = (255, 255, 255)
 BUTTON_COLOR = (255, 140, 0)
 BUTTON_HOVER = (255, 255, 255)
 
+# ---------- SCENE REGISTRY ----------
+# Third-party packages add scenes by declaring an entry point in this group,
+# e.g.  [project.entry-points."visual_patterns.scenes"]  starfield = "starfield:StarfieldScene"
+SCENE_GROUP = "visual_patterns.scenes"
+BUILTIN_SCENES = [
+    ("kaleidoscope", "Kaleidoscope", "kaleidoscope:KaleidoscopeScene"),
+    ("fractal", "Fractal Generator", "fractal:FractalScene"),
+    ("mandala_art", "Mandala Art", "mandala_art:MandalaScene"),
+    ("fireworks", "Fireworks", "fireworks:FireworksScene"),
+    ("interactive_drawing", "Interactive Drawing", "interactive_drawing:DrawingScene"),
+]
+
+def discover_scenes():
+    """(name, menu title, spec) for the built-in scenes, then any installed plugins.
+
+    spec is a "module:Class" string or an entry point; neither is imported
+    here, so listing the scenes stays cheap.
+    """
+    scenes = list(BUILTIN_SCENES)
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points()
+        plugins = found.select(group=SCENE_GROUP) if hasattr(found, "select") else found.get(SCENE_GROUP, [])
+    except Exception:  # broken metadata must not take the menu down
+        plugins = []
+    builtin = {name for name, _, _ in scenes}
+    for ep in plugins:
+        if ep.name not in builtin:
+            scenes.append((ep.name, ep.name.replace("_", " ").title(), ep))
+    return scenes
+
+def load_scene_class(spec):
+    if isinstance(spec, str):
+        module, _, attr = spec.partition(":")
+        return getattr(importlib.import_module(module), attr)
+    return spec.load()
+
+# ---------- SCENE MANAGER ----------
+class SceneManager:
+    """Owns the window, the clock and the one main loop every scene runs in.
+
+    Scenes are created and init()ed once, then kept: switching between them
+    is a window resize and an enter() call. Nothing is imported up front,
+    so the menu (which needs neither moderngl nor the scene modules) shows
+    at once. The first idle menu frame starts preload(), which imports the
+    scene modules on a background thread; warm() then initialises one
+    loaded scene per idle menu frame, so a first visit does not stall on
+    shader compilation either. Both take the hinted scene (the menu hints
+    the button under the mouse) ahead of registry order.
+    """
+
+    def __init__(self, registry=None):
+        pygame.init()
+        self.registry = registry if registry is not None else discover_scenes()
+        self.clock = pygame.time.Clock()
+        self.screen = pygame.display.get_surface()
+        self.classes = {}       # name -> Scene subclass, filled by preload()
+        self.scenes = {}        # name -> Scene instance
+        self.active = None
+        self.home = None        # scene to return to when the active one finishes
+        self.pending = None
+        self.carried = []       # events a scene switch left unhandled, for the next scene
+        self.failed = set()     # scenes whose warm-up init() raised
+        self.hint = None        # scene most likely to be opened next
+        self.loader = None      # preload thread, once started
+        self.lock = threading.Lock()
+        self.profiler = Profiler()
+        self.recorder = None    # recorder.Recorder while F9 recording is on
+
+    # ---------- loading ----------
+    def preload(self):
+        """Import every registered scene module on a background thread."""
+        def load_all():
+            todo = {name: spec for name, _, spec in self.registry}
+            while todo:
+                name = self.hint if self.hint in todo else next(iter(todo))
+                spec = todo.pop(name)
+                try:
+                    cls = load_scene_class(spec)
+                except Exception:  # reported properly if the scene is opened
+                    continue
+                with self.lock:
+                    self.classes.setdefault(name, cls)
+        if self.loader is None:
+            self.loader = threading.Thread(target=load_all, name="scene-preload", daemon=True)
+            self.loader.start()
+        return self.loader
+
+    def scene(self, name):
+        """The Scene instance for name, importing its module if preload has not yet."""
+        if name not in self.scenes:
+            with self.lock:
+                cls = self.classes.get(name)
+            if cls is None:
+                spec = next(spec for n, _, spec in self.registry if n == name)
+                cls = load_scene_class(spec)
+            self.scenes[name] = cls()
+        return self.scenes[name]
+
+    def warm(self):
+        """init() one preloaded scene that has not been initialised yet."""
+        if self.loader is None:
+            self.preload()
+            return
+        with self.lock:
+            names = [name for name in self.classes if name not in self.failed
+                     and (name not in self.scenes or not self.scenes[name].ready)]
+        if self.hint in names:
+            names.insert(0, self.hint)
+        for name in names[:1]:
+            scene = self.scene(name)
+            try:
+                scene.init()
+                scene.ready = True
+            except Exception:  # best effort; activate() retries and raises
+                self.failed.add(name)
+
+    # ---------- switching ----------
+    def switch(self, name):
+        """Show the named scene from the next frame on."""
+        self.pending = name
+
+    def activate(self, scene):
+        if self.active is not None:
+            self.active.exit()
+        if not scene.ready:
+            scene.init()
+            scene.ready = True
+        flags = pygame.RESIZABLE if scene.resizable else 0
+        surface = pygame.display.get_surface()
+        if surface is None or surface.get_size() != tuple(scene.size) or surface.get_flags() & pygame.RESIZABLE != flags:
+            self.screen = pygame.display.set_mode(scene.size, flags)
+        else:
+            self.screen = surface
+        pygame.display.set_caption(scene.caption)
+        scene.done = False
+        scene.enter()
+        self.active = scene
+
+    # ---------- main loop ----------
+    def run(self, scene, home=None):
+        """Run until scene (or, with a home scene, the app) finishes.
+
+        Without a home the previous window, if any, is restored afterwards,
+        which is how the modules' standalone run() functions behave.
+        """
+        previous = pygame.display.get_surface()
+        previous = (previous.get_size(), pygame.display.get_caption()[0]) if previous and home is None else None
+        self.home = home
+        self.activate(scene)
+        dt = 1.0 / scene.fps
+        while self.active is not None:
+            self.frame(dt)
+            dt = self.clock.tick(self.active.fps if self.active else 60) / 1000.0
+        if previous:
+            pygame.display.set_mode(previous[0], pygame.RESIZABLE)
+            pygame.display.set_caption(previous[1])
+
+    def frame(self, dt):
+        scene, profiler = self.active, self.profiler
+        profiler.begin()
+        # get(), not peek(): pygame 2.6's peek() drops a reference to a posted event's dict,
+        # which get() then frees again
+        events, self.carried = self.carried + pygame.event.get(), []
+        if not events and scene.idle() and not self.recorder:
+            # nothing is animating: sleep until the next input (not counted as a frame)
+            profiler.pause()
+            events = [pygame.event.wait()] + pygame.event.get()
+            profiler.begin()
+        for index, event in enumerate(events):
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                if not profiler.toggle():
+                    scene.invalidate()      # repaint what the HUD covered
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.export(time.strftime("profile-%Y%m%d-%H%M%S.csv"))
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                if self.recorder:
+                    self.stop_recording()
+                else:
+                    self.record(time.strftime("recording-%Y%m%d-%H%M%S.mp4"))
+                continue
+            if event.type == pygame.QUIT:
+                if scene is self.home or self.home is None:
+                    self.quit()
+                    return
+                scene.done = True
+            elif event.type == pygame.VIDEORESIZE and scene.resizable:
+                self.screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                scene.resize((event.w, event.h))
+            else:
+                scene.handle_event(event)
+            if scene.done or self.pending:
+                self.carried = events[index + 1:]   # the rest of the batch goes to the next scene
+                break
+
+        profiler.mark("events")
+
+        if not scene.done and not self.pending:
+            scene.update(dt)
+            profiler.mark("update")
+            rects = scene.render(self.screen)
+            stats = scene.stats()
+            if self.recorder and rects != []:   # an unchanged frame just stays up longer in the recording
+                self.capture(stats)
+            if profiler.visible:
+                hud = profiler.draw(self.screen)
+                if rects is not None:
+                    rects = list(rects) + [hud]
+            profiler.mark("render")
+            if rects is None:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+            profiler.mark("present")
+            profiler.end(scene.title, stats)
+            if scene is self.home and not events:
+                self.warm()
+
+        if self.pending:
+            name, self.pending = self.pending, None
+            self.activate(self.scene(name))
+        elif scene.done:
+            if self.home is None or scene is self.home:
+                self.quit()
+            else:
+                self.activate(self.home)
+
+    # ---------- recording ----------
+    def record(self, path):
+        """Record every frame shown from now on (video via ffmpeg, else an animated PNG)."""
+        from recorder import Recorder
+        self.recorder = Recorder(path, self.screen.get_size(), self.active.fps if self.active else 60)
+        gpu = self.gpu()
+        if gpu is not None:
+            gpu.presented = None
+        print(f"Recording to {self.recorder.path}")
+
+    def gpu(self):
+        """The shared RenderContext, or None while no GL scene has created it."""
+        if "render_context" in sys.modules:     # importing it here would load GL for the pygame modules
+            return sys.modules["render_context"].current()
+        return None
+
+    def capture(self, stats):
+        recorder = self.recorder
+        if self.screen.get_size() != recorder.size:     # a scene switch resized the window
+            self.stop_recording()
+            return
+        gpu = self.gpu()
+        presented = gpu.presented if gpu is not None else None
+        try:
+            if presented == (recorder.size, (0, 0)):
+                # the window is the GL frame: read it back through pixel buffers, without a stall
+                gpu.presented = None
+                recorder.capture_fbo(gpu.target(recorder.size)[0])
+            else:
+                recorder.capture(self.screen)
+        except Exception as exc:  # the encoder failed (ffmpeg died, disk full): stop recording, keep the show
+            self.stop_recording(exc)
+            return
+        stats["recorded"], stats["dropped"] = recorder.frames, recorder.dropped
+
+    def stop_recording(self, error=None):
+        recorder, self.recorder = self.recorder, None
+        try:
+            recorder.close()
+        except Exception as exc:
+            error = error or exc
+        if error is not None:
+            print(f"Recording to {recorder.path} stopped after {recorder.frames} frames: {error}",
+                  file=sys.stderr)
+            return
+        print(f"Saved {recorder.path}: {recorder.frames} frames, {recorder.dropped} dropped")
+
+    def quit(self):
+        if self.recorder:
+            self.stop_recording()
+        if self.active is not None:
+            self.active.exit()
+        for scene in self.scenes.values():
+            if scene.ready:
+                scene.release()
+        self.active = None
+
 # ---------- BUTTON CLASS ----------
 class Button:
-    def __init__(self, text, y, action):
+    def __init__(self, text, y, action, font, name=None):
         self.text = text
+        self.name = name
         self.y = y
         self.action = action
         self.rect = pygame.Rect(-250, y, 220, 60)
@@ -40,108 +322,186 @@ class Button:
         self.hovered = False
         self.base_color = pygame.Color(80, 60, 180)
         self.glow_alpha = 0
+        self.text_surf = font.render(text, True, TEXT_COLOR)
+        # opaque glow shape, faded with a per-surface alpha when drawn
+        self.glow = pygame.Surface((self.rect.width + 20, self.rect.height + 20), pygame.SRCALPHA)
+        pygame.draw.rect(self.glow, (*HOVER_GLOW, 255), self.glow.get_rect(), border_radius=20)
 
-    def draw(self, surface):
+    def bounds(self):
+        """Screen area the button and its glow can cover."""
+        return self.rect.inflate(20, 20)
+
+    def animate(self):
+        """Advance the slide-in and hover glow. Returns True if the look changed."""
+        before = (self.rect.x, int(self.glow_alpha))
         self.rect.x += (self.target_x - self.rect.x) * 0.2
         mouse = pygame.mouse.get_pos()
         self.hovered = self.rect.collidepoint(mouse)
         target_alpha = 60 if self.hovered else 0
         self.glow_alpha += (target_alpha - self.glow_alpha) * 0.2
+        return (self.rect.x, int(self.glow_alpha)) != before
+
+    def draw(self, surface):
         pygame.draw.rect(surface, self.base_color, self.rect, border_radius=15)
         if self.glow_alpha > 0.5:
-            glow = pygame.Surface((self.rect.width + 20, self.rect.height + 20), pygame.SRCALPHA)
-            pygame.draw.rect(glow, (*HOVER_GLOW, int(self.glow_alpha)), glow.get_rect(), border_radius=20)
-            surface.blit(glow, (self.rect.x - 10, self.rect.y - 10))
-        text_surf = font_small.render(self.text, True, TEXT_COLOR)
-        surface.blit(text_surf, (self.rect.x + 25, self.rect.y + 18))
-
-    def update(self, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONDOWN and self.hovered:
-                self.action()
-
-# ---------- SIDEBAR ----------
-sidebar_width = 0
-sidebar_target = 260
-sidebar_open = True
-animation_speed = 20
-
-def toggle_sidebar():
-    global sidebar_open
-    sidebar_open = not sidebar_open
-
-# ---------- MODULE ACTIONS ----------
-def run_kaleidoscope(): kaleidoscope.run()
-def run_fractal(): fractal.run()
-def run_rangoli(): mandala_art.run()
-def run_fireworks(): fireworks.run_fireworks()
-def run_drawing(): interactive_drawing.run_drawing()
-
-# ---------- BUTTON LIST ----------
-buttons = [
-    Button("Kaleidoscope", 150, run_kaleidoscope),
-    Button("Fractal Generator", 230, run_fractal),
-    Button("Mandala Art", 310, run_rangoli),
-    Button("Fireworks", 390, run_fireworks),
-    Button("Interactive Drawing", 470, run_drawing),
-]
+            self.glow.set_alpha(int(self.glow_alpha))
+            surface.blit(self.glow, (self.rect.x - 10, self.rect.y - 10))
+        surface.blit(self.text_surf, (self.rect.x + 25, self.rect.y + 18))
+
+    def handle_event(self, event):
+        """Run the action on click. Returns True if it ran."""
+        if event.type == pygame.MOUSEBUTTONDOWN and self.hovered:
+            self.action()
+            return True
+        return False
 
 # ---------- MAIN MENU ----------
-def menu():
-    global sidebar_width, WIDTH, HEIGHT
-    running = True
-    while running:
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT:  # <-- Fully quit program
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.VIDEORESIZE:
-                WIDTH, HEIGHT = event.w, event.h
-                pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_TAB:
-                    toggle_sidebar()
+def build_background(size, sidebar_width, font_large, font_small):
+    """Static layer: background, sidebar, its heading and the footer tip."""
+    w, h = size
+    layer = pygame.Surface(size)
+    layer.fill(BG_COLOR)
+    if sidebar_width > 0:
+        shadow = pygame.Surface((10, h), pygame.SRCALPHA)
+        pygame.draw.rect(shadow, (0, 0, 0, 60), shadow.get_rect())
+        layer.blit(shadow, (sidebar_width - 10, 0))
+        layer.fill(SIDEBAR_COLOR, (0, 0, sidebar_width, h))
+        layer.blit(fonts.render(font_large, "Menu", ACCENT), (40, 60))
+    tip = fonts.render(font_small, "Press TAB to toggle sidebar", (200, 200, 200))
+    layer.blit(tip, (w - tip.get_width() - 20, h - 40))
+    return layer
+
+
+class MenuScene(Scene):
+    title = "Menu"
+    caption = "Visual Patterns Simulation"
+    size = (WIDTH, HEIGHT)
+    resizable = True
+
+    # sidebar
+    sidebar_target = 260
+    animation_speed = 20
 
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+        self.sidebar_width = 0
+        self.sidebar_open = True
+        self.fps = IDLE_FPS
+
+    def init(self):
+        self.font_large = fonts.get("Segoe UI", 40, bold=True)
+        self.font_small = fonts.get("Segoe UI", 22)
+        self.buttons = [
+            Button(title, 150 + 80 * i, lambda name=name: self.manager.switch(name), self.font_small, name)
+            for i, (name, title, _) in enumerate(self.manager.registry)
+        ]
+        self.title_text = self.font_large.render("Visual Patterns Simulation", True, TEXT_COLOR)
+        self.title_glow = pygame.Surface((self.title_text.get_width() + 30, self.title_text.get_height() + 30),
+                                         pygame.SRCALPHA)
+        pygame.draw.rect(self.title_glow, (*ACCENT, 255), self.title_glow.get_rect(), border_radius=15)
+        self.dirty = DirtyRects(self.size)
+        self.background_key = None
+
+    def enter(self):
+        self.dirty.resize(self.size)
+        self.title_alpha = None
+
+    def resize(self, size):
+        self.size = size
+        self.dirty.resize(size)
+
+    def invalidate(self):
+        self.dirty.full()
+
+    def toggle_sidebar(self):
+        self.sidebar_open = not self.sidebar_open
+
+    def handle_event(self, event):
+        if event.type == pygame.VIDEOEXPOSE:
+            self.invalidate()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_TAB:
+            self.toggle_sidebar()
+        elif self.sidebar_width > 0:
+            for btn in self.buttons:
+                if btn.handle_event(event):
+                    break
+
+    def update(self, dt):
         # Sidebar width animation
-        if sidebar_open and sidebar_width < sidebar_target:
-            sidebar_width += animation_speed
-        elif not sidebar_open and sidebar_width > 0:
-            sidebar_width -= animation_speed
-
-        # Background
-        screen.fill(BG_COLOR)
-
-        # Sidebar
-        if sidebar_width > 0:
-            sidebar_surface = pygame.Surface((sidebar_width, HEIGHT))
-            sidebar_surface.fill(SIDEBAR_COLOR)
-            shadow = pygame.Surface((10, HEIGHT), pygame.SRCALPHA)
-            pygame.draw.rect(shadow, (0,0,0,60), shadow.get_rect())
-            screen.blit(shadow, (sidebar_width-10,0))
-            screen.blit(sidebar_surface, (0,0))
-            title = font_large.render("Menu", True, ACCENT)
-            screen.blit(title, (40, 60))
-            for btn in buttons:
-                btn.update(events)
-                btn.draw(screen)
+        if self.sidebar_open and self.sidebar_width < self.sidebar_target:
+            self.sidebar_width += self.animation_speed
+        elif not self.sidebar_open and self.sidebar_width > 0:
+            self.sidebar_width -= self.animation_speed
+
+        # Static layer, rebuilt only while the sidebar slides or after a resize
+        key = (tuple(self.size), self.sidebar_width)
+        if self.background_key != key:
+            self.background_key = key
+            self.background = build_background(self.size, self.sidebar_width, self.font_large, self.font_small)
+            self.dirty.full()
+
+        # Buttons
+        animating = False
+        if self.sidebar_width > 0:
+            for btn in self.buttons:
+                old = btn.bounds()
+                if btn.animate():
+                    animating = True
+                    self.dirty.add(old)
+                    self.dirty.add(btn.bounds())
+                if btn.hovered:
+                    self.manager.hint = btn.name
+        sliding = 0 < self.sidebar_width < self.sidebar_target
+        self.fps = 60 if animating or sliding else IDLE_FPS
 
         # Center title
-        t = time.time()
-        glow_alpha = 60 + 30*math.sin(t*2)
-        title_text = font_large.render("Visual Patterns Simulation", True, TEXT_COLOR)
-        glow = pygame.Surface((title_text.get_width()+30, title_text.get_height()+30), pygame.SRCALPHA)
-        pygame.draw.rect(glow, (*ACCENT, int(glow_alpha)), glow.get_rect(), border_radius=15)
-        title_x = WIDTH/2 - title_text.get_width()/2 + 100
-        screen.blit(glow, (title_x-15,40))
-        screen.blit(title_text, (title_x,50))
-
-        # Footer tip
-        tip = font_small.render("Press TAB to toggle sidebar", True, (200,200,200))
-        screen.blit(tip, (WIDTH-tip.get_width()-20, HEIGHT-40))
-
-        pygame.display.flip()
-        clock.tick(60)
+        glow_alpha = int(60 + 30*math.sin(time.time()*2))
+        self.title_x = self.size[0]/2 - self.title_text.get_width()/2 + 100
+        self.title_rect = self.title_glow.get_rect(topleft=(self.title_x-15, 40))
+        if glow_alpha != self.title_alpha:
+            self.title_alpha = glow_alpha
+            self.dirty.add(self.title_rect)
+
+    def render(self, screen):
+        regions = self.dirty.take()
+        for rect in regions:
+            screen.set_clip(rect)
+            screen.blit(self.background, (0, 0))
+            if self.sidebar_width > 0:
+                for btn in self.buttons:
+                    btn.draw(screen)
+            self.title_glow.set_alpha(self.title_alpha)
+            screen.blit(self.title_glow, self.title_rect)
+            screen.blit(self.title_text, (self.title_x,50))
+        screen.set_clip(None)
+        return regions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Visual Patterns Simulation")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="on exit, write the last frame timings to PATH (.csv or .json)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record the session to PATH (.mp4 etc. needs ffmpeg; .png is an animated PNG)")
+    args = parser.parse_args(argv)
+
+    manager = SceneManager()
+    menu = MenuScene(manager)
+    try:
+        if args.record:
+            manager.activate(menu)
+            manager.record(args.record)
+        manager.run(menu, home=menu)
+        if args.profile:
+            manager.profiler.export(args.profile)
+    finally:
+        if "render_context" in sys.modules:     # only once a GL scene was loaded
+            sys.modules["render_context"].release()
+        if "audio" in sys.modules:
+            sys.modules["audio"].release()
+        pygame.quit()
+    sys.exit()
 
 if __name__ == "__main__":
-    menu()
+    main()
@@ -4,356 +4,419 @@ import moderngl
 import numpy as np
 import random
 import time
-from pygame.locals import DOUBLEBUF, OPENGL
+import fonts
+import offscreen
+import render_context
+from palette import PaletteLUT, FADE, generate, hsv_to_rgb    # hsv_to_rgb: kept importable from here
+from progressive import ProgressiveView
+from overlay import TextPanel, GLOverlay
+from scene import Scene, run_standalone
+from png_writer import PNGWriter
 
 WIDTH, HEIGHT = 800, 600
 
-# ---------------- palette helpers ----------------
-def hsv_to_rgb(h, s, v):
-    """h:0..1, s:0..1, v:0..1 -> r,g,b 0..1"""
-    i = int(h * 6.0)
-    f = (h * 6.0) - i
-    p = v * (1.0 - s)
-    q = v * (1.0 - f * s)
-    t = v * (1.0 - (1.0 - f) * s)
-    i %= 6
-    if i == 0:
-        r, g, b = v, t, p
-    elif i == 1:
-        r, g, b = q, v, p
-    elif i == 2:
-        r, g, b = p, v, t
-    elif i == 3:
-        r, g, b = p, q, v
-    elif i == 4:
-        r, g, b = t, p, v
-    else:
-        r, g, b = v, p, q
-    return (r, g, b)
-
-def generate_palette(n=6, style='vibrant'):
-    """Return list of n RGB triplets (0..1). Style can bias saturation/value."""
-    base = random.random()
-    palette = []
-    for i in range(n):
-        h = (base + i * (0.61803398875)) % 1.0  # golden-ish spacing
-        if style == 'pastel':
-            s = random.uniform(0.25, 0.5)
-            v = random.uniform(0.9, 1.0)
-        elif style == 'cool':
-            s = random.uniform(0.5, 0.85)
-            v = random.uniform(0.7, 0.95)
-            h = (h + 0.5) % 1.0
-        else:  # vibrant
-            s = random.uniform(0.65, 0.95)
-            v = random.uniform(0.75, 1.0)
-        palette.append(hsv_to_rgb(h, s, v))
-    return palette
-
-# ---------------- main run() ----------------
-def run():
-    # save old pygame surface so we can restore after exiting
-    old_screen = pygame.display.get_surface()
-
-    pygame.display.set_mode((WIDTH, HEIGHT), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Digital Mandala Studio")
-    clock = pygame.time.Clock()
-
-    ctx = moderngl.create_context()
-
-    # Vertex shader (fullscreen quad)
-    vertex_shader = """
-    #version 330
-    in vec2 in_vert;
-    out vec2 v_uv;
-    void main() {
-        v_uv = in_vert * 0.5 + 0.5;
-        gl_Position = vec4(in_vert, 0.0, 1.0);
-    }
-    """
-
-    # Fragment shader - artistic digital mandala with modes, folding (symmetry), palette blending & glow
-    fragment_shader = """
-    #version 330
-    uniform vec2 iResolution;
-    uniform float iTime;
-    uniform vec2 focal;    // pan (-1..1)
-    uniform float zoom;
-    uniform int folds;
-    uniform int mode;
-    uniform vec3 palette[6];
-
-    in vec2 v_uv;
-    out vec4 fragColor;
-
-    // rotate matrix
-    mat2 rot(float a){ float c=cos(a), s=sin(a); return mat2(c,-s,s,c); }
-
-    // small hash / noise
-    float hash21(vec2 p){
-        p = fract(p * vec2(123.34, 456.21));
-        p += dot(p, p + 23.45);
-        return fract(p.x * p.y);
-    }
-
-    vec3 samplePalette(float t){
-        t = fract(t);
-        float idx = t * 6.0;
-        int i = int(floor(idx));
-        int j = (i + 1) % 6;
-        float f = fract(idx);
-        return mix(palette[i], palette[j], smoothstep(0.0, 1.0, f));
-    }
-
-    void main(){
-        vec2 uv = (gl_FragCoord.xy / iResolution.xy) * 2.0 - 1.0;
-        uv.x *= iResolution.x / iResolution.y;
-
-        // apply pan/zoom
-        vec2 p = (uv - focal) / zoom;
-
-        float r = length(p);
-        float a = atan(p.y, p.x);
-
-        // fold angle into symmetric sector and mirror for kaleidoscope
-        float F = max(1, folds);
-        float sector = 2.0 * 3.141592653589793 / F;
-        float aa = mod(a + 3.141592653589793, sector);
-        aa = abs(aa - sector*0.5);
-
-        float t = iTime * 0.9;
-
-        vec3 color = vec3(0.0);
-        float mask = 0.0;
-
-        if(mode == 1){
-            // petal/ripple mode: sharp petals with soft edges
-            float petals = 6.0 + 6.0 * sin(t*0.25);
-            float val = cos(aa * petals - r * 18.0 + sin(t*0.6)*2.0);
-            mask = smoothstep(0.05, 0.65, val * (1.0 - r*0.7));
-            color = samplePalette(0.12 + 0.8 * mask + 0.05 * sin(t + r*5.0));
-        } else if(mode == 2){
-            // layered rings with noise and angular modulation
-            float rings = sin(r*14.0 - aa*8.0 + t*1.3);
-            float n = hash21(p*6.0 + t*0.2);
-            mask = smoothstep(-0.1, 0.8, rings + 0.25 * n - r*0.9);
-            color = samplePalette(0.1 + 0.7*mask + 0.08*n);
-        } else if(mode == 3){
-            // swirl + fractal-ish layering
-            vec2 q = p + 0.4 * vec2(cos(t*0.9), sin(t*0.9));
-            float swirl = sin(6.0*aa + 10.0 * r + 0.9 * hash21(q*8.0 + t));
-            mask = smoothstep(-0.2, 0.6, swirl - r*0.8);
-            color = samplePalette(0.2 + 0.8 * mask);
-            color += vec3(0.7,0.6,0.9) * exp(-r*4.0); // center glow
-        } else {
-            // star/spoke + subtle fractal sum
-            float sum = 0.0;
-            vec2 z = p * 1.3;
-            for(int i=0;i<5;i++){
-                z = vec2(z.x*z.x - z.y*z.y, 2.0*z.x*z.y) + 0.2*vec2(cos(aa*(i+1.5)), sin(aa*(i+2.0)));
-                sum += sin(length(z)*3.0 + t*0.6 + float(i));
-            }
-            mask = smoothstep(-1.0, 1.0, sum*0.35 - r*0.7);
-            color = samplePalette(0.3 + 0.6*mask);
+VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+out vec2 v_uv;
+void main() {
+    v_uv = in_vert * 0.5 + 0.5;
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+# Fragment shader - artistic digital mandala with modes, folding (symmetry), palette blending & glow
+FRAGMENT_SHADER = """
+#version 330
+uniform vec2 iResolution;
+uniform vec2 tileOffset; // pixel origin of this tile in a tiled export (0 on screen)
+uniform float iTime;
+uniform vec2 focal;    // pan (-1..1)
+uniform float zoom;
+uniform int folds;
+uniform int mode;
+uniform sampler2D paletteLut;  // palette.PaletteLUT: previous and current palette, one row each
+uniform vec2 paletteCoord;     // (half a texel, row blend)
+
+in vec2 v_uv;
+out vec4 fragColor;
+
+// rotate matrix
+mat2 rot(float a){ float c=cos(a), s=sin(a); return mat2(c,-s,s,c); }
+
+// small hash / noise
+float hash21(vec2 p){
+    p = fract(p * vec2(123.34, 456.21));
+    p += dot(p, p + 23.45);
+    return fract(p.x * p.y);
+}
+
+// cyclic palette, smoothstep-blended between its six colours when baked; filtering cross-fades rows
+vec3 samplePalette(float t){
+    return texture(paletteLut, vec2(t, 0.0) + paletteCoord).rgb;
+}
+
+void main(){
+    vec2 fragCoord = gl_FragCoord.xy + tileOffset;
+    vec2 uv = (fragCoord / iResolution.xy) * 2.0 - 1.0;
+    uv.x *= iResolution.x / iResolution.y;
+
+    // apply pan/zoom
+    vec2 p = (uv - focal) / zoom;
+
+    float r = length(p);
+    float a = atan(p.y, p.x);
+
+    // fold angle into symmetric sector and mirror for kaleidoscope
+    float F = max(1, folds);
+    float sector = 2.0 * 3.141592653589793 / F;
+    float aa = mod(a + 3.141592653589793, sector);
+    aa = abs(aa - sector*0.5);
+
+    float t = iTime * 0.9;
+
+    vec3 color = vec3(0.0);
+    float mask = 0.0;
+
+    if(mode == 1){
+        // petal/ripple mode: sharp petals with soft edges
+        float petals = 6.0 + 6.0 * sin(t*0.25);
+        float val = cos(aa * petals - r * 18.0 + sin(t*0.6)*2.0);
+        mask = smoothstep(0.05, 0.65, val * (1.0 - r*0.7));
+        color = samplePalette(0.12 + 0.8 * mask + 0.05 * sin(t + r*5.0));
+    } else if(mode == 2){
+        // layered rings with noise and angular modulation
+        float rings = sin(r*14.0 - aa*8.0 + t*1.3);
+        float n = hash21(p*6.0 + t*0.2);
+        mask = smoothstep(-0.1, 0.8, rings + 0.25 * n - r*0.9);
+        color = samplePalette(0.1 + 0.7*mask + 0.08*n);
+    } else if(mode == 3){
+        // swirl + fractal-ish layering
+        vec2 q = p + 0.4 * vec2(cos(t*0.9), sin(t*0.9));
+        float swirl = sin(6.0*aa + 10.0 * r + 0.9 * hash21(q*8.0 + t));
+        mask = smoothstep(-0.2, 0.6, swirl - r*0.8);
+        color = samplePalette(0.2 + 0.8 * mask);
+        color += vec3(0.7,0.6,0.9) * exp(-r*4.0); // center glow
+    } else {
+        // star/spoke + subtle fractal sum
+        float sum = 0.0;
+        vec2 z = p * 1.3;
+        for(int i=0;i<5;i++){
+            z = vec2(z.x*z.x - z.y*z.y, 2.0*z.x*z.y) + 0.2*vec2(cos(aa*(i+1.5)), sin(aa*(i+2.0)));
+            sum += sin(length(z)*3.0 + t*0.6 + float(i));
         }
+        mask = smoothstep(-1.0, 1.0, sum*0.35 - r*0.7);
+        color = samplePalette(0.3 + 0.6*mask);
+    }
 
-        // combine base color and soft glow & bloom
-        float vign = smoothstep(1.2, 0.15, r);
-        vec3 grain = vec3(hash21(gl_FragCoord.xy * 0.012 + t*0.1) * 0.03);
-        color = mix(vec3(0.015,0.01,0.04), color, vign);
-        color += grain;
-
-        float brightness = length(color);
-        color += 0.28 * pow(max(0.0, brightness), 2.2) * vec3(1.0,0.9,1.0) * exp(-r*3.0);
-
-        // subtle colored rim based on angle to emphasize symmetry lines
-        color += 0.08 * samplePalette(fract((aa*5.0 + t*0.1)));
+    // combine base color and soft glow & bloom
+    float vign = smoothstep(1.2, 0.15, r);
+    vec3 grain = vec3(hash21(fragCoord * 0.012 + t*0.1) * 0.03);
+    color = mix(vec3(0.015,0.01,0.04), color, vign);
+    color += grain;
 
-        fragColor = vec4(clamp(color, 0.0, 1.0), 1.0);
-    }
-    """
+    float brightness = length(color);
+    color += 0.28 * pow(max(0.0, brightness), 2.2) * vec3(1.0,0.9,1.0) * exp(-r*3.0);
 
-    prog = ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
-
-    # full-screen quad
-    vbo = ctx.buffer(np.array([-1.0, -1.0,  1.0, -1.0,  -1.0, 1.0,  1.0, 1.0], dtype='f4'))
-    vao = ctx.simple_vertex_array(prog, vbo, 'in_vert')
-
-    # initial uniform values
-    prog['iResolution'].value = (float(WIDTH), float(HEIGHT))
-    prog['iTime'].value = 0.0
-    prog['focal'].value = (0.0, 0.0)
-    prog['zoom'].value = 1.0
-    prog['folds'].value = 12
-    prog['mode'].value = 1
-
-    # palette
-    palette = generate_palette(6, style='vibrant')
-    flat = [c for col in palette for c in col]
-    prog['palette'].write(np.array(flat, dtype='f4').tobytes())
-
-    # interactive state
-    running = True
-    start_time = time.time()
-    animate = True
-    anim_speed = 1.0
-    folds = 12
-    mode = 1
-    zoom = 1.0
-    focal = [0.0, 0.0]
-    dragging = False
-    last_mouse = (0, 0)
-    fade = 0.0       # 0 = fully visible, 1 = fully faded (erase)
-    fade_target = 0.0
-
-    # small helper to write the palette to shader
-    def upload_palette(new_palette):
-        flatp = [c for col in new_palette for c in col]
-        prog['palette'].write(np.array(flatp, dtype='f4').tobytes())
-
-    # UI font (pygame)
-    pygame.font.init()
-    font = pygame.font.SysFont("Segoe UI", 16)
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
-                elif event.key == pygame.K_SPACE:
-                    animate = not animate
-                elif event.key == pygame.K_UP:
-                    anim_speed = min(4.0, anim_speed + 0.1)
-                elif event.key == pygame.K_DOWN:
-                    anim_speed = max(0.05, anim_speed - 0.1)
-                elif event.key == pygame.K_LEFT:
-                    folds = max(2, folds - 1); prog['folds'].value = folds
-                elif event.key == pygame.K_RIGHT:
-                    folds = min(64, folds + 1); prog['folds'].value = folds
-                elif event.key in (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4):
-                    mode = int(event.unicode); prog['mode'].value = mode
-                elif event.key == pygame.K_r:
-                    # randomize palette only
-                    palette = generate_palette(6, style=random.choice(['vibrant','cool','pastel']))
-                    upload_palette(palette)
-                elif event.key == pygame.K_s:
-                    # save a screenshot
-                    px = ctx.fbo.read(components=3, alignment=1)
-                    img = pygame.image.fromstring(px, (WIDTH, HEIGHT), 'RGB')
-                    pygame.image.save(img, "mandala.png")
-                    print("Saved mandala.png")
-                elif event.key == pygame.K_e:
-                    # start fade to erase
-                    fade_target = 1.0
-                elif event.key == pygame.K_d:
-                    # resume drawing (cancel fade)
-                    fade_target = 0.0
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    # left click: randomize pattern seed (palette + slight time nudge)
-                    palette = generate_palette(6, style=random.choice(['vibrant','cool','pastel']))
-                    upload_palette(palette)
-                    # nudge time so visuals shift
-                    start_time -= 0.2 * random.random()
-                    # start dragging
-                    dragging = True
-                    last_mouse = event.pos
-                elif event.button == 3:
-                    # right click: reset focal/zoom
-                    focal = [0.0, 0.0]
-                    zoom = 1.0
-                    prog['zoom'].value = zoom
-                    prog['focal'].value = tuple(focal)
-                elif event.button == 4:  # wheel up: zoom in towards mouse
-                    mx, my = event.pos
-                    ndc_x = (mx / WIDTH) * 2.0 - 1.0
-                    ndc_y = (my / HEIGHT) * 2.0 - 1.0
-                    ndc_x *= WIDTH / HEIGHT
-                    focal[0] += ndc_x * 0.05 / zoom
-                    focal[1] -= ndc_y * 0.05 / zoom
-                    zoom *= 1.12
-                    prog['zoom'].value = zoom
-                    prog['focal'].value = tuple(focal)
-                elif event.button == 5:  # wheel down: zoom out
-                    mx, my = event.pos
-                    ndc_x = (mx / WIDTH) * 2.0 - 1.0
-                    ndc_y = (my / HEIGHT) * 2.0 - 1.0
-                    ndc_x *= WIDTH / HEIGHT
-                    focal[0] -= ndc_x * 0.04 / zoom
-                    focal[1] += ndc_y * 0.04 / zoom
-                    zoom /= 1.12
-                    prog['zoom'].value = zoom
-                    prog['focal'].value = tuple(focal)
-
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 1:
-                    dragging = False
-
-            elif event.type == pygame.MOUSEMOTION:
-                if dragging:
-                    mx, my = event.pos
-                    lx, ly = last_mouse
-                    dx = (mx - lx) / float(WIDTH)
-                    dy = (my - ly) / float(HEIGHT)
-                    focal[0] -= dx * 2.0 / zoom * (WIDTH / HEIGHT)
-                    focal[1] += dy * 2.0 / zoom
-                    prog['focal'].value = tuple(focal)
-                    last_mouse = event.pos
+    // subtle colored rim based on angle to emphasize symmetry lines
+    color += 0.08 * samplePalette(fract((aa*5.0 + t*0.1)));
 
-        # update time uniform
-        now = time.time()
-        elapsed = now - start_time
-        prog['iTime'].value = elapsed * anim_speed if animate else 0.0
+    fragColor = vec4(clamp(color, 0.0, 1.0), 1.0);
+}
+"""
 
-        # update uniforms
+# ---------------- palette helpers ----------------
+def generate_palette(n=6, style='vibrant'):
+    """Return list of n RGB triplets (0..1). Style can bias saturation/value."""
+    return [tuple(rgb) for rgb in generate(n, style).tolist()]
+
+# ---------------- headless rendering ----------------
+def render_frames(frames=1, size=(WIDTH, HEIGHT), dt=1.0 / 60.0, palette=None, style='vibrant',
+                  mode=1, folds=12, zoom=1.0, focal=(0.0, 0.0), start_time=0.0, out=None, ctx=None):
+    """Render mandala frames headlessly into numpy arrays, or PNG files when out is a pattern."""
+    colors = generate_palette(6, style=style) if palette is None else palette
+    with offscreen.Offscreen(VERTEX_SHADER, FRAGMENT_SHADER, size, ctx) as view, \
+            PaletteLUT(view.ctx) as lut:
+        prog = view.prog
+        prog['iResolution'].value = (float(size[0]), float(size[1]))
+        prog['focal'].value = tuple(focal)
         prog['zoom'].value = zoom
+        prog['folds'].value = folds
+        prog['mode'].value = mode
+        lut.set(colors)
+        lut.use(prog)
+        return view.render_sequence(frames, 'iTime', start_time, dt, out)
+
+def export_tiled(path, size=(8192, 8192), tile=1024, palette=None, style='vibrant',
+                 mode=1, folds=12, zoom=1.0, focal=(0.0, 0.0), time_value=0.0, ctx=None):
+    """Render a mandala of arbitrary size to a PNG, one band of tiles at a time.
+
+    Every tile is drawn with iResolution set to the full output size and
+    tileOffset set to the tile's pixel origin, so tiles join seamlessly.
+    Each finished band of rows is streamed into the PNG encoder, so peak
+    memory is one tile-high band, not the whole image.
+    """
+    width, height = size
+    colors = generate_palette(6, style=style) if palette is None else palette
+    with offscreen.Offscreen(VERTEX_SHADER, FRAGMENT_SHADER, (tile, tile), ctx) as view, \
+            PaletteLUT(view.ctx) as lut, PNGWriter(path, width, height) as png:
+        prog = view.prog
+        prog['iResolution'].value = (float(width), float(height))
+        prog['iTime'].value = time_value
         prog['focal'].value = tuple(focal)
+        prog['zoom'].value = zoom
         prog['folds'].value = folds
         prog['mode'].value = mode
-
+        lut.set(colors)
+        lut.use(prog)
+
+        band = np.empty((tile, width, 3), dtype=np.uint8)
+        for top in range(0, height, tile):
+            th = min(tile, height - top)
+            gl_y = height - top - th  # GL rows count up from the bottom
+            for x in range(0, width, tile):
+                tw = min(tile, width - x)
+                prog['tileOffset'].value = (float(x), float(gl_y))
+                view.fbo.use()
+                view.fbo.viewport = (0, 0, tw, th)
+                view.vao.render(moderngl.TRIANGLE_STRIP)
+                data = view.fbo.read(viewport=(0, 0, tw, th), components=3, alignment=1)
+                band[:th, x:x + tw] = np.frombuffer(data, dtype=np.uint8).reshape(th, tw, 3)[::-1]
+            png.write_rows(band[:th])
+    return path
+
+# ---------------- scene ----------------
+INFO_KEYS = [
+    "LMB: new mandala / drag to pan  |  Wheel: zoom  |  R: palette  |  E: erase  |  D: resume",
+    "1-4: modes  |  ←/→ folds  ↑/↓ speed  | S: save PNG  | Esc: exit"
+]
+
+class MandalaScene(Scene):
+    title = "Mandala Art"
+    caption = "Digital Mandala Studio"
+    size = (WIDTH, HEIGHT)
+
+    def __init__(self, quality=None):
+        super().__init__()
+        self.quality = quality  # fixed render scale; None adapts to the frame time
+
+    def init(self):
+        # shared context: the program is compiled once per run
+        self.gpu = render_context.get()
+        self.prog = self.gpu.program(VERTEX_SHADER, FRAGMENT_SHADER)
+        # drawn coarse while dragging / zooming, refined with supersampling once still
+        self.view = ProgressiveView(self.gpu, (WIDTH, HEIGHT), jitter='tileOffset', quality=self.quality)
+        self.lut = PaletteLUT(self.gpu.ctx)
+        self.palette_version = 0
+        # UI text panel, redrawn only when its text changes and blended over the frame on the GPU
+        self.font = fonts.get("Segoe UI", 16)
+        self.panel = TextPanel((WIDTH, 72), self.font)
+        self.overlay = GLOverlay(self.gpu)
+
+    def release(self):
+        self.overlay.release()
+        self.lut.release()
+
+    def enter(self):
+        prog = self.prog
+        # initial uniform values
+        prog['iResolution'].value = (float(WIDTH), float(HEIGHT))
+        prog['iTime'].value = 0.0
+        prog['tileOffset'].value = (0.0, 0.0)
+        self.upload_palette(generate_palette(6, style='vibrant'))
+
+        # interactive state
+        self.time_val = 0.0   # animation time, advanced in update() while animating
+        self.animate = True
+        self.anim_speed = 1.0
+        self.folds = 12
+        self.mode = 1
+        self.zoom = 1.0
+        self.focal = [0.0, 0.0]
+        self.dragging = False
+        self.last_mouse = (0, 0)
+        self.fade = 0.0       # 0 = fully visible, 1 = fully faded (erase)
+        self.fade_target = 0.0
+        self.save_to = None   # the next render saves the frame (without the overlay) here
+        self.still = None     # finished frame with its overlay, shown again while nothing changes
+        self.stale = False    # the window was drawn over since the still frame was shown
+
+    # small helper to bake the palette into the LUT; with fade it cross-fades from the current one
+    def upload_palette(self, new_palette, fade=0.0):
+        self.lut.set(new_palette, fade)
+        self.palette_version += 1   # part of the view state: a new palette restarts refinement
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                self.animate = not self.animate
+            elif event.key == pygame.K_UP:
+                self.anim_speed = min(4.0, self.anim_speed + 0.1)
+            elif event.key == pygame.K_DOWN:
+                self.anim_speed = max(0.05, self.anim_speed - 0.1)
+            elif event.key == pygame.K_LEFT:
+                self.folds = max(2, self.folds - 1)
+            elif event.key == pygame.K_RIGHT:
+                self.folds = min(64, self.folds + 1)
+            elif event.key in (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4):
+                self.mode = int(event.unicode)
+            elif event.key == pygame.K_r:
+                # randomize palette only
+                self.upload_palette(generate_palette(6, style=random.choice(['vibrant','cool','pastel'])), FADE)
+            elif event.key == pygame.K_s:
+                # save a screenshot (taken by the next render)
+                self.save_to = "mandala.png"
+            elif event.key == pygame.K_e:
+                # start fade to erase
+                self.fade_target = 1.0
+            elif event.key == pygame.K_d:
+                # resume drawing (cancel fade)
+                self.fade_target = 0.0
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                # left click: randomize pattern seed (palette + slight time nudge)
+                self.upload_palette(generate_palette(6, style=random.choice(['vibrant','cool','pastel'])), FADE)
+                # nudge time so visuals shift
+                self.time_val += 0.2 * random.random()
+                # start dragging
+                self.dragging = True
+                self.last_mouse = event.pos
+            elif event.button == 3:
+                # right click: reset focal/zoom
+                self.focal = [0.0, 0.0]
+                self.zoom = 1.0
+            elif event.button in (4, 5):
+                self.view.interact()
+            if event.button == 4:  # wheel up: zoom in towards mouse
+                mx, my = event.pos
+                ndc_x = (mx / WIDTH) * 2.0 - 1.0
+                ndc_y = (my / HEIGHT) * 2.0 - 1.0
+                ndc_x *= WIDTH / HEIGHT
+                self.focal[0] += ndc_x * 0.05 / self.zoom
+                self.focal[1] -= ndc_y * 0.05 / self.zoom
+                self.zoom *= 1.12
+            elif event.button == 5:  # wheel down: zoom out
+                mx, my = event.pos
+                ndc_x = (mx / WIDTH) * 2.0 - 1.0
+                ndc_y = (my / HEIGHT) * 2.0 - 1.0
+                ndc_x *= WIDTH / HEIGHT
+                self.focal[0] -= ndc_x * 0.04 / self.zoom
+                self.focal[1] += ndc_y * 0.04 / self.zoom
+                self.zoom /= 1.12
+
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1:
+                self.dragging = False
+
+        elif event.type == pygame.MOUSEMOTION:
+            if self.dragging:
+                mx, my = event.pos
+                lx, ly = self.last_mouse
+                dx = (mx - lx) / float(WIDTH)
+                dy = (my - ly) / float(HEIGHT)
+                self.focal[0] -= dx * 2.0 / self.zoom * (WIDTH / HEIGHT)
+                self.focal[1] += dy * 2.0 / self.zoom
+                self.last_mouse = event.pos
+                self.view.interact()
+
+    def invalidate(self):
+        self.stale = True
+
+    def stats(self):
+        stats = {"gpu": self.gpu.gpu_time()}
+        stats.update(self.view.stats())
+        stats["cached"] = int(self.still is not None)
+        return stats
+
+    def idle(self):
+        # paused, fully faded in or out, palette settled and supersampled: nothing left to draw
+        return (not self.animate and abs(self.fade_target - self.fade) < 1e-4 and not self.lut.fading()
+                and self.view.refined())
+
+    def update(self, dt):
+        if self.animate:
+            self.time_val += dt * self.anim_speed
         # fade smoothing (for erase/resume)
-        fade += (fade_target - fade) * 0.06
+        self.fade += (self.fade_target - self.fade) * 0.06
+        self.lut.update(dt)
+
+    def render(self, screen):
+        fade = self.fade
+        state = (self.time_val, self.zoom, tuple(self.focal), self.folds, self.mode, round(fade, 4),
+                 self.palette_version, self.lut.progress)
+        info = [f"Mode: {self.mode}  |  Folds: {self.folds}  |  Speed: {self.anim_speed:.2f}  |  Zoom: {self.zoom:.2f}"]
+        changed = self.panel.set(info + INFO_KEYS)
+        if self.still is not None and not changed and not self.save_to and self.view.unchanged(state):
+            # paused and nothing moved: the window already shows this frame
+            if not self.stale:
+                return []
+            self.stale = False
+            screen.blit(self.still, (0, 0))
+            return None
+        self.still = None
+
+        prog = self.prog
+        # update time uniform
+        prog['iTime'].value = self.time_val
+
+        # update uniforms
+        prog['zoom'].value = self.zoom
+        prog['focal'].value = tuple(self.focal)
+        prog['folds'].value = self.folds
+        prog['mode'].value = self.mode
+        self.lut.use(prog)
+
         # if fade nearly 1, gradually darken the clear color
         clear_base = 0.02 * (1.0 - fade)
-        ctx.clear(clear_base, 0.01 * (1.0 - fade), 0.04 * (1.0 - fade), 1.0)
-
-        vao.render(moderngl.TRIANGLE_STRIP)
-
-        # draw UI overlay using pygame (on top of GL)
-        # get screen surface
-        surf = pygame.display.get_surface()
-        if surf:
-            # simple UI box
-            info = [
-                f"Mode: {mode}  |  Folds: {folds}  |  Speed: {anim_speed:.2f}  |  Zoom: {zoom:.2f}",
-                "LMB: new mandala / drag to pan  |  Wheel: zoom  |  R: palette  |  E: erase  |  D: resume",
-                "1-4: modes  |  ←/→ folds  ↑/↓ speed  | S: save PNG  | Esc: exit"
-            ]
-            # semi-transparent rectangle
-            ui_surf = pygame.Surface((WIDTH, 72), pygame.SRCALPHA)
-            ui_surf.fill((10,10,12,100))
-            surf.blit(ui_surf, (8, 8))
-            # draw text lines
-            y = 12
-            for line in info:
-                tx = font.render(line, True, (230, 230, 230))
-                surf.blit(tx, (16, y))
-                y += 22
-
-        pygame.display.flip()
-        clock.tick(60)
-
-    # Restore previous surface (menu)
-    if old_screen is not None:
-        pygame.display.set_mode(old_screen.get_size(), pygame.RESIZABLE)
-        pygame.display.set_caption("Visual Patterns Studio")
-    return
+        self.view.render(prog, (clear_base, 0.01 * (1.0 - fade), 0.04 * (1.0 - fade), 1.0), state)
+        if self.save_to:
+            frame = pygame.transform.flip(self.gpu.frame((WIDTH, HEIGHT)), False, True)
+            pygame.image.save(frame, self.save_to)
+            print(f"Saved {self.save_to}")
+            self.save_to = None
+
+        # UI overlay, composited in the same framebuffer so present() reads back one finished frame
+        self.overlay.draw(self.panel.surface, self.panel.version, (WIDTH, HEIGHT), (8, 8))
+        frame = self.view.present(screen)
+        self.stale = False
+        # final frame: keep it, so an unchanged state costs one blit at most
+        self.still = frame if self.view.refined() else None
+        return None
+
+
+def run():
+    run_standalone(MandalaScene())
+
+def main(argv=None):
+    """Run the studio, or with --export render a high-resolution PNG without a window."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Digital Mandala Studio")
+    parser.add_argument("--export", metavar="PATH", help="render a tiled PNG export instead of opening the window")
+    parser.add_argument("--size", default="8192x8192", help="export size WIDTHxHEIGHT")
+    parser.add_argument("--tile", type=int, default=1024, help="tile edge in pixels")
+    parser.add_argument("--mode", type=int, default=1)
+    parser.add_argument("--folds", type=int, default=12)
+    parser.add_argument("--zoom", type=float, default=1.0)
+    parser.add_argument("--focal", type=float, nargs=2, default=(0.0, 0.0))
+    parser.add_argument("--time", type=float, default=0.0, help="animation time to freeze")
+    parser.add_argument("--style", choices=["vibrant", "cool", "pastel"], default="vibrant")
+    parser.add_argument("--seed", type=int, help="seed for the random palette")
+    args = parser.parse_args(argv)
+
+    if not args.export:
+        pygame.init()
+        run()
+        return
+    if args.seed is not None:
+        random.seed(args.seed)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    start = time.time()
+    export_tiled(args.export, (width, height), args.tile, style=args.style, mode=args.mode,
+                 folds=args.folds, zoom=args.zoom, focal=args.focal, time_value=args.time)
+    print(f"Saved {args.export} ({width}x{height}) in {time.time() - start:.1f}s")
 
 # If run as main quickly demo:
 if __name__ == "__main__":
-    pygame.init()
-    run()
+    main()
@@ -0,0 +1,231 @@
+# mandala_batch.py
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+
+import offscreen
+from mandala_art import VERTEX_SHADER, FRAGMENT_SHADER, generate_palette
+from palette import PaletteLUT, LUT_SIZE
+from png_writer import PNGWriter
+
+STYLES = ("vibrant", "cool", "pastel")
+MANIFEST = "manifest.json"
+SAVE_EVERY = 16         # finished images between manifest saves (and always at the end)
+SHADER_HASH = hashlib.sha1(FRAGMENT_SHADER.encode()).hexdigest()[:12]   # a shader edit changes every key
+
+
+# -----------------------------
+#  JOBS
+# -----------------------------
+def palette_for(style, seed=0):
+    """The palette a catalogue uses for style: fixed by seed, so every variant of a style shares it."""
+    state = random.getstate()
+    random.seed(f"{seed}:{style}")
+    try:
+        return np.round(generate_palette(6, style=style), 6).tolist()
+    finally:
+        random.setstate(state)
+
+
+def job_key(job, size):
+    """Hash of everything that shapes the image: equal keys mean byte-identical outputs."""
+    content = dict(job, size=list(size), shader=SHADER_HASH, lut=LUT_SIZE)
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def job_name(job, key):
+    return f"mandala_m{job['mode']}_f{job['folds']:02d}_{job['style']}_z{job['zoom']:g}_{key[:8]}.png"
+
+
+def grid(modes=(1, 2, 3, 4), folds=range(2, 65), styles=STYLES, zooms=(1.0,), focal=(0.0, 0.0),
+         time_value=0.0, seed=0):
+    """Every combination of the parameters, as job dicts for run_batch()."""
+    palettes = {style: palette_for(style, seed) for style in styles}
+    return [{"mode": int(m), "folds": int(f), "style": s, "zoom": float(z), "focal": [float(v) for v in focal],
+             "time": float(time_value), "palette": palettes[s]}
+            for m, f, s, z in itertools.product(modes, folds, styles, zooms)]
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# -----------------------------
+#  WORKERS
+# -----------------------------
+_worker = {}
+
+def _start(size, out_dir):
+    """Pool initializer: one standalone GL context, program and palette LUT per worker process."""
+    view = _worker['view'] = offscreen.Offscreen(VERTEX_SHADER, FRAGMENT_SHADER, size)
+    _worker['lut'] = PaletteLUT(view.ctx)
+    _worker['out_dir'] = out_dir
+    view.prog['iResolution'].value = (float(size[0]), float(size[1]))
+    view.prog['tileOffset'].value = (0.0, 0.0)
+
+def _render(item):
+    """Render one job to its file. Returns (key, sha256 of the file, seconds)."""
+    key, name, job = item
+    view = _worker['view']
+    prog = view.prog
+    prog['iTime'].value = job['time']
+    prog['focal'].value = tuple(job['focal'])
+    prog['zoom'].value = job['zoom']
+    prog['folds'].value = job['folds']
+    prog['mode'].value = job['mode']
+    lut = _worker['lut']
+    lut.set(job['palette'])
+    lut.use(prog)
+    start = time.perf_counter()
+    image = view.render()
+    path = os.path.join(_worker['out_dir'], name)
+    part = path + ".part"
+    with PNGWriter(part, view.size[0], view.size[1]) as png:
+        png.write_rows(image)
+    os.replace(part, path)      # a file under its final name is always complete
+    return key, file_hash(path), time.perf_counter() - start
+
+def _stop():
+    view = _worker.pop('view', None)
+    if view is not None:
+        _worker.pop('lut').release()
+        view.release()
+
+
+# -----------------------------
+#  BATCH
+# -----------------------------
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"images": {}}
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".part", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".part", path)
+
+
+def run_batch(jobs, out_dir, size=(512, 512), workers=None, progress=None):
+    """Render jobs (from grid()) into out_dir as PNGs listed in out_dir/manifest.json.
+
+    Each image is named after a hash of its parameters, palette, size
+    and shader source. Jobs whose file is already there are skipped, so an
+    interrupted batch resumes where it stopped and a grown grid renders
+    only the new variants; a file whose recorded SHA-256 no longer
+    matches is rendered again. Work is sharded across a process pool
+    with one standalone GL context per worker; workers=1 renders
+    in-process. progress(done, total) is called after every image.
+    Returns the manifest.
+    """
+    size = (int(size[0]), int(size[1]))
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    images = manifest.setdefault("images", {})
+    manifest["size"] = list(size)
+
+    todo, seen = [], set()
+    for job in jobs:
+        key = job_key(job, size)
+        if key in seen:
+            continue
+        seen.add(key)
+        name = job_name(job, key)
+        path = os.path.join(out_dir, name)
+        entry = images.get(key)
+        if os.path.exists(path):
+            digest = file_hash(path)
+            if entry is None or entry.get("sha256") == digest:
+                images[key] = dict(entry or job, file=name, sha256=digest)
+                continue
+        todo.append((key, name, job))
+    manifest["skipped"] = len(seen) - len(todo)
+
+    total, done = len(todo), 0
+    workers = min(workers or os.cpu_count() or 1, max(1, total))
+    by_key = {key: (name, job) for key, name, job in todo}
+
+    def record(result):
+        nonlocal done
+        key, digest, seconds = result
+        name, job = by_key[key]
+        images[key] = dict(job, file=name, sha256=digest, seconds=round(seconds, 4))
+        done += 1
+        if done % SAVE_EVERY == 0:
+            save_manifest(out_dir, manifest)
+        if progress:
+            progress(done, total)
+
+    try:
+        if total and workers == 1:
+            _start(size, out_dir)
+            try:
+                for item in todo:
+                    record(_render(item))
+            finally:
+                _stop()
+        elif total:
+            # spawn, not fork: a forked child would share the parent's GL driver state
+            with multiprocessing.get_context("spawn").Pool(workers, initializer=_start,
+                                                           initargs=(size, out_dir)) as pool:
+                for result in pool.imap_unordered(_render, todo):
+                    record(result)
+    finally:
+        manifest["rendered"] = done
+        save_manifest(out_dir, manifest)
+    return manifest
+
+
+def parse_ints(values):
+    """["1-4", "8"] -> [1, 2, 3, 4, 8]; a range may take a step, as in "2-64:2"."""
+    result = []
+    for value in values:
+        span, _, step = value.partition(":")
+        low, _, high = span.partition("-")
+        result += range(int(low), int(high or low) + 1, int(step or 1))
+    return result
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render a catalogue of mandala variants.")
+    parser.add_argument("--out", default="mandalas", help="output folder (also holds manifest.json)")
+    parser.add_argument("--modes", nargs="+", default=["1-4"], help="modes, e.g. 1-4 or 1 3")
+    parser.add_argument("--folds", nargs="+", default=["2-64"], help="fold counts, e.g. 2-64:2 or 6 12")
+    parser.add_argument("--styles", nargs="+", choices=STYLES, default=list(STYLES))
+    parser.add_argument("--zooms", nargs="+", type=float, default=[1.0])
+    parser.add_argument("--focal", type=float, nargs=2, default=(0.0, 0.0))
+    parser.add_argument("--time", type=float, default=0.0, help="animation time to freeze")
+    parser.add_argument("--size", default="512x512", help="image size WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the per-style palettes")
+    parser.add_argument("--workers", type=int, help="processes, each with its own GL context (default: all cores)")
+    args = parser.parse_args(argv)
+
+    jobs = grid(parse_ints(args.modes), parse_ints(args.folds), args.styles, args.zooms, args.focal,
+                args.time, args.seed)
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    start = time.time()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} rendered", end="", flush=True)
+
+    try:
+        manifest = run_batch(jobs, args.out, size, args.workers, progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume")
+        return
+    print(f"\n{manifest['rendered']} rendered, {manifest['skipped']} already there, "
+          f"{len(manifest['images'])} in {args.out} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# offscreen.py
+import os
+import sys
+import moderngl
+import numpy as np
+
+QUAD = np.array([-1.0, -1.0,  1.0, -1.0,  -1.0, 1.0,  1.0, 1.0], dtype='f4')
+
+
+def create_context():
+    """Standalone OpenGL 3.3 context that needs no window or display.
+
+    Tries the platform default first and falls back to EGL, which Mesa serves
+    with llvmpipe on machines without a GPU. On display-less Linux we go
+    straight to EGL since the default (GLX) backend needs an X server.
+    """
+    backends = [None, "egl"]
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        backends = ["egl"]
+    error = None
+    for backend in backends:
+        try:
+            if backend:
+                return moderngl.create_standalone_context(require=330, backend=backend)
+            return moderngl.create_standalone_context(require=330)
+        except Exception as exc:  # try the next backend
+            error = exc
+    raise RuntimeError(f"could not create a headless OpenGL context: {error}")
+
+
+def write_palette(prog, name, palette):
+    """Upload an RGB palette to a vec3 array uniform.
+
+    Drivers may shrink the array to the entries the shader actually reads,
+    so only that many colours are written.
+    """
+    uniform = prog[name]
+    colors = np.array(palette, dtype='f4')[:uniform.array_length]
+    uniform.write(colors.tobytes())
+
+
+def save_png(path, image):
+    """Write an (H, W, 3) uint8 array to a PNG file."""
+    import pygame
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    h, w = image.shape[:2]
+    surf = pygame.image.frombuffer(np.ascontiguousarray(image).tobytes(), (w, h), 'RGB')
+    pygame.image.save(surf, path)
+
+
+class Offscreen:
+    """A full-screen-quad shader program drawn into its own framebuffer."""
+
+    def __init__(self, vertex_shader, fragment_shader, size, ctx=None):
+        self.size = (int(size[0]), int(size[1]))
+        self.owns_ctx = ctx is None
+        self.ctx = ctx or create_context()
+        self.prog = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
+        self.vbo = self.ctx.buffer(QUAD)
+        self.vao = self.ctx.simple_vertex_array(self.prog, self.vbo, 'in_vert')
+        self.fbo = self.ctx.simple_framebuffer(self.size, components=3)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        for obj in (self.vao, self.vbo, self.prog, self.fbo):
+            obj.release()
+        if self.owns_ctx:
+            self.ctx.release()
+
+    def render(self):
+        """Draw one frame and return it as an (H, W, 3) uint8 array, top row first."""
+        self.fbo.use()
+        self.fbo.clear()
+        self.vao.render(moderngl.TRIANGLE_STRIP)
+        data = self.fbo.read(components=3, alignment=1)
+        w, h = self.size
+        return np.frombuffer(data, dtype=np.uint8).reshape(h, w, 3)[::-1]
+
+    def render_sequence(self, frames, time_uniform, start_time=0.0, dt=0.02, out=None):
+        """Render frames at start_time + i*dt as fast as the context allows.
+
+        Returns the frames as arrays, or the written paths when out is a
+        filename pattern such as "frames/fractal_{:04d}.png". A plain file
+        name ("loop.mp4", "loop.png") records one video or animated PNG.
+        """
+        if out and "{" not in out:
+            return [self.record(frames, time_uniform, start_time, dt, out)]
+        results = []
+        for i in range(frames):
+            self.prog[time_uniform].value = start_time + i * dt
+            image = self.render()
+            if out:
+                path = out.format(i)
+                save_png(path, image)
+                results.append(path)
+            else:
+                results.append(image.copy())
+        return results
+
+    def record(self, frames, time_uniform, start_time, dt, path):
+        """Render frames into a video file through a Recorder. Returns the path written.
+
+        Readback is double-buffered through the recorder's two pixel buffer
+        objects (Recorder.capture_fbo): frame i is read into one while frame
+        i-1 is taken from the other, so the GPU can draw ahead while the CPU
+        hands the last frame to the encoder.
+        """
+        from recorder import Recorder
+        with Recorder(path, self.size, fps=round(1.0 / dt, 3), block=True) as recorder:
+            for i in range(frames):
+                self.prog[time_uniform].value = start_time + i * dt
+                self.fbo.use()
+                self.fbo.clear()
+                self.vao.render(moderngl.TRIANGLE_STRIP)
+                recorder.capture_fbo(self.fbo)
+        return recorder.path
+
+
+# -----------------------------
+#  COMMAND LINE
+# -----------------------------
+def main(argv=None):
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Render the visuals without a display.")
+    parser.add_argument("module", choices=["fractal", "kaleidoscope", "mandala_art", "fireworks"])
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument("--size", default="800x600", help="WIDTHxHEIGHT")
+    parser.add_argument("--dt", type=float, default=0.02, help="time step per frame")
+    parser.add_argument("--start", type=float, default=0.0, help="time of the first frame")
+    parser.add_argument("--out", default="{module}_{:04d}.png",
+                        help="output filename pattern, or one file (.mp4 etc. via ffmpeg, else animated .png)")
+    parser.add_argument("--seed", type=int, help="seed for the random palette (fireworks: the whole show)")
+    parser.add_argument("--style", choices=["vibrant", "cool", "pastel"], help="mandala palette style")
+    parser.add_argument("--mode", type=int, help="mandala mode 1-4")
+    parser.add_argument("--folds", type=int, help="mandala symmetry folds")
+    parser.add_argument("--zoom", type=float, help="mandala zoom")
+    parser.add_argument("--focal", type=float, nargs=2, help="mandala focal point")
+    parser.add_argument("--center", nargs=2, metavar=("RE", "IM"), help="fractal view centre (decimal strings)")
+    parser.add_argument("--scale", type=float, help="fractal view half-height, e.g. 1e-30")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        import random
+        random.seed(args.seed)
+    module = importlib.import_module(args.module)
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    kwargs = dict(frames=args.frames, size=(w, h), dt=args.dt, start_time=args.start,
+                  out=args.out.replace("{module}", args.module))
+    options = {"mandala_art": ("style", "mode", "folds", "zoom", "focal"),
+               "fractal": ("center", "scale")}.get(args.module, ())
+    for name in options:
+        if getattr(args, name) is not None:
+            kwargs[name] = getattr(args, name)
+    for path in module.render_frames(**kwargs):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
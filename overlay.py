@@ -0,0 +1,107 @@
+# overlay.py
+import moderngl
+import pygame
+import fonts
+from progressive import VERTEX_SHADER
+
+# draws one layer texture over a frame; the scissor keeps the quad to the layer's rect
+COMPOSITE_SHADER = """
+#version 330
+uniform sampler2D layer;
+uniform vec4 rect;      // x, y, width, height of the layer in GL pixels (y up)
+out vec4 fragColor;
+void main() {
+    fragColor = texture(layer, (gl_FragCoord.xy - rect.xy) / rect.zw);
+}
+"""
+
+
+# -----------------------------
+#  TEXT PANEL
+# -----------------------------
+class TextPanel:
+    """Lines of text on a translucent panel, kept as one surface.
+
+    set() redraws the surface only when the lines differ from the last
+    call, using the fonts text cache, and bumps version, so whoever shows
+    the panel (a blit, or a GLOverlay texture) knows when to refresh.
+    """
+
+    def __init__(self, size, font, color=(230, 230, 230), background=(10, 10, 12, 100),
+                 margin=(8, 4), line_height=22):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.font = font
+        self.color = color
+        self.background = background
+        self.margin = margin
+        self.line_height = line_height
+        self.lines = None
+        self.version = 0
+
+    def set(self, lines):
+        """Show lines. Returns True when the panel had to be redrawn."""
+        lines = list(lines)
+        if lines == self.lines:
+            return False
+        self.lines = lines
+        surf = self.surface
+        surf.fill(self.background)
+        x, y = self.margin
+        for line in lines:
+            surf.blit(fonts.render(self.font, line, self.color), (x, y))
+            y += self.line_height
+        self.version += 1
+        return True
+
+
+# -----------------------------
+#  GL COMPOSITING
+# -----------------------------
+class GLOverlay:
+    """Composites a pygame surface over a RenderContext frame on the GPU.
+
+    The surface is uploaded to a texture only when its version changes;
+    draw() then alpha-blends it into the framebuffer before present()
+    reads it back, so the UI costs no pygame blit per frame.
+    """
+
+    def __init__(self, gpu):
+        self.gpu = gpu
+        self.prog = gpu.program(VERTEX_SHADER, COMPOSITE_SHADER)
+        self.texture = None
+        self.version = None
+
+    def upload(self, surface, version):
+        if version == self.version and self.texture is not None:
+            return
+        size = surface.get_size()
+        if self.texture is None or self.texture.size != size:
+            self.release()
+            self.texture = self.gpu.ctx.texture(size, 4)
+            self.texture.repeat_x = self.texture.repeat_y = False
+        self.texture.write(pygame.image.tobytes(surface, "RGBA", True))   # flipped: GL rows go up
+        self.version = version
+
+    def draw(self, surface, version, frame_size, dest=(0, 0)):
+        """Blend surface (top-left at dest, in window pixels) into the frame for frame_size."""
+        self.upload(surface, version)
+        w, h = surface.get_size()
+        rect = (dest[0], frame_size[1] - dest[1] - h, w, h)
+        self.texture.use(0)
+        prog = self.prog
+        prog['layer'].value = 0
+        prog['rect'].value = tuple(float(v) for v in rect)
+        ctx = self.gpu.ctx
+        fbo = self.gpu.target(frame_size)[0]
+        fbo.scissor = rect      # only the panel's pixels run the shader
+        ctx.enable(moderngl.BLEND)
+        ctx.blend_func = moderngl.SRC_ALPHA, moderngl.ONE_MINUS_SRC_ALPHA
+        self.gpu.render(prog, frame_size, None, fbo=fbo, timed=False)
+        ctx.disable(moderngl.BLEND)
+        fbo.scissor = None
+
+    def release(self):
+        if self.texture is not None:
+            self.texture.release()
+            self.texture = None
+            self.version = None
@@ -0,0 +1,143 @@
+# palette.py
+import random
+import moderngl
+import numpy as np
+
+LUT_SIZE = 300          # entries per palette: 256+, and a multiple of 5 and 6 so every palette colour sits on a texel
+LUT_UNIT = 1            # texture unit the LUT is bound to (0 is left to the scenes' own textures)
+FADE = 0.8              # seconds a new palette takes to cross-fade in
+GOLDEN = 0.61803398875  # hue step between neighbouring colours
+
+# (saturation range, value range, hue shift) per generate() style
+STYLES = {
+    "vibrant": ((0.65, 0.95), (0.75, 1.0), 0.0),
+    "cool": ((0.5, 0.85), (0.7, 0.95), 0.5),
+    "pastel": ((0.25, 0.5), (0.9, 1.0), 0.0),
+}
+
+
+# -----------------------------
+#  GENERATION (NumPy, in batches)
+# -----------------------------
+def hsv_to_rgb(h, s, v):
+    """HSV in 0..1 to RGB in 0..1 for whole arrays at once; the result has a trailing axis of 3."""
+    h, s, v = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (h, s, v)))
+    sector = np.floor(h * 6.0)
+    f = h * 6.0 - sector
+    i = sector.astype(np.int64) % 6
+    p = v * (1.0 - s)
+    q = v * (1.0 - f * s)
+    t = v * (1.0 - (1.0 - f) * s)
+    r = np.choose(i, (v, q, p, p, t, v))
+    g = np.choose(i, (t, v, v, q, p, p))
+    b = np.choose(i, (p, p, t, v, v, q))
+    return np.stack((r, g, b), axis=-1)
+
+
+def generate(n=6, style="vibrant", count=None, rng=None):
+    """n golden-angle spaced colours, (n, 3), or count palettes at once, (count, n, 3).
+
+    Without an rng the generator is seeded from the random module, so
+    random.seed() still makes palettes repeatable.
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    sat, val, shift = STYLES.get(style, STYLES["vibrant"])
+    shape = (1 if count is None else count, n)
+    hue = (rng.random((shape[0], 1)) + np.arange(n) * GOLDEN + shift) % 1.0
+    rgb = hsv_to_rgb(hue, rng.uniform(*sat, shape), rng.uniform(*val, shape))
+    return rgb[0] if count is None else rgb
+
+
+# -----------------------------
+#  LUTS
+# -----------------------------
+def bake(palette, size=LUT_SIZE, blend="smooth"):
+    """(size, 3) float32 table of a cyclic palette: entry k is the colour at t = k / size.
+
+    Neighbouring colours are joined by smoothstep ("smooth", as the
+    mandala always did) or linearly ("linear", the kaleidoscope's mix).
+    Sampled with linear filtering at t + 0.5 / size (see PaletteLUT) the
+    table gives back each palette colour exactly at t = i / len(palette).
+    """
+    colors = np.asarray(palette, dtype=np.float64)
+    n = len(colors)
+    x = np.arange(size) * (n / float(size))
+    i = np.floor(x).astype(np.int64)
+    f = (x - i)[:, None]
+    if blend == "smooth":
+        f = f * f * (3.0 - 2.0 * f)
+    return (colors[i % n] * (1.0 - f) + colors[(i + 1) % n] * f).astype(np.float32)
+
+
+class PaletteLUT:
+    """The current palette as a LUT texture, cross-fading to the next one on the GPU.
+
+    The texture holds two rows, the previous palette and the current one,
+    and the shader samples between them: linear filtering along a row
+    interpolates the palette and across the rows does the cross-fade, so
+    a lookup is one texture fetch. set() bakes and uploads a palette once;
+    afterwards update(dt) only moves the fade, and use() binds the texture
+    and writes paletteCoord = (half a texel, row). Shaders declare:
+
+        uniform sampler2D paletteLut;
+        uniform vec2 paletteCoord;
+        vec3 samplePalette(float t) { return texture(paletteLut, vec2(t, 0.0) + paletteCoord).rgb; }
+    """
+
+    def __init__(self, ctx, blend="smooth", size=LUT_SIZE):
+        self.blend = blend
+        self.size = size
+        self.texture = ctx.texture((size, 2), 3, alignment=1)     # 8-bit: the cheapest format to filter, and exact enough
+        self.texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        self.texture.repeat_x = True       # palettes are cyclic
+        self.texture.repeat_y = False
+        self.rows = np.zeros((2, size, 3), dtype=np.float32)
+        self.progress = 1.0     # 0 -> 1 over the fade
+        self.fade = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def set(self, palette, fade=0.0):
+        """Show palette, cross-fading from what is shown now over fade seconds (0: at once)."""
+        lut = bake(palette, self.size, self.blend)
+        if fade > 0:
+            self.rows[0] = self.current()
+            self.rows[1] = lut
+            self.progress = 0.0
+        else:
+            self.rows[:] = lut
+            self.progress = 1.0
+        self.fade = fade
+        self.texture.write((np.clip(self.rows, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8).tobytes())
+
+    def update(self, dt):
+        if self.progress < 1.0:
+            self.progress = min(1.0, self.progress + dt / self.fade)
+
+    def fading(self):
+        return self.progress < 1.0
+
+    def mix(self):
+        """Share of the new palette on screen, eased in and out."""
+        p = self.progress
+        return p * p * (3.0 - 2.0 * p)
+
+    def current(self):
+        """The (size, 3) table on screen now."""
+        m = self.mix()
+        return self.rows[0] * (1.0 - m) + self.rows[1] * m
+
+    def use(self, prog, name="paletteLut", coord="paletteCoord", unit=LUT_UNIT):
+        self.texture.use(unit)
+        prog[name].value = unit
+        prog[coord].value = (0.5 / self.size, 0.25 + 0.5 * self.mix())    # row centres are at 1/4 and 3/4
+
+    def release(self):
+        if self.texture is not None:
+            self.texture.release()
+            self.texture = None
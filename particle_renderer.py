@@ -0,0 +1,410 @@
+# particle_renderer.py
+import numpy as np
+import pygame
+
+# -----------------------------
+#  DISC STENCILS
+# -----------------------------
+_stencils = {}
+
+def disc_stencil(radius):
+    """Pixel offsets covered by pygame.draw.circle of the given integer radius.
+
+    Offsets are relative to the top-left of the (4r x 4r) sprite the spark
+    used to be drawn into, so splatting a stencil reproduces the old look
+    pixel for pixel.
+    """
+    if radius not in _stencils:
+        size = radius * 4
+        surf = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (255, 255, 255, 255), (radius * 2, radius * 2), radius)
+        covered = pygame.surfarray.pixels_alpha(surf) > 0
+        dx, dy = np.nonzero(covered)
+        _stencils[radius] = (dx.astype(np.int32), dy.astype(np.int32))
+    return _stencils[radius]
+
+
+# -----------------------------
+#  REFERENCE RENDERER
+# -----------------------------
+class SurfaceRenderer:
+    """Original per-spark path: one SRCALPHA Surface, circle and blit each."""
+
+    def draw(self, screen, pool, pos=None):
+        n = pool.count
+        pos = pool.pos[:n] if pos is None else pos
+        for (x, y), radius, color, alpha in zip(
+            pos.tolist(), pool.radius[:n].tolist(), pool.colors().tolist(), pool.alpha().tolist()
+        ):
+            surface = pygame.Surface((radius * 4, radius * 4), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (*color, alpha), (radius * 2, radius * 2), int(radius))
+            screen.blit(surface, (x - radius * 2, y - radius * 2))
+
+
+# -----------------------------
+#  SPRITE CACHE RENDERER
+# -----------------------------
+class SpriteRenderer:
+    """Blits pre-rendered sprites keyed on (radius, alpha bucket, colour) in one Surface.blits call."""
+
+    def __init__(self, alpha_levels=32, color_step=8, max_sprites=4096):
+        self.alpha_step = 256 // alpha_levels
+        self.color_step = color_step
+        self.max_sprites = max_sprites
+        self.cache = {}
+
+    def sprite(self, radius, alpha, r, g, b):
+        key = (radius, alpha, r, g, b)
+        surf = self.cache.get(key)
+        if surf is None:
+            if len(self.cache) >= self.max_sprites:
+                self.cache.clear()
+            surf = pygame.Surface((radius * 4, radius * 4), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (r, g, b, alpha), (radius * 2, radius * 2), radius)
+            self.cache[key] = surf
+        return surf
+
+    def draw(self, screen, pool, pos=None):
+        n = pool.count
+        pos = pool.pos[:n] if pos is None else pos
+        if n == 0:
+            return
+        radius = pool.radius[:n].astype(np.int32)
+        alpha = pool.alpha() // self.alpha_step * self.alpha_step
+        colors = pool.colors() // self.color_step * self.color_step
+        top_left = (pos - 2.0 * pool.radius[:n, None]).astype(np.int32)
+        keys = np.column_stack((radius, alpha, colors)).tolist()
+        sprite = self.sprite
+        screen.blits(
+            [(sprite(*key), xy) for key, xy in zip(keys, top_left.tolist())],
+            doreturn=False,
+        )
+
+
+# -----------------------------
+#  ADDITIVE SPLAT RENDERER
+# -----------------------------
+class AdditiveRenderer:
+    """Splats every spark into a NumPy accumulation buffer in one batched pass.
+
+    Premultiplied colour and coverage are summed per pixel with np.bincount
+    (two channels packed per count), then composited onto the screen through
+    a surfarray view. A lone spark blends like an alpha blit; overlapping
+    sparks add up and glow brighter.
+    """
+
+    PAD = 16      # widest stencil (4 * max radius) so no per-pixel bounds checks
+    SHIFT = 2.0 ** 26
+
+    def draw(self, screen, pool, pos=None):
+        n = pool.count
+        pos = pool.pos[:n] if pos is None else pos
+        if n == 0:
+            return
+        self.splat(screen, pos, pool.radius[:n], pool.colors(), pool.alpha())
+
+    def splat(self, screen, pos, radius, colors, alpha):
+        """Splat discs at pos (n, 2) with per-disc radius, uint8 RGB colours and alpha."""
+        if len(pos) == 0:
+            return
+        width, height = screen.get_size()
+        pad = self.PAD
+        stride = height + 2 * pad
+        origin = (pos - 2.0 * radius[:, None]).astype(np.int32) + pad
+        radius = radius.astype(np.int32)
+        alpha = alpha.astype(np.float64)
+        color = np.rint(colors * (alpha[:, None] / 255.0))
+        # pack (r, g) and (b, coverage) so two bincounts do the work of four
+        packed = np.column_stack((color[:, 0] + color[:, 1] * self.SHIFT,
+                                  color[:, 2] + alpha * self.SHIFT))
+        visible = ((origin[:, 0] >= 0) & (origin[:, 0] < width + pad)
+                   & (origin[:, 1] >= 0) & (origin[:, 1] < height + pad))
+
+        index_parts, weight_parts = [], []
+        for r in np.unique(radius[visible]).tolist():
+            sel = np.flatnonzero(visible & (radius == r))
+            dx, dy = disc_stencil(r)
+            base = origin[sel, 0] * stride + origin[sel, 1]
+            index_parts.append((base[:, None] + (dx * stride + dy)).ravel())
+            weight_parts.append(np.broadcast_to(packed[sel, None], (sel.size, dx.size, 2)).reshape(-1, 2))
+        if not index_parts:
+            return
+        index = np.concatenate(index_parts)
+        weight = np.concatenate(weight_parts)
+
+        # sum per pixel inside the bounding box the sparks actually touched
+        x0 = index.min() // stride
+        col = index % stride
+        y0 = col.min()
+        rows = col.max() + 1 - y0
+        local = (index // stride - x0) * rows + (col - y0)
+        size = (index.max() // stride + 1 - x0) * rows
+        if index.size * 8 < size:
+            # sparse scene: sort the few touched pixels instead of sweeping the box
+            touched, inverse = np.unique(local, return_inverse=True)
+            rg = np.bincount(inverse, weight[:, 0], touched.size)
+            ba = np.bincount(inverse, weight[:, 1], touched.size)
+        else:
+            rg = np.bincount(local, weight[:, 0], size)
+            ba = np.bincount(local, weight[:, 1], size)
+            touched = np.flatnonzero(ba >= self.SHIFT)
+            rg, ba = rg[touched], ba[touched]
+
+        g, a = np.floor(rg / self.SHIFT), np.floor(ba / self.SHIFT)
+        add = np.column_stack((rg - g * self.SHIFT, g, ba - a * self.SHIFT))
+        cover = np.minimum(a, 255.0)[:, None] / 255.0
+
+        # composite only the touched pixels, clipped back to the screen
+        sx = touched // rows + (x0 - pad)
+        sy = touched % rows + (y0 - pad)
+        on_screen = (sx >= 0) & (sx < width) & (sy >= 0) & (sy < height)
+        self._composite(screen, sx[on_screen], sy[on_screen], 1.0 - cover[on_screen, 0], add[on_screen])
+
+    def dots(self, screen, pos, colors, alpha):
+        """Blend single pixels at pos: far cheaper than splat() for faint detail such as trails.
+
+        Dots landing on the same pixel don't add up; one of them wins.
+        """
+        width, height = screen.get_size()
+        sx, sy = pos[:, 0].astype(np.int32), pos[:, 1].astype(np.int32)
+        on_screen = (sx >= 0) & (sx < width) & (sy >= 0) & (sy < height) & (alpha > 0)
+        cover = alpha[on_screen].astype(np.float32) / np.float32(255.0)
+        self._composite(screen, sx[on_screen], sy[on_screen], 1.0 - cover, colors[on_screen] * cover[:, None])
+
+    def _composite(self, screen, sx, sy, keep, add):
+        """screen[sx, sy] = screen[sx, sy] * keep + add, per pixel and channel, clipped to 255."""
+        if screen.get_bytesize() == 4:
+            # one packed 32-bit gather/scatter instead of three strided channels
+            view = pygame.surfarray.pixels2d(screen)
+            pixel = view[sx, sy]
+            out = pixel & ~np.uint32(sum(screen.get_masks()[:3]))
+            for c, shift in enumerate(screen.get_shifts()[:3]):
+                value = ((pixel >> shift) & 255) * keep + add[:, c]
+                out |= np.minimum(value, 255.0).astype(np.uint32) << shift
+            view[sx, sy] = out
+        else:
+            view = pygame.surfarray.pixels3d(screen)
+            out = view[sx, sy] * keep[:, None] + add
+            view[sx, sy] = np.minimum(out, 255.0)
+        del view
+
+
+# -----------------------------
+#  GL POINT RENDERER
+# -----------------------------
+MAX_RADIUS = 4          # largest spark radius (AdditiveRenderer.PAD / 4)
+MARGIN = 4 * MAX_RADIUS # pixels round the screen in the sums texture: GL drops points centred off the target
+
+# one point per spark, (2r + 2) px wide: just the pixels its disc stencil can cover.
+# GL rows are screen rows, so what is read back is upright.
+POINT_VERTEX_SHADER = """
+#version 330
+uniform vec2 targetSize;        // the sums texture: the screen plus margin pixels on every side
+uniform float margin;
+in vec2 origin;         // top-left of the spark's 4r x 4r sprite, in whole pixels
+in float radius;
+in vec4 color;          // premultiplied colour and coverage, 0..255 in unsigned bytes
+flat out int r;
+flat out vec4 weight;
+void main() {
+    r = int(radius);
+    weight = floor(color * 255.0 + 0.5);
+    vec2 centre = origin + 2.0 * radius + margin;
+    gl_Position = vec4(centre / targetSize * 2.0 - 1.0, 0.0, 1.0);
+    gl_PointSize = 2.0 * radius + 2.0;
+}
+"""
+
+POINT_FRAGMENT_SHADER = """
+#version 330
+uniform sampler2D stencils;     // disc_stencil(r) for r = 1, 2, ... stacked in side x side cells
+uniform int side;
+flat in int r;
+flat in vec4 weight;
+out vec4 fragColor;
+void main() {
+    int size = 2 * r + 2;
+    ivec2 p = ivec2(gl_PointCoord * float(size));
+    p.y = size - 1 - p.y;       // gl_PointCoord runs down the window, screen rows run up it
+    if (texelFetch(stencils, p + ivec2(r - 1, r - 1 + side * (r - 1)), 0).r == 0.0)
+        discard;
+    fragColor = weight;
+}
+"""
+
+QUAD_VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+void main() { gl_Position = vec4(in_vert, 0.0, 1.0); }
+"""
+
+# screen * (1 - coverage) + colour, floored to whole levels as AdditiveRenderer._composite does
+COMPOSITE_SHADER = """
+#version 330
+uniform sampler2D background;
+uniform sampler2D sums;         // the screen plus a margin on every side
+uniform int margin;
+out vec4 fragColor;
+void main() {
+    ivec2 p = ivec2(gl_FragCoord.xy);
+    vec3 screen = floor(texelFetch(background, p, 0).rgb * 255.0 + 0.5);
+    vec4 sum = texelFetch(sums, p + margin, 0);
+    vec3 value = screen * (1.0 - min(sum.a, 255.0) / 255.0) + sum.rgb;
+    fragColor = vec4(min(floor(value + 1e-3), 255.0) / 255.0, 1.0);    // 1e-3: float32 lands just under whole levels
+}
+"""
+
+
+class PointRenderer:
+    """AdditiveRenderer's splat drawn as GL points on the shared RenderContext.
+
+    Each spark is one point whose fragments test its disc stencil, summed
+    into a float texture with additive blending; a second pass composites
+    the sums over the screen, uploaded as a texture, and the result is read
+    back and blitted: pixel for pixel what AdditiveRenderer draws. Only the
+    box the sparks cover is uploaded, drawn and read back, and the spark
+    buffer and textures are kept from frame to frame. On a GPU this costs
+    little more than the two transfers; a software rasteriser such as
+    llvmpipe pays for every point, which is why pick_renderer() avoids it.
+    """
+
+    def __init__(self):
+        import moderngl
+        import render_context
+        self.moderngl = moderngl
+        self.gpu = render_context.get()
+        ctx = self.gpu.ctx
+        self.prog = self.gpu.program(POINT_VERTEX_SHADER, POINT_FRAGMENT_SHADER)
+        self.composite = self.gpu.program(QUAD_VERTEX_SHADER, COMPOSITE_SHADER)
+        side = 4 * MAX_RADIUS
+        atlas = np.zeros((side * MAX_RADIUS, side), dtype=np.uint8)     # (rows, columns)
+        for r in range(1, MAX_RADIUS + 1):
+            dx, dy = disc_stencil(r)
+            atlas[side * (r - 1) + dy, dx] = 255
+        self.stencils = ctx.texture((side, side * MAX_RADIUS), 1, atlas.tobytes(), alignment=1)
+        self.stencils.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        self.prog["side"].value = side
+        self.buffer = self.vao = None
+        self.capacity = 0
+        self.size = None
+        self.textures = ()
+
+    def _reserve(self, n):
+        if n <= self.capacity:
+            return
+        self.capacity = max(n, 2 * self.capacity, 4096)
+        if self.vao is not None:
+            self.vao.release()
+            self.buffer.release()
+        ctx = self.gpu.ctx
+        self.buffer = ctx.buffer(reserve=self.capacity * 16)
+        self.vao = ctx.vertex_array(self.prog, [(self.buffer, "2f4 f4 4f1", "origin", "radius", "color")])
+
+    def _resize(self, size):
+        if size == self.size:
+            return
+        self._release_targets()
+        ctx = self.gpu.ctx
+        self.background = ctx.texture(size, 3, alignment=1)
+        self.sums = ctx.texture((size[0] + 2 * MARGIN, size[1] + 2 * MARGIN), 4, dtype="f4")
+        self.result = ctx.texture(size, 3, alignment=1)
+        self.sum_fbo = ctx.framebuffer(color_attachments=[self.sums])
+        self.result_fbo = ctx.framebuffer(color_attachments=[self.result])
+        self.textures = (self.background, self.sums, self.result, self.sum_fbo, self.result_fbo)
+        self.size = size
+
+    def draw(self, screen, pool, pos=None):
+        n = pool.count
+        pos = pool.pos[:n] if pos is None else pos
+        if n == 0:
+            return
+        self.splat(screen, pos, pool.radius[:n], pool.colors(), pool.alpha())
+
+    def splat(self, screen, pos, radius, colors, alpha):
+        """Splat discs at pos (n, 2) with per-disc radius, uint8 RGB colours and alpha."""
+        n = len(pos)
+        if n == 0:
+            return
+        width, height = screen.get_size()
+        origin = (pos - 2.0 * radius[:, None]).astype(np.int32)
+        r = np.minimum(radius.astype(np.int32), MAX_RADIUS)
+        left, top = origin.min(axis=0)
+        right, bottom = origin.max(axis=0) + 4 * MAX_RADIUS
+        left, top = max(0, int(left)), max(0, int(top))
+        right, bottom = min(width, int(right)), min(height, int(bottom))
+        if left >= right or top >= bottom:
+            return
+        box = (left, top, right - left, bottom - top)
+
+        data = np.empty((n, 4), dtype=np.float32)
+        data[:, :2] = origin
+        data[:, 2] = r
+        rgba = data.view(np.uint8)[:, 12:]
+        rgba[:, :3] = np.rint(colors * (alpha[:, None] / 255.0))
+        rgba[:, 3] = alpha
+        self._reserve(n)
+        self.buffer.write(data)
+        self._resize((width, height))
+
+        mgl, ctx = self.moderngl, self.gpu.ctx
+        self.background.write(pygame.image.tobytes(screen.subsurface(box), "RGB"), viewport=box, alignment=1)
+        self.sum_fbo.use()
+        self.sum_fbo.clear(viewport=(left + MARGIN, top + MARGIN) + box[2:])
+        self.prog["targetSize"].value = self.sums.size
+        self.prog["margin"].value = float(MARGIN)
+        self.stencils.use(0)
+        self.prog["stencils"].value = 0
+        ctx.enable(mgl.BLEND | mgl.PROGRAM_POINT_SIZE)
+        ctx.blend_func = mgl.ONE, mgl.ONE
+        self.vao.render(mgl.POINTS, vertices=n)
+        ctx.disable(mgl.BLEND | mgl.PROGRAM_POINT_SIZE)
+
+        self.background.use(0)
+        self.sums.use(1)
+        self.composite["background"].value = 0
+        self.composite["sums"].value = 1
+        self.composite["margin"].value = MARGIN
+        self.result_fbo.scissor = box
+        self.gpu.render(self.composite, (width, height), None, fbo=self.result_fbo, timed=False)
+        self.result_fbo.scissor = None
+        data = self.result_fbo.read(viewport=box, components=3, alignment=1)
+        screen.blit(pygame.image.frombuffer(data, box[2:], "RGB"), box[:2])
+
+    def _release_targets(self):
+        for obj in self.textures:
+            obj.release()
+        self.textures = ()
+        self.size = None
+
+    def release(self):
+        self._release_targets()
+        if self.vao is not None:
+            self.vao.release()
+            self.buffer.release()
+            self.vao = self.buffer = None
+            self.capacity = 0
+        self.stencils.release()     # the programs stay in the RenderContext cache
+
+
+RENDERERS = {
+    "surface": SurfaceRenderer,
+    "sprite": SpriteRenderer,
+    "additive": AdditiveRenderer,
+    "points": PointRenderer,
+}
+
+SOFTWARE_GL = ("llvmpipe", "softpipe", "swrast", "swiftshader", "software")
+
+
+def pick_renderer():
+    """"points" on a hardware GL context, else "additive".
+
+    A software rasteriser such as llvmpipe pays for every point it sets
+    up, so there the NumPy splat is as fast at any spark count.
+    """
+    try:
+        import render_context
+        name = render_context.get().ctx.info["GL_RENDERER"].lower()
+    except Exception:  # no usable GL: the NumPy splat needs none
+        return "additive"
+    return "additive" if any(soft in name for soft in SOFTWARE_GL) else "points"
@@ -0,0 +1,143 @@
+# particles.py
+import numpy as np
+from trails import TrailBuffer
+
+# -----------------------------
+#  PARTICLE CONSTANTS
+# -----------------------------
+STEP = 1.0 / 60.0   # seconds of show time per update(); the per-step constants below assume it
+LIFE = 480          # steps until a spark has fully faded (8 s)
+DRAG = 0.99
+GRAVITY = 0.07
+FADE_EXP = 2.2      # nonlinear fade curve
+WHITE_SHIFT = 0.6   # how far the colour drifts toward white as it burns out
+SHRINK = 0.01
+TRAIL = 4           # past positions kept per spark for motion trails
+
+
+# -----------------------------
+#  PARTICLE POOL
+# -----------------------------
+class ParticlePool:
+    """Structure-of-arrays store for every live spark.
+
+    Slots [0, count) are alive. Each attribute lives in its own preallocated
+    array so a whole step is a handful of NumPy operations, and dead sparks
+    are dropped by moving live ones from the tail into their slots. prev
+    holds the positions before the last update(), so a frame drawn between
+    two fixed steps can interpolate with positions(alpha). trail keeps
+    each spark's last TRAIL positions in a TrailBuffer whose slots follow
+    the spark's index.
+    """
+
+    def __init__(self, capacity=65536, seed=None):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self.trail = TrailBuffer(capacity, TRAIL)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.prev = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.radius = np.zeros(capacity, dtype=np.float32)
+        self.base_color = np.zeros((capacity, 3), dtype=np.float32)
+        self.crackle = np.zeros(capacity, dtype=bool)  # may still burst again (forces.Forces)
+
+    def _arrays(self):
+        return (self.pos, self.prev, self.vel, self.age, self.radius, self.base_color, self.crackle)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old = self._arrays()
+        self._allocate(capacity)
+        n = self.count
+        for dst, src in zip(self._arrays(), old):
+            dst[:n] = src[:n]
+        self.trail.grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, color, power, n):
+        """Spawn n sparks at (x, y) flying out in random directions."""
+        self.emit_many([(x, y)], [color], power, n)
+
+    def emit_many(self, points, colors, power, n, crackle=True, radius=(2, 5)):
+        """Spawn n sparks at each of points, with that point's colour, in one batch."""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        total = len(points) * n
+        if self.count + total > self.capacity:
+            self._grow(self.count + total)
+        s = slice(self.count, self.count + total)
+        angle = self.rng.uniform(0.0, 2.0 * np.pi, total)
+        speed = self.rng.uniform(2.5, 6.0, total) * power
+        self.pos[s] = np.repeat(points, n, axis=0)
+        self.prev[s] = self.pos[s]
+        self.vel[s, 0] = np.cos(angle) * speed
+        self.vel[s, 1] = np.sin(angle) * speed
+        self.age[s] = 0.0
+        self.radius[s] = self.rng.integers(radius[0], radius[1], total)
+        self.base_color[s] = np.repeat(np.asarray(colors, dtype=np.float32).reshape(-1, 3), n, axis=0)
+        self.crackle[s] = crackle
+        self.trail.clear(s)
+        self.count += total
+
+    def update(self):
+        """Advance every spark by one STEP."""
+        n = self.count
+        if n == 0:
+            return
+        self.prev[:n] = self.pos[:n]
+        self.trail.push(slice(0, n), self.pos[:n])
+        vel = self.vel[:n]
+        vel *= DRAG
+        vel[:, 1] += GRAVITY
+        self.pos[:n] += vel
+        self.age[:n] += 1.0
+        np.maximum(self.radius[:n] - SHRINK, 1.0, out=self.radius[:n])
+
+        alive = self.age[:n] < LIFE
+        if not alive.all():
+            self._compact(alive)
+
+    def _compact(self, alive):
+        """Swap-compaction: fill dead slots below the new count from live tail slots."""
+        n = self.count
+        new_n = int(np.count_nonzero(alive))
+        holes = np.flatnonzero(~alive[:new_n])
+        movers = new_n + np.flatnonzero(alive[new_n:n])
+        for arr in self._arrays():
+            arr[holes] = arr[movers]
+        self.trail.move(holes, movers)
+        self.count = new_n
+
+    # ---------- derived per-frame values ----------
+    def positions(self, alpha=1.0):
+        """Positions alpha of the way from the previous step to the current one."""
+        n = self.count
+        if alpha >= 1.0:
+            return self.pos[:n]
+        prev = self.prev[:n]
+        return prev + (self.pos[:n] - prev) * np.float32(alpha)
+
+    def life(self):
+        """Remaining life (0..480) following the (age/480)**2.2 fade curve."""
+        t = self.age[:self.count] / LIFE
+        return LIFE * (1.0 - t ** FADE_EXP)
+
+    def alpha(self):
+        return np.clip(self.life(), 0, 255).astype(np.uint8)
+
+    def colors(self):
+        """Base colours shifted toward white as the sparks burn out (uint8 RGB)."""
+        t = np.minimum(1.0, self.age[:self.count] / LIFE)[:, None]
+        base = self.base_color[:self.count]
+        return (base + (255.0 - base) * t * WHITE_SHIFT).astype(np.uint8)
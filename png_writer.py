@@ -0,0 +1,149 @@
+# png_writer.py
+import os
+import struct
+import zlib
+from fractions import Fraction
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def _delay(seconds):
+    """fcTL delay_num, delay_den for seconds: exact for the usual frame rates, both within 16 bits."""
+    delay = Fraction(min(max(seconds, 0.0), 65.0)).limit_denominator(1000)
+    return struct.pack('>HH', delay.numerator, delay.denominator)
+
+
+def _filter_up(rows, prev):
+    """PNG 'Up' filter: each row minus the one above it (mod 256), with the filter byte."""
+    above = np.concatenate((prev, rows[:-1]))
+    filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    np.subtract(rows, above, out=filtered[:, 1:])
+    return filtered
+
+
+class PNGWriter:
+    """Streams an 8-bit RGB PNG to disk a band of rows at a time.
+
+    Only the previous row (for the 'Up' filter) and the zlib window are kept,
+    so the full image never has to exist in memory.
+    """
+
+    IDAT_SIZE = 1 << 20
+
+    def __init__(self, path, width, height, level=6):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.file = open(path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self.file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        self.compressor = zlib.compressobj(level)
+        self.pending = bytearray()
+        self.prev = np.zeros((1, width * 3), dtype=np.uint8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write_rows(self, rows):
+        """Append an (n, width, 3) uint8 band of rows, top row first."""
+        rows = np.ascontiguousarray(rows, dtype=np.uint8).reshape(len(rows), self.width * 3)
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError("more rows written than the image height")
+        filtered = _filter_up(rows, self.prev)
+        self.prev = rows[-1:].copy()
+        self.rows_written += len(rows)
+        self.pending += self.compressor.compress(filtered.tobytes())
+        self._flush_idat()
+
+    def _flush_idat(self, final=False):
+        while len(self.pending) >= self.IDAT_SIZE or (final and self.pending):
+            data = bytes(self.pending[:self.IDAT_SIZE])
+            del self.pending[:self.IDAT_SIZE]
+            self.file.write(_chunk(b'IDAT', data))
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.file.close()
+            raise ValueError(f"wrote {self.rows_written} of {self.height} rows")
+        self.pending += self.compressor.flush()
+        self._flush_idat(final=True)
+        self.file.write(_chunk(b'IEND', b''))
+        self.file.close()
+
+
+class APNGWriter:
+    """Writes an animated PNG one (height, width, 3) frame at a time.
+
+    The frame count in the acTL chunk is not known until close(), so it is
+    written as 0 and patched in place; the file must be seekable. Each
+    frame is shown for 1/fps unless write_frame() is given its own delay.
+    A PNG needs at least one image, so closing with no frames written
+    removes the file and raises ValueError.
+    """
+
+    def __init__(self, path, width, height, fps=60, level=6):
+        self.width = width
+        self.height = height
+        self.level = level
+        self.frames = 0
+        self.sequence = 0
+        self.delay = _delay(1 / fps)
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self.file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        self.actl_at = self.file.tell()
+        self.file.write(_chunk(b'acTL', struct.pack('>II', 0, 0)))     # frames, loops (0 = forever)
+        self.zeros = np.zeros((1, width * 3), dtype=np.uint8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None or self.frames:
+            self.close()
+        else:
+            self._discard()
+
+    def write_frame(self, image, delay=None):
+        """Append a frame, shown for delay seconds (default 1/fps)."""
+        rows = np.ascontiguousarray(image, dtype=np.uint8).reshape(self.height, self.width * 3)
+        data = zlib.compress(_filter_up(rows, self.zeros).tobytes(), self.level)
+        self.file.write(_chunk(b'fcTL', struct.pack('>IIIII', self.sequence, self.width, self.height, 0, 0)
+                               + (self.delay if delay is None else _delay(delay))
+                               + b'\x00\x00'))      # dispose none, blend source
+        self.sequence += 1
+        if self.frames == 0:
+            self.file.write(_chunk(b'IDAT', data))      # the first frame is also the still image
+        else:
+            self.file.write(_chunk(b'fdAT', struct.pack('>I', self.sequence) + data))
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.frames == 0:
+            self._discard()
+            raise ValueError(f"no frames written; removed {self.path}")
+        self.file.write(_chunk(b'IEND', b''))
+        self.file.seek(self.actl_at)
+        self.file.write(_chunk(b'acTL', struct.pack('>II', self.frames, 0)))
+        self.file.close()
+
+    def _discard(self):
+        self.file.close()
+        os.remove(self.path)
@@ -0,0 +1,159 @@
+# profiler.py
+import csv
+import json
+import time
+from collections import deque
+import pygame
+import fonts
+
+PHASES = ("events", "update", "render", "gpu", "present")
+HISTORY = 600           # frames kept for percentiles, the graph and export (10 s at 60 fps)
+BUDGET = 1.0 / 60.0     # frame time the graph's guide line marks
+HUD_SIZE = (300, 150)
+HUD_REFRESH = 15        # frames between HUD text updates, so the numbers are readable
+GRAPH_HEIGHT = 50
+GRAPH_MAX = 3 * BUDGET  # taller bars are clipped
+
+# -----------------------------
+#  FRAME TIMINGS
+# -----------------------------
+def percentile(values, p):
+    """Nearest-rank percentile of an unsorted sequence (0 for an empty one)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))]
+
+
+class Profiler:
+    """Per-phase frame timings for the main loop, kept for the last HISTORY frames.
+
+    The loop calls begin() at the top of a frame, mark(phase) as each phase
+    finishes and end(stats) once the frame is on screen. "frame" is the
+    time between successive begin() calls, i.e. what the viewer sees,
+    including the clock's sleep; the phases are the work inside it. stats
+    holds the scene's own counters (particles, undo bytes ...); a stat
+    named after a phase is recorded as that phase. The shader scenes report
+    "gpu" that way, measured with a GL timer query, so it overlaps the CPU
+    time render and present spent waiting for the GPU.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.records = deque(maxlen=history)
+        self.count = 0
+        self.started = None
+        self.last = None
+        self.phases = {}
+        self.visible = False
+        self.hud = None
+        self.hud_lines = []
+
+    # ---------- recording ----------
+    def begin(self):
+        now = time.perf_counter()
+        if self.started is not None and self.records:
+            self.records[-1]["frame"] = now - self.started
+        self.started = self.last = now
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def mark(self, phase):
+        """Charge the time since the previous mark (or begin) to phase."""
+        now = time.perf_counter()
+        self.phases[phase] += now - self.last
+        self.last = now
+
+    def pause(self):
+        """The loop is about to block on input: don't count the wait as a frame."""
+        self.started = None
+
+    def end(self, scene="", stats=None):
+        if self.started is None:
+            return
+        stats = dict(stats or {})
+        for phase in PHASES:
+            if phase in stats:
+                self.phases[phase] += stats.pop(phase)
+        record = {"index": self.count, "time": self.started, "scene": scene,
+                  "frame": time.perf_counter() - self.started}
+        record.update(self.phases)
+        record["stats"] = stats
+        self.records.append(record)
+        self.count += 1
+
+    # ---------- summaries ----------
+    def summary(self):
+        """Frame time percentiles and mean phase times, in seconds."""
+        frames = [r["frame"] for r in self.records]
+        n = max(1, len(frames))
+        result = {"frames": len(frames), "fps": len(frames) / sum(frames) if frames and sum(frames) else 0.0}
+        for p in (50, 95, 99):
+            result[f"p{p}"] = percentile(frames, p)
+        for phase in PHASES:
+            result[phase] = sum(r[phase] for r in self.records) / n
+        return result
+
+    def export(self, path):
+        """Write the kept frames to path, as JSON for *.json and CSV otherwise."""
+        records = list(self.records)
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "frames": records}, f, indent=1)
+            return
+        stat_names = sorted({name for r in records for name in r["stats"]})
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["index", "scene", "frame_ms"] + [f"{p}_ms" for p in PHASES] + stat_names)
+            for r in records:
+                writer.writerow([r["index"], r["scene"], f"{r['frame'] * 1000:.3f}"]
+                                + [f"{r[p] * 1000:.3f}" for p in PHASES]
+                                + [r["stats"].get(name, "") for name in stat_names])
+
+    # ---------- HUD ----------
+    def toggle(self):
+        self.visible = not self.visible
+        return self.visible
+
+    def draw(self, screen, dest=(8, 8)):
+        """Draw the HUD onto screen. Returns the rect it covers.
+
+        The panel is opaque: scenes that repaint only dirty regions leave
+        last frame's HUD underneath, and a translucent panel would smear it.
+        """
+        if self.hud is None:
+            self.hud = pygame.Surface(HUD_SIZE)
+            self.font = fonts.get("DejaVu Sans Mono, Consolas, Courier New", 12)
+        if self.count % HUD_REFRESH == 0 or not self.hud_lines:
+            self.hud_lines = self._text()
+        hud, w, h = self.hud, HUD_SIZE[0], HUD_SIZE[1]
+        hud.fill((16, 16, 24))
+        y = 4
+        for line in self.hud_lines:
+            hud.blit(line, (6, y))
+            y += line.get_height()
+
+        # frame time graph, newest on the right, with the 60 fps budget marked
+        base = h - 6
+        frames = [r["frame"] for r in self.records][-(w - 12):]
+        x = w - 6 - len(frames)
+        for frame in frames:
+            bar = min(frame, GRAPH_MAX) / GRAPH_MAX * GRAPH_HEIGHT
+            color = (90, 220, 90) if frame <= BUDGET * 1.1 else (240, 80, 60)
+            pygame.draw.line(hud, color, (x, base), (x, base - int(bar)))
+            x += 1
+        guide = base - int(BUDGET / GRAPH_MAX * GRAPH_HEIGHT)
+        pygame.draw.line(hud, (120, 120, 130), (6, guide), (w - 6, guide))
+        return screen.blit(hud, dest)
+
+    def _text(self):
+        s = self.summary()
+        ms = lambda seconds: f"{seconds * 1000:.1f}"
+        lines = [
+            f"{s['fps']:5.1f} fps  p50 {ms(s['p50'])}  p95 {ms(s['p95'])}  p99 {ms(s['p99'])} ms",
+            "  ".join(f"{phase} {ms(s[phase])}" for phase in PHASES[:3]),
+            "  ".join(f"{phase} {ms(s[phase])}" for phase in PHASES[3:]),
+        ]
+        stats = self.records[-1]["stats"] if self.records else {}
+        items = [f"{name} {value:,}" if isinstance(value, int) else f"{name} {value}" for name, value in stats.items()]
+        if items:
+            lines.append("  ".join(items))
+        return [self.font.render(line, True, (230, 230, 230)) for line in lines]
@@ -0,0 +1,181 @@
+# progressive.py
+import math
+import time
+import moderngl
+
+BUDGET = 0.012          # seconds of shader + readback per frame that still leaves room for 60 fps
+HEADROOM = 0.6          # raise the resolution only when a frame took less than this share of BUDGET
+MIN_SCALE = 0.25        # lowest render resolution, as a fraction of the window
+SCALE_STEP = 1.0 / 16   # resolutions are quantised so only a few framebuffer sizes get made
+INTERACTIVE_SCALE = 0.5 # at most this while the user drags, zooms or presses keys
+SETTLE = 0.25           # seconds after the last input before the view refines
+SAMPLES = 16            # jittered full-resolution samples summed once the picture is still
+
+VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+void main() { gl_Position = vec4(in_vert, 0.0, 1.0); }
+"""
+
+# upscales a low-resolution frame (bilinear) or averages an accumulation buffer (gain = 1/samples);
+# the frame fills the bottom-left sourceSize pixels of the source texture
+RESOLVE_SHADER = """
+#version 330
+uniform sampler2D source;
+uniform vec2 sourceSize;
+uniform vec2 outSize;
+uniform float gain;
+out vec4 fragColor;
+void main() {
+    vec2 texel = clamp(gl_FragCoord.xy / outSize * sourceSize, vec2(0.5), sourceSize - 0.5);
+    fragColor = vec4(texture(source, texel / vec2(textureSize(source, 0))).rgb * gain, 1.0);
+}
+"""
+
+
+def halton(index, base):
+    """The index'th term of the van der Corput sequence in base (in [0, 1))."""
+    result, f = 0.0, 1.0
+    while index:
+        f /= base
+        result += f * (index % base)
+        index //= base
+    return result
+
+# sub-pixel offsets for the accumulated samples; the first is the pixel centre
+JITTER = [(halton(i, 2) - 0.5 if i else 0.0, halton(i, 3) - 0.5 if i else 0.0) for i in range(SAMPLES)]
+
+
+# -----------------------------
+#  ADAPTIVE VIEW
+# -----------------------------
+class ProgressiveView:
+    """Draws a full-screen shader at a resolution that keeps the frame rate, refining when still.
+
+    Each frame is timed from render() to the end of present(), whose
+    readback waits for the GPU, and the render scale follows that time:
+    down in proportion when a frame overruns BUDGET, up one SCALE_STEP
+    when it has HEADROOM to spare. Frames below full size are drawn into
+    a small texture and upscaled on the GPU. For SETTLE seconds after
+    interact() the scale is capped at INTERACTIVE_SCALE so drags and
+    zooms stay responsive. Reduced frames all share one full-size canvas,
+    drawn into its bottom-left corner, so a new scale allocates nothing.
+    Once the picture is still (render() is given the same state as last
+    frame: a tuple of everything that shapes the image), every frame
+    instead adds one full-resolution sample, jittered by JITTER, into a
+    float buffer with additive blending and shows the average; after
+    SAMPLES of them refined() is true and the scene can go idle. A scene
+    that keeps its finished frame can skip drawing while unchanged() holds.
+
+    The shader must take its resolution from the resolution uniform and
+    add the jitter uniform (a vec2, in pixels) to gl_FragCoord.xy. A
+    fixed quality (0..1) turns adaptation off, e.g. for benchmarks.
+    """
+
+    def __init__(self, gpu, size, resolution="iResolution", jitter="pixelOffset", quality=None):
+        self.gpu = gpu
+        self.size = (int(size[0]), int(size[1]))
+        self.resolution = resolution
+        self.jitter = jitter
+        self.quality = quality
+        self.resolve = gpu.program(VERTEX_SHADER, RESOLVE_SHADER)
+        self.scale = 1.0 if quality is None else quality
+        self.samples = 0        # samples summed into the accumulation buffer
+        self.last_input = -math.inf
+        self.started = None
+        self.used = 1.0         # scale the last frame was drawn at (0 while accumulating)
+        self.state = None
+
+    # ---------- state ----------
+    def interact(self):
+        """The view is changing under the user's hands: go coarse for a moment."""
+        self.last_input = time.perf_counter()
+
+    def interacting(self):
+        return time.perf_counter() - self.last_input < SETTLE
+
+    def refined(self):
+        """True once a still picture has all its samples, and always at a fixed quality."""
+        return self.quality is not None or self.samples >= SAMPLES
+
+    def unchanged(self, state):
+        """True when state is what was last drawn and that frame is final, so it can be reused as is."""
+        return state is not None and state == self.state and self.refined()
+
+    def stats(self):
+        return {"scale": round(self.used, 3), "samples": self.samples}
+
+    # ---------- drawing ----------
+    def render(self, prog, clear=(0.0, 0.0, 0.0, 1.0), state=None):
+        """Draw prog for this frame into the RenderContext target for size; then call present()."""
+        self.started = time.perf_counter()
+        still = state is not None and state == self.state
+        self.state = state
+        if still and self.quality is None and not self.interacting():
+            self._accumulate(prog, clear)
+            return
+        self.samples = 0
+        scale = self.scale
+        if self.quality is None and self.interacting():
+            scale = min(scale, INTERACTIVE_SCALE)
+        self._draw(prog, clear, scale)
+
+    def present(self, screen, dest=(0, 0)):
+        """gpu.present() the frame and adapt the scale to how long it took. Returns the upright frame."""
+        frame = self.gpu.present(screen, self.size, dest)
+        if self.started is not None and self.quality is None and self.used == self.scale:
+            self._adapt(time.perf_counter() - self.started)
+        return frame
+
+    def _set(self, prog, size, offset):
+        prog[self.resolution].value = (float(size[0]), float(size[1]))
+        prog[self.jitter].value = offset
+
+    def _draw(self, prog, clear, scale):
+        self.used = scale
+        w, h = self.size
+        if scale >= 1.0:
+            self._set(prog, self.size, (0.0, 0.0))
+            self.gpu.render(prog, self.size, clear)
+            return
+        low = (max(1, round(w * scale)), max(1, round(h * scale)))
+        self._set(prog, low, (0.0, 0.0))
+        texture, fbo = self.gpu.canvas(self.size)
+        fbo.viewport = (0, 0) + low
+        self.gpu.render(prog, low, clear, fbo=fbo)
+        fbo.viewport = (0, 0) + self.size
+        self._resolve(texture, 1.0, low)
+
+    def _accumulate(self, prog, clear):
+        self.used = 0.0
+        texture, fbo = self.gpu.canvas(self.size, 'f4')
+        if not self.refined():
+            self._set(prog, self.size, JITTER[self.samples])
+            ctx = self.gpu.ctx
+            if self.samples == 0:
+                self.gpu.render(prog, self.size, clear, fbo=fbo)
+            else:
+                ctx.enable(moderngl.BLEND)
+                ctx.blend_func = moderngl.ONE, moderngl.ONE
+                self.gpu.render(prog, self.size, None, fbo=fbo)
+                ctx.disable(moderngl.BLEND)
+            self.samples += 1
+        self._resolve(texture, 1.0 / self.samples, self.size)
+
+    def _resolve(self, texture, gain, size):
+        texture.use(0)
+        prog = self.resolve
+        prog['source'].value = 0
+        prog['sourceSize'].value = (float(size[0]), float(size[1]))
+        prog['outSize'].value = (float(self.size[0]), float(self.size[1]))
+        prog['gain'].value = gain
+        self.gpu.render(prog, self.size, None, timed=False)
+
+    def _adapt(self, elapsed):
+        scale = self.scale
+        if elapsed > BUDGET:
+            scale *= max(0.7, math.sqrt(BUDGET / elapsed))
+            scale = math.floor(scale / SCALE_STEP) * SCALE_STEP
+        elif elapsed < BUDGET * HEADROOM:
+            scale += SCALE_STEP
+        self.scale = min(1.0, max(MIN_SCALE, scale))
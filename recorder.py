@@ -0,0 +1,312 @@
+# recorder.py
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from png_writer import APNGWriter, PNGWriter
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".webm", ".avi", ".gif")
+QUEUE_FRAMES = 8        # frames in flight before write() drops (live) or waits (offline)
+PNG_LEVEL = 1           # fast zlib level: recording has to keep up with the show
+
+
+# -----------------------------
+#  RAW FRAMES
+# -----------------------------
+def surface_format(surface):
+    """The ffmpeg pix_fmt naming the bytes of a 24/32-bit surface, e.g. "bgr0"."""
+    size = surface.get_bytesize()
+    if size not in (3, 4):
+        raise ValueError("only 24 and 32 bit surfaces can be recorded")
+    order = ["0"] * size
+    for name, shift in zip("rgb", surface.get_shifts()[:3]):
+        index = shift // 8
+        order[index if sys.byteorder == "little" else size - 1 - index] = name
+    return "".join(order) + ("24" if size == 3 else "")
+
+
+def to_rgb(data, size, pix_fmt, flip=False):
+    """(height, width, 3) RGB view of a raw frame, top row first."""
+    w, h = size
+    channels = 3 if pix_fmt.endswith("24") else 4
+    pixels = np.frombuffer(data, dtype=np.uint8).reshape(h, -1)[:, :w * channels].reshape(h, w, channels)
+    order = pix_fmt[:channels]
+    rgb = pixels[..., [order.index(c) for c in "rgb"]] if order != "rgb" else pixels
+    return rgb[::-1] if flip else rgb
+
+
+def convert(data, size, pix_fmt, flip, to_fmt, to_flip):
+    """A raw frame's bytes in another pix_fmt and row order (unnamed "0" channels are zero)."""
+    rgb = to_rgb(data, size, pix_fmt, flip != to_flip)
+    channels = 3 if to_fmt.endswith("24") else 4
+    out = np.zeros(rgb.shape[:2] + (channels,), dtype=np.uint8)
+    for i, name in enumerate(to_fmt[:channels]):
+        if name in "rgb":
+            out[..., i] = rgb[..., "rgb".index(name)]
+    return out.tobytes()
+
+
+class FrameClock:
+    """Turns frame durations into a constant-rate stream: how often to repeat each frame.
+
+    A frame shown for longer than 1/fps (the show dropped frames, or a
+    scene ran slowly) is repeated, one shorter than that may be skipped,
+    and the stream stays within half a frame of the recorded time.
+    """
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.elapsed = 0.0      # recorded seconds so far
+        self.shown = 0          # frames in the stream so far
+
+    def repeats(self, duration):
+        self.elapsed += duration
+        count = max(0, round(self.elapsed * self.fps) - self.shown)
+        self.shown += count
+        return count
+
+
+# -----------------------------
+#  ENCODERS (run on the recorder's worker thread)
+# -----------------------------
+class FFmpegEncoder:
+    """Pipes raw frames into an ffmpeg process, which encodes in parallel with the app.
+
+    Raw video has no timestamps, so the stream is kept at a constant fps
+    by a FrameClock: a frame shown for three frame times is piped three
+    times. The pix_fmt is fixed by the first frame; later frames in
+    another format are converted.
+    """
+
+    def __init__(self, path, size, fps):
+        self.path, self.size, self.fps = path, size, fps
+        self.clock = FrameClock(fps)
+        self.format = None
+        self.process = None
+
+    def start(self, pix_fmt, flip):
+        w, h = self.size
+        command = [shutil.which("ffmpeg"), "-loglevel", "error", "-y",
+                   "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{w}x{h}", "-r", str(self.fps), "-i", "-"]
+        if flip:
+            command += ["-vf", "vflip"]
+        if not self.path.endswith(".gif"):
+            command += ["-pix_fmt", "yuv420p"]
+        self.format = (pix_fmt, flip)
+        self.process = subprocess.Popen(command + [self.path], stdin=subprocess.PIPE)
+
+    def encode(self, data, pix_fmt, flip, duration):
+        if self.process is None:
+            self.start(pix_fmt, flip)
+        elif (pix_fmt, flip) != self.format:
+            data = convert(data, self.size, pix_fmt, flip, *self.format)
+        for _ in range(self.clock.repeats(duration)):
+            self.process.stdin.write(data)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+class APNGEncoder:
+    """Pure-Python fallback: one animated PNG, each frame delayed by the time it was shown."""
+
+    def __init__(self, path, size, fps, level=PNG_LEVEL):
+        self.size = size
+        self.writer = APNGWriter(path, size[0], size[1], fps, level)
+
+    def encode(self, data, pix_fmt, flip, duration):
+        self.writer.write_frame(to_rgb(data, self.size, pix_fmt, flip), duration)
+
+    def close(self):
+        self.writer.close()
+
+
+class PNGSequenceEncoder:
+    """Pure-Python fallback: numbered PNG files from a pattern such as "frames/{:05d}.png".
+
+    The files are a constant-fps sequence, like the ffmpeg stream: where a
+    frame was shown for several frame times, copies of its file fill the gap.
+    """
+
+    def __init__(self, pattern, size, fps, level=PNG_LEVEL):
+        self.pattern, self.size, self.level = pattern, size, level
+        self.clock = FrameClock(fps)
+        folder = os.path.dirname(pattern.format(0))
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def encode(self, data, pix_fmt, flip, duration):
+        first = self.clock.shown
+        count = self.clock.repeats(duration)
+        if not count:
+            return
+        w, h = self.size
+        path = self.pattern.format(first)
+        with PNGWriter(path, w, h, self.level) as writer:
+            writer.write_rows(to_rgb(data, self.size, pix_fmt, flip))
+        for index in range(first + 1, first + count):
+            shutil.copyfile(path, self.pattern.format(index))
+
+    def close(self):
+        pass
+
+
+def choose_encoder(path):
+    """Encoder class and output path: ffmpeg for video files when it is installed, else APNG."""
+    if "{" in path:
+        return PNGSequenceEncoder, path
+    root, ext = os.path.splitext(path)
+    if ext.lower() in VIDEO_EXTENSIONS:
+        if shutil.which("ffmpeg"):
+            return FFmpegEncoder, path
+        path = root + ".png"
+        print(f"ffmpeg not found; recording an animated PNG to {path}")
+    return APNGEncoder, path
+
+
+# -----------------------------
+#  FRAME SINK
+# -----------------------------
+class Recorder:
+    """Frame sink every visual can feed: write() queues a raw frame, a worker encodes it.
+
+    Frames are raw bytes plus an ffmpeg pix_fmt, so capture costs one copy
+    and no conversion on the caller's thread. Video paths go to ffmpeg over
+    a pipe (a separate process); without ffmpeg, and for .png paths, the
+    frames become an APNG, or numbered PNGs for a "{}" pattern, written on
+    the worker thread (zlib releases the GIL). When the encoder falls
+    behind, a live recorder (block=False) drops frames and counts them in
+    dropped rather than stall the show; an offline one waits.
+
+    Every frame carries the time it was captured: the recorder's clock for
+    a live recording, 1/fps apart for an offline one. The worker shows each
+    frame until the next one's time, so dropped frames and slow scenes keep
+    their real length instead of playing back fast.
+    """
+
+    def __init__(self, path, size, fps=60, block=False):
+        self.encoder_class, self.path = choose_encoder(path)
+        self.size = (int(size[0]), int(size[1]))
+        self.fps = fps
+        self.block = block
+        self.frames = 0
+        self.dropped = 0
+        self.stamps = 0         # frames offered so far (queued or dropped)
+        self.start = time.perf_counter()
+        self.pbos = None        # capture_fbo()'s pixel buffers, once it has been used
+        self.pending = None     # (pbo, timestamp) of the readback capture_fbo() started last
+        self.error = None
+        self.queue = queue.Queue(QUEUE_FRAMES)
+        self.worker = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stamp(self):
+        """Timestamp for the frame being captured now, in seconds from the start of the recording."""
+        self.stamps += 1
+        if self.block:
+            return (self.stamps - 1) / self.fps
+        return time.perf_counter() - self.start
+
+    def write(self, data, pix_fmt="rgb24", flip=False, timestamp=None):
+        """Queue one frame of raw bytes (rows top first, or bottom first with flip)."""
+        if self.error:
+            raise self.error
+        if timestamp is None:
+            timestamp = self.stamp()
+        try:
+            self.queue.put((data, pix_fmt, flip, timestamp), block=self.block)
+            self.frames += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def capture(self, surface):
+        """Queue a copy of a pygame surface's pixels (for example the window)."""
+        if surface.get_size() != self.size:
+            raise ValueError(f"recording is {self.size}, surface is {surface.get_size()}")
+        self.flush()            # a readback still in flight is the earlier frame
+        timestamp = self.stamp()
+        if not self.block and self.queue.full():
+            self.dropped += 1       # don't pay for the copy of a frame that would be dropped
+            return
+        data = surface.get_buffer().raw
+        row = self.size[0] * surface.get_bytesize()
+        if surface.get_pitch() != row:      # padded rows: ffmpeg wants them packed
+            data = np.frombuffer(data, dtype=np.uint8).reshape(self.size[1], -1)[:, :row].tobytes()
+        self.write(data, surface_format(surface), timestamp=timestamp)
+
+    def capture_fbo(self, fbo):
+        """Queue the frame in a moderngl framebuffer, read back through two pixel buffer objects.
+
+        The readback is only started here and the frame is queued on the
+        next capture (or close()), so the GPU copies one frame while the
+        previous one goes to the encoder.
+        """
+        if tuple(fbo.size) != self.size:
+            raise ValueError(f"recording is {self.size}, framebuffer is {fbo.size}")
+        timestamp = self.stamp()
+        if not self.block and self.queue.full():
+            self.dropped += 1
+            return
+        if self.pbos is None:
+            w, h = self.size
+            self.pbos = [fbo.ctx.buffer(reserve=w * h * 3) for _ in range(2)]
+        pbo = self.pbos[1] if self.pending and self.pending[0] is self.pbos[0] else self.pbos[0]
+        fbo.read_into(pbo, components=3, alignment=1)
+        self.flush()
+        self.pending = (pbo, timestamp)
+
+    def flush(self):
+        """Queue the frame whose readback capture_fbo() started, if any."""
+        if self.pending is not None:
+            pbo, timestamp = self.pending
+            self.pending = None
+            self.write(pbo.read(), "rgb24", flip=True, timestamp=timestamp)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for pbo in self.pbos or ():
+                pbo.release()
+            self.pbos = None
+            end = self.stamps / self.fps if self.block else time.perf_counter() - self.start
+            self.queue.put((None, end))
+            self.worker.join()
+        if self.error:
+            raise self.error
+
+    def _run(self):
+        encoder = None
+        shown = None            # the last frame, encoded once the next one's time says how long it was up
+        while True:
+            data, *frame = self.queue.get()
+            if shown is not None and not self.error:
+                duration = frame[-1] - shown[-1]
+                if data is None:
+                    duration = max(duration, 1.0 / self.fps)    # the last frame is up for one frame at least
+                try:
+                    if encoder is None:
+                        encoder = self.encoder_class(self.path, self.size, self.fps)
+                    encoder.encode(*shown[:-1], duration)
+                except Exception as exc:  # reported to the caller on its next write() or close()
+                    self.error = exc
+            if data is None:
+                break
+            shown = (data, *frame)
+        if encoder is not None:
+            try:
+                encoder.close()
+            except Exception as exc:  # e.g. the disk filled up on the last write
+                self.error = self.error or exc
@@ -0,0 +1,178 @@
+# render_context.py
+import hashlib
+import moderngl
+import pygame
+import offscreen
+
+
+class RenderContext:
+    """One OpenGL context for the whole app, with compiled programs cached.
+
+    Shader modules draw their full-screen quad into an offscreen framebuffer
+    and present() copies the frame into the ordinary pygame window. The
+    window therefore never has to be recreated in OPENGL mode, which would
+    throw the context away, and programs, vertex arrays and framebuffers
+    survive module switches. Programs are keyed by a hash of their source,
+    so each shader pair is compiled once per run. release() frees every
+    object this context made, in reverse order of creation.
+    """
+
+    def __init__(self, ctx=None):
+        self.ctx = ctx or offscreen.create_context()
+        self.vbo = self.ctx.buffer(offscreen.QUAD)
+        self.programs = {}      # source hash -> (program, quad vertex array or None)
+        self.targets = {}       # size -> (framebuffer, pixel buffer, frame surface)
+        self.canvases = {}      # (size, dtype) -> (texture, framebuffer) for multi-pass rendering
+        self.timer = None       # GPU time query around the last render(), made on first use
+        self.presented = None   # (size, dest) of the last present(), so a recorder can read the frame from GL
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @staticmethod
+    def key(vertex_shader, fragment_shader):
+        return hashlib.sha1((vertex_shader + "\0" + fragment_shader).encode()).hexdigest()
+
+    # ---------- cached objects ----------
+    def program(self, vertex_shader, fragment_shader):
+        """The compiled program for this source, compiling it on first use.
+
+        Programs that draw the full-screen quad (they take in_vert) get a
+        vertex array for render(); others bring their own buffers.
+        """
+        key = self.key(vertex_shader, fragment_shader)
+        if key not in self.programs:
+            prog = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
+            vao = None
+            if prog.get('in_vert', None) is not None:
+                vao = self.ctx.simple_vertex_array(prog, self.vbo, 'in_vert')
+            self.programs[key] = (prog, vao)
+        return self.programs[key][0]
+
+    def _vao(self, prog):
+        for cached, vao in self.programs.values():
+            if cached is prog and vao is not None:
+                return vao
+        raise KeyError("program was not created by this RenderContext, or does not take in_vert")
+
+    def target(self, size):
+        """Framebuffer, its pixel buffer and a Surface sharing that buffer, per size."""
+        size = (int(size[0]), int(size[1]))
+        if size not in self.targets:
+            fbo = self.ctx.simple_framebuffer(size, components=3)
+            pixels = bytearray(size[0] * size[1] * 3)
+            self.targets[size] = (fbo, pixels, pygame.image.frombuffer(pixels, size, 'RGB'))
+        return self.targets[size]
+
+    def canvas(self, size, dtype='f1'):
+        """A sampleable RGBA texture and a framebuffer drawing into it, per size and dtype.
+
+        For passes whose output a later pass reads (low-resolution frames,
+        accumulation buffers); 'f4' gives a float texture that sums samples
+        without clipping.
+        """
+        key = ((int(size[0]), int(size[1])), dtype)
+        if key not in self.canvases:
+            texture = self.ctx.texture(key[0], 4, dtype=dtype)
+            texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+            texture.repeat_x = texture.repeat_y = False
+            self.canvases[key] = (texture, self.ctx.framebuffer(color_attachments=[texture]))
+        return self.canvases[key]
+
+    # ---------- drawing ----------
+    def render(self, prog, size, clear=(0.0, 0.0, 0.0, 1.0), fbo=None, timed=True):
+        """Draw prog's full-screen quad into the framebuffer for size (or into fbo).
+
+        clear=None draws over what is there. timed=False leaves gpu_time()
+        reporting the previous timed draw, so helper passes (upscaling,
+        resolving) don't hide the cost of the scene's own shader.
+        """
+        fbo = fbo or self.target(size)[0]
+        fbo.use()
+        if clear is not None:
+            fbo.clear(*clear)
+        if not timed:
+            self._vao(prog).render(moderngl.TRIANGLE_STRIP)
+            return fbo
+        if self.timer is None:
+            self.timer = self.ctx.query(time=True)
+        with self.timer:
+            self._vao(prog).render(moderngl.TRIANGLE_STRIP)
+        return fbo
+
+    def gpu_time(self):
+        """Seconds the GPU spent drawing in the last render().
+
+        Reading the query waits for that draw to finish, so ask after
+        present(), which has waited for it already.
+        """
+        return self.timer.elapsed / 1e9 if self.timer is not None else 0.0
+
+    def frame(self, size):
+        """Read the last rendered frame into a Surface (bottom row first, as GL stores it)."""
+        fbo, pixels, surf = self.target(size)
+        fbo.read_into(pixels, components=3, alignment=1)
+        return surf
+
+    def present(self, screen, size, dest=(0, 0)):
+        """Copy the last frame onto a pygame surface, upright. Returns the upright frame."""
+        self.presented = (tuple(size), tuple(dest))
+        upright = pygame.transform.flip(self.frame(size), False, True)
+        screen.blit(upright, dest)
+        return upright
+
+    # ---------- release ----------
+    def forget(self, vertex_shader, fragment_shader):
+        """Release one cached program and its vertex array."""
+        entry = self.programs.pop(self.key(vertex_shader, fragment_shader), None)
+        if entry:
+            prog, vao = entry
+            if vao is not None:
+                vao.release()
+            prog.release()
+
+    def release(self):
+        self.timer = None       # queries have no release(); they go with the context
+        for fbo, _, _ in self.targets.values():
+            for attachment in fbo.color_attachments + (fbo.depth_attachment,):
+                attachment.release()    # simple_framebuffer() made these; the fbo does not own them
+            fbo.release()
+        self.targets.clear()
+        for texture, fbo in self.canvases.values():
+            fbo.release()
+            texture.release()
+        self.canvases.clear()
+        for prog, vao in self.programs.values():
+            if vao is not None:
+                vao.release()
+            prog.release()
+        self.programs.clear()
+        self.vbo.release()
+        self.ctx.release()
+
+
+# -----------------------------
+#  SHARED INSTANCE
+# -----------------------------
+_shared = None
+
+def get():
+    """The app-wide RenderContext, created on first use."""
+    global _shared
+    if _shared is None:
+        _shared = RenderContext()
+    return _shared
+
+def current():
+    """The app-wide RenderContext if one has been created, else None."""
+    return _shared
+
+def release():
+    """Release the app-wide context, e.g. when the app quits."""
+    global _shared
+    if _shared is not None:
+        _shared.release()
+        _shared = None
@@ -0,0 +1,74 @@
+# scene.py
+import pygame
+
+
+class Scene:
+    """One visual, driven by the SceneManager in main.py.
+
+    The manager owns the window, the clock and the single main loop. It
+    calls init() once (possibly ahead of time, while the menu is showing),
+    enter() each time the scene becomes active, then handle_event(),
+    update(dt) and render() every frame until the scene sets done, and
+    finally exit(). render() draws onto the window surface and returns the
+    rects it changed, or None when the whole screen changed.
+    """
+
+    title = "Scene"                             # menu label
+    caption = "Visual Patterns Simulation"      # window title while active
+    size = (800, 600)
+    resizable = False
+    fps = 60
+
+    def __init__(self):
+        self.ready = False      # init() has run
+        self.done = False       # leave the scene at the end of this frame
+
+    # ---------- lifecycle ----------
+    def init(self):
+        """One-time setup: shader programs, fonts, sounds, buffers."""
+
+    def enter(self):
+        """Called each time the scene is shown; reset per-visit state here."""
+
+    def exit(self):
+        """Called when the scene stops being shown."""
+
+    def release(self):
+        """Free anything init() made. The scene may be init()ed again later."""
+
+    # ---------- per frame ----------
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            self.done = True
+
+    def update(self, dt):
+        """Advance the scene by dt seconds."""
+
+    def render(self, screen):
+        """Draw the frame. Returns the changed rects, or None for the whole screen."""
+        return None
+
+    def idle(self):
+        """True when nothing would change without input, so the loop may sleep."""
+        return False
+
+    def invalidate(self):
+        """Something was drawn over the window: repaint all of it next frame."""
+
+    def stats(self):
+        """Counters for the profiler HUD, e.g. {"particles": 1200}. "gpu" is GPU seconds."""
+        return {}
+
+    def resize(self, size):
+        """The window was resized (resizable scenes only)."""
+        self.size = size
+
+
+def run_standalone(scene):
+    """Run one scene in its own window until it finishes, then restore the previous window.
+
+    This is what each module's run() does, so the visuals still work on
+    their own (python fireworks.py) and from older callers.
+    """
+    from main import SceneManager
+    SceneManager().run(scene)
@@ -0,0 +1,81 @@
+# spatial_hash.py
+import numpy as np
+
+DIGIT = 16              # bucket ids are radix-sorted 16 bits a pass: NumPy's stable sort is O(n) for uint16
+NEIGHBOURS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+
+# -----------------------------
+#  UNIFORM GRID
+# -----------------------------
+class SpatialHash:
+    """Uniform grid of square cells over a point set, folded onto a side x side bucket table.
+
+    build(pos) is rebuilt from scratch each step: every point's cell
+    (x // cell, y // cell) wraps onto a bucket (cell mod side in each
+    axis), and the points are radix-sorted by bucket so each bucket's
+    points sit contiguously. The table has about one bucket per point,
+    so buckets stay as full at 100k points as at 1k. Queries then run on whole arrays, one batch
+    per neighbouring cell offset rather than a loop per point, and cost
+    O(n) for a bounded density. Wrapping keeps the grid unbounded (points
+    off screen still hash) while the 3x3 neighbours of a cell always land
+    in distinct buckets; far-apart cells sharing a bucket only add
+    candidates, which the distance test removes.
+    """
+
+    def __init__(self, cell):
+        self.cell = float(cell)
+        self.count = 0
+
+    def build(self, pos):
+        """Index the (n, 2) positions in pos."""
+        n = len(pos)
+        self.count = n
+        bits = max(2, (n.bit_length() + 1) // 2)
+        self.bits, self.side = bits, 1 << bits
+        cells = np.floor(pos / self.cell).astype(np.int64)
+        keys = self._bucket(cells[:, 0], cells[:, 1])
+        self.order = self._sort(keys)
+        # everything below is in sorted order, so a bucket's points are neighbours in memory too
+        self.pos = pos[self.order]
+        self.cx, self.cy = cells[self.order, 0], cells[self.order, 1]
+        self.counts = np.bincount(keys, minlength=self.side * self.side)
+        self.starts = np.cumsum(self.counts) - self.counts
+        return self
+
+    def _bucket(self, cx, cy):
+        mask = self.side - 1
+        return ((cx & mask) | ((cy & mask) << self.bits)).astype(np.uint32)
+
+    def _sort(self, keys):
+        """Stable order of the bucket ids: an LSD radix sort, one counting pass per 16-bit digit."""
+        order = None
+        for shift in range(0, 2 * self.bits, DIGIT):
+            digit = keys if order is None else keys[order]
+            step = np.argsort(((digit >> shift) & 0xFFFF).astype(np.uint16), kind="stable")
+            order = step if order is None else order[step]
+        return order
+
+    def pairs(self, radius):
+        """Every pair of points closer than radius (<= cell), once each, as index arrays (i, j)."""
+        if radius > self.cell:
+            raise ValueError(f"radius {radius} is larger than the cell size {self.cell}")
+        found_i, found_j = [], []
+        limit = radius * radius
+        for dx, dy in NEIGHBOURS:
+            bucket = self._bucket(self.cx + dx, self.cy + dy)
+            i, j = self._expand(self.starts[bucket], self.counts[bucket])
+            keep = i < j
+            i, j = i[keep], j[keep]
+            d = self.pos[i] - self.pos[j]
+            close = np.einsum("ij,ij->i", d, d) < limit
+            found_i.append(i[close])
+            found_j.append(j[close])
+        return self.order[np.concatenate(found_i)], self.order[np.concatenate(found_j)]
+
+    def _expand(self, first, count):
+        """(owner, point) for every point of every owner's bucket range [first, first + count)."""
+        owner = np.repeat(np.arange(len(first)), count)
+        ends = np.cumsum(count)
+        offsets = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - count, count)
+        return owner, np.repeat(first, count) + offsets
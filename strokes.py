@@ -0,0 +1,129 @@
+# strokes.py
+import math
+import pygame
+
+# -----------------------------
+#  PRIMITIVES
+# -----------------------------
+def draw_capsule(surf, color, p0, p1, radius):
+    """Round-capped thick segment from p0 to p1. Returns the dirty Rect."""
+    x0, y0 = p0
+    x1, y1 = p1
+    dx, dy = x1 - x0, y1 - y0
+    length = math.hypot(dx, dy)
+    area = pygame.draw.circle(surf, color, (round(x1), round(y1)), radius)
+    if length >= 1.0:
+        area.union_ip(pygame.draw.circle(surf, color, (round(x0), round(y0)), radius))
+        nx, ny = -dy / length * radius, dx / length * radius
+        area.union_ip(pygame.draw.polygon(
+            surf, color, [(x0 + nx, y0 + ny), (x1 + nx, y1 + ny), (x1 - nx, y1 - ny), (x0 - nx, y0 - ny)]
+        ))
+    return area
+
+
+def catmull_rom(p0, p1, p2, p3, t):
+    """Point at t (0..1) on the uniform Catmull-Rom segment between p1 and p2."""
+    t2 = t * t
+    t3 = t2 * t
+    return tuple(
+        0.5 * (2 * b + (c - a) * t + (2 * a - 5 * b + 4 * c - d) * t2 + (3 * b - a - 3 * c + d) * t3)
+        for a, b, c, d in zip(p0, p1, p2, p3)
+    )
+
+
+# -----------------------------
+#  STROKE ENGINE
+# -----------------------------
+class Stroke:
+    """Continuous brush stroke fed with every mouse position.
+
+    Consecutive points are joined with capsules, so fast strokes leave no
+    gaps whatever the frame rate. With smoothing on, the path through the
+    points is a Catmull-Rom spline, which lags one point behind the mouse
+    until end() draws the last segment.
+    """
+
+    def __init__(self, surf, color, radius, smooth=True):
+        self.surf = surf
+        self.color = color
+        self.radius = radius
+        self.smooth = smooth
+        self.points = []       # the last (up to) four input points
+
+    def begin(self, pos):
+        self.points = [pos]
+        return pygame.draw.circle(self.surf, self.color, pos, self.radius)
+
+    def add(self, pos):
+        """Extend the stroke to pos. Returns the dirty Rect, or None."""
+        if not self.points or pos == self.points[-1]:
+            return None
+        self.points.append(pos)
+        if not self.smooth:
+            area = draw_capsule(self.surf, self.color, self.points[-2], pos, self.radius)
+            del self.points[:-1]
+            return area
+        if len(self.points) < 3:
+            return None
+        if len(self.points) > 4:
+            del self.points[0]
+        # draw the segment between the middle points once its neighbours are known
+        if len(self.points) == 3:
+            p0, p1, p2 = self.points[0], self.points[0], self.points[1]
+            p3 = self.points[2]
+        else:
+            p0, p1, p2, p3 = self.points
+        return self._spline(p0, p1, p2, p3)
+
+    def end(self):
+        """Finish the stroke, drawing the segment still waiting on a next point."""
+        area = None
+        if self.smooth and len(self.points) >= 2:
+            p1, p2 = self.points[-2], self.points[-1]
+            p0 = self.points[-3] if len(self.points) >= 3 else p1
+            area = self._spline(p0, p1, p2, p2)
+        self.points = []
+        return area
+
+    def _spline(self, p0, p1, p2, p3):
+        length = math.hypot(p2[0] - p1[0], p2[1] - p1[1])
+        steps = max(1, int(length / max(1.0, self.radius * 0.5)))
+        area = None
+        prev = p1
+        for i in range(1, steps + 1):
+            point = catmull_rom(p0, p1, p2, p3, i / steps)
+            rect = draw_capsule(self.surf, self.color, prev, point, self.radius)
+            area = rect if area is None else area.union(rect)
+            prev = point
+        return area
+
+
+# -----------------------------
+#  SHAPE PREVIEW LAYER
+# -----------------------------
+class PreviewLayer:
+    """Transparent layer for rubber-band shape previews.
+
+    Only the rect the previous preview covered is cleared, and only the
+    rect the new one covers is blitted, so dragging a shape never copies
+    the whole canvas.
+    """
+
+    def __init__(self, size):
+        self.surf = pygame.Surface(size, pygame.SRCALPHA)
+        self.area = None
+
+    def clear(self):
+        if self.area:
+            self.surf.fill((0, 0, 0, 0), self.area)
+        self.area = None
+
+    def draw(self, draw_fn, *args):
+        """Replace the preview with draw_fn(layer_surface, *args)."""
+        self.clear()
+        self.area = draw_fn(self.surf, *args).clip(self.surf.get_rect())
+        return self.area
+
+    def blit(self, screen, offset):
+        if self.area:
+            screen.blit(self.surf, (self.area.x + offset[0], self.area.y + offset[1]), self.area)
@@ -0,0 +1,105 @@
+# trails.py
+import numpy as np
+
+TRAIL_LENGTH = 15       # points kept per emitter (the rocket trail's old list length)
+
+
+# -----------------------------
+#  RING BUFFER STORE
+# -----------------------------
+class TrailBuffer:
+    """Recent positions of many emitters, one fixed-size ring per slot in a shared slab.
+
+    points[slot] holds up to length positions; head[slot] is where the
+    next one goes and filled[slot] how many are valid. Recording a point
+    overwrites the oldest in O(1), and push() records one for a whole
+    batch of slots (a slice or an index array) with a few array writes,
+    so a step allocates nothing per emitter. Slots are either handed out
+    with acquire() / release() (rockets) or mirror another store's
+    indices (the particle pool, which moves rows with move() when it
+    compacts).
+    """
+
+    def __init__(self, capacity=64, length=TRAIL_LENGTH):
+        self.length = length
+        self._allocate(capacity)
+        self.free = []          # released slots
+        self.issued = 0         # slots [0, issued) have been handed out at least once
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.rows = np.arange(capacity)     # slot indices, so a slice of slots indexes like an array
+        self.points = np.zeros((capacity, self.length, 2), dtype=np.float32)
+        self.head = np.zeros(capacity, dtype=np.int32)
+        self.filled = np.zeros(capacity, dtype=np.int32)
+
+    def grow(self, capacity):
+        """Make room for at least capacity slots, keeping what is recorded."""
+        if capacity <= self.capacity:
+            return
+        old_capacity = self.capacity
+        new_capacity = old_capacity
+        while new_capacity < capacity:
+            new_capacity *= 2
+        old = (self.points, self.head, self.filled)
+        self._allocate(new_capacity)
+        for dst, src in zip((self.points, self.head, self.filled), old):
+            dst[:old_capacity] = src
+
+    # ---------- slots ----------
+    def acquire(self):
+        """A cleared slot for a new emitter."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.issued == self.capacity:
+                self.grow(self.capacity * 2)
+            slot = self.issued
+            self.issued += 1
+        self.clear(slot)
+        return slot
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def clear(self, slots=slice(None)):
+        """Forget the slots' points; they fill from points[slot, 0] again."""
+        self.head[slots] = 0
+        self.filled[slots] = 0
+
+    def move(self, dst, src):
+        """Copy the trails of slots src into slots dst (for a compacting owner)."""
+        self.points[dst] = self.points[src]
+        self.head[dst] = self.head[src]
+        self.filled[dst] = self.filled[src]
+
+    # ---------- recording ----------
+    def push(self, slots, xy):
+        """Record one position per slot; xy is (2,) for one slot or (k, 2) for k."""
+        head = self.head[slots]
+        self.points[self.rows[slots], head] = xy
+        self.head[slots] = (head + 1) % self.length
+        self.filled[slots] = np.minimum(self.filled[slots] + 1, self.length)
+
+    def ages(self, slots=slice(None)):
+        """(k, length) age of every stored point in steps (0 = newest); unfilled ones are >= filled."""
+        return (self.head[slots, None] - 1 - np.arange(self.length)) % self.length
+
+    def ordered(self, slots=slice(None)):
+        """(k, length, 2) points newest first; entry i of a slot is valid while i < filled[slot]."""
+        rows = self.rows[slots]
+        index = (self.head[slots, None] - 1 - np.arange(self.length)) % self.length
+        return self.points[rows[:, None], index]
+
+    def valid(self, slots=slice(None)):
+        """(k, length) mask of the points that have been recorded."""
+        return self.ages(slots) < self.filled[slots, None]
+
+    def bounds(self, slot):
+        """(left, top, right, bottom) of one slot's points, or None while it is empty."""
+        n = int(self.filled[slot])
+        if n == 0:
+            return None
+        pts = self.points[slot, :n]     # cleared slots fill from 0, so the first n are the valid ones
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        return lo[0], lo[1], hi[0], hi[1]